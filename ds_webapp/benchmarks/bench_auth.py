@@ -0,0 +1,86 @@
+"""
+A micro-benchmark of jwt_required: the cost of one protected call and the
+throughput of many threads sending the same token, with and without the
+verified-token cache.
+
+Run from the ds_webapp directory with: SECRET_KEY=... poetry run python -m benchmarks.bench_auth
+"""
+
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+from ds_webapp.authentication.authentication import (
+    create_jwt_token,
+    jwt_required,
+    token_cache,
+)
+
+THREADS = 8
+CALLS_PER_THREAD = 5000
+
+
+@jwt_required
+def protected():
+    """
+    The cheapest protected view
+    """
+    return "ok"
+
+
+def best_of(func, number: int) -> float:
+    """
+    Returns the best time of one call in microseconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def run_thread(app: Flask, headers: dict) -> None:
+    """
+    Call the protected view CALLS_PER_THREAD times in one request context
+    """
+    with app.test_request_context("/", headers=headers):
+        for _ in range(CALLS_PER_THREAD):
+            protected()
+
+
+def calls_per_second(app: Flask, headers: dict) -> float:
+    """
+    Returns the protected calls per second of THREADS threads together
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        for future in [
+            executor.submit(run_thread, app, headers) for _ in range(THREADS)
+        ]:
+            future.result()
+    return THREADS * CALLS_PER_THREAD / (time.perf_counter() - started)
+
+
+def main():
+    """
+    Print the per call time and the threaded throughput with and without the cache
+    """
+    app = Flask(__name__)
+    headers = {"Authorization": f"Bearer {create_jwt_token({'user_id': 1})}"}
+    max_entries = token_cache.max_entries
+
+    results = {}
+    for name, entries in (("decode", 0), ("cached", max_entries)):
+        token_cache.max_entries = entries
+        token_cache.clear()
+        with app.test_request_context("/", headers=headers):
+            per_call = best_of(protected, 5000)
+        results[name] = (per_call, calls_per_second(app, headers))
+    token_cache.max_entries = max_entries
+
+    print(f"{'':<8}{'µs/call':>10}{f'calls/s ({THREADS} threads)':>26}")
+    for name, (per_call, throughput) in results.items():
+        print(f"{name:<8}{per_call:>10.2f}{throughput:>26,.0f}")
+    print(f"speedup {results['decode'][0] / results['cached'][0]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
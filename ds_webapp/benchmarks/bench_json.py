@@ -0,0 +1,75 @@
+"""
+A micro-benchmark comparing JSON backends on representative API payloads:
+the stdlib path Flask's default provider takes and orjson via json_backend.
+
+Run from the ds_webapp directory with: poetry run python -m benchmarks.bench_json
+"""
+
+import json
+import timeit
+from pathlib import Path
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from ds_webapp import json_backend
+
+FIXTURE = Path(__file__).parent.parent / "ds_webapp" / "tests" / "test_movie_list.json"
+
+
+def payloads() -> dict:
+    """
+    Returns the payloads to serialize: one TMDB page, a 500 movie list
+    (MostPopular with a large n) and the raw bytes of the page
+    """
+    page = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    movies = page["results"]
+    large = [dict(movie, id=movie["id"] + i) for i in range(25) for movie in movies]
+    return {"page (20 movies)": page, "list (500 movies)": large}
+
+
+def best_of(func, number: int) -> float:
+    """
+    Returns the best time of one call in microseconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def time_payload(provider: DefaultJSONProvider, payload) -> dict:
+    """
+    Returns the (stdlib, backend) timings of encoding and decoding payload
+    """
+    raw = json.dumps(payload).encode("utf-8")
+    number = 2000 if len(raw) < 50_000 else 100
+    return {
+        "encode": (
+            best_of(lambda: provider.dumps(payload), number),
+            best_of(lambda: json_backend.dumps(payload), number),
+        ),
+        "decode": (
+            best_of(lambda: json.loads(raw), number),
+            best_of(lambda: json_backend.loads(raw), number),
+        ),
+    }
+
+
+def main():
+    """
+    Print encode and decode timings per payload and backend
+    """
+    stdlib = DefaultJSONProvider(Flask(__name__))
+    print(f"json_backend uses: {json_backend.BACKEND}\n")
+    print(
+        f"{'payload':<20}{'operation':<10}{'stdlib µs':>12}{'backend µs':>12}{'speedup':>9}"
+    )
+
+    for name, payload in payloads().items():
+        for operation, (baseline, backend) in time_payload(stdlib, payload).items():
+            print(
+                f"{name:<20}{operation:<10}{baseline:>12.1f}{backend:>12.1f}"
+                f"{baseline / backend:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+A small closed-loop load generator: every client sends requests back to back
+for the given duration, then throughput and latency percentiles are printed.
+
+Run from the ds_webapp directory against a running server, e.g.
+    poetry run app                                  (development server)
+    poetry run serve --workers 4 --threads 8        (production server)
+    poetry run python -m benchmarks.load_test --url http://localhost:5000/movies/suggest/the
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import requests
+
+from ds_webapp.authentication.authentication import create_jwt_token
+
+
+def run_client(url: str, headers: dict, deadline: float) -> Tuple[List[float], int]:
+    """
+    Send requests until deadline, returns the latencies of the successful ones
+    and the number of failures
+    """
+    latencies = []
+    failures = 0
+    with requests.Session() as session:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=10)
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+    return latencies, failures
+
+
+def percentile(latencies: List[float], fraction: float) -> float:
+    """
+    Returns the latency below which the given fraction of requests finished, in ms
+    """
+    index = min(len(latencies) - 1, int(fraction * len(latencies)))
+    return sorted(latencies)[index] * 1000
+
+
+def main():
+    """
+    Run the load test and print a summary
+    """
+    parser = argparse.ArgumentParser(description="Load test one API endpoint")
+    parser.add_argument("--url", default="http://localhost:5000/movies")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    headers = {}
+    if os.getenv("SECRET_KEY"):
+        headers["Authorization"] = f"Bearer {create_jwt_token({'user_id': 1})}"
+
+    deadline = time.perf_counter() + args.duration
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        results = list(
+            executor.map(
+                lambda _: run_client(args.url, headers, deadline), range(args.clients)
+            )
+        )
+
+    latencies = [latency for client, _ in results for latency in client]
+    failures = sum(failed for _, failed in results)
+    if not latencies:
+        print(f"All {failures} requests failed")
+        return
+
+    print(f"{args.url} with {args.clients} clients for {args.duration}s")
+    print(f"  requests/s  {len(latencies) / args.duration:10.1f}")
+    print(f"  failures    {failures:10d}")
+    print(f"  mean ms     {statistics.mean(latencies) * 1000:10.1f}")
+    for fraction in (0.5, 0.95, 0.99):
+        print(
+            f"  p{int(fraction * 100):<2} ms      {percentile(latencies, fraction):10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
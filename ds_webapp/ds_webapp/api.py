@@ -2,28 +2,31 @@
 A file containing the app's API.
 """
 
-from http.client import HTTPException
-from typing import Tuple, List, Any, Dict
-import asyncio
+from typing import Awaitable, Callable
 
 import asyncpg
 from flasgger import swag_from
-from flask import jsonify, request
+from flask import Response, jsonify, request
 from flask_restful import Resource, Api, reqparse
 
 
+from ds_webapp import endpoints
 from ds_webapp.authentication.authentication import create_jwt_token, jwt_required
-from ds_webapp.api_client.tmdb_client import (
-    get_movies_with_same_genres,
-    get_movies_with_similar_runtime,
-    get_popular_movies,
-    search_movie,
-    get_movie_details,
-)
-from ds_webapp.database.connect import Database
+from ds_webapp.authentication.hash_pool import RETRY_AFTER, HashPoolBusy
+from ds_webapp.api_client.tmdb_client import DEFAULT_RUNTIME_TOLERANCE
+from ds_webapp.bridge import async_request, db
 from ds_webapp.database.tables import Favorites, Users
-
-db = Database()
+from ds_webapp.endpoints import MAX_RUNTIME_TOLERANCE, MAX_SUGGESTIONS, Result
+from ds_webapp.favorites_api import BulkFavorites, FavoritesCount
+from ds_webapp.responses import (
+    KEYSET_PARAMETERS,
+    MAX_PAGE_LIMIT,
+    PAGINATION_PARAMETERS,
+    PROJECTION_PARAMETERS,
+    error_response,
+    to_response,
+    too_many_requests,
+)
 
 
 class Welcome(Resource):
@@ -72,12 +75,16 @@ class MostPopular(Resource):
                     "in": "path",
                     "type": "integer",
                     "required": False,
-                    "description": "The number of movies to retrieve (1-20).",
-                }
+                    "description": f"The number of movies to retrieve (1-{MAX_PAGE_LIMIT}), "
+                    "the default page length.",
+                },
+                *PAGINATION_PARAMETERS,
+                *PROJECTION_PARAMETERS,
             ],
             "responses": {
                 200: {
-                    "description": "Returns a list of the n most popular movies.",
+                    "description": "Returns a list of the n most popular movies, "
+                    "the X-Next-Cursor header points at the next page.",
                     "content": {
                         "application/json": {
                             "examples": {
@@ -103,27 +110,11 @@ class MostPopular(Resource):
         }
     )
     @jwt_required
-    def get(self, n: int = 1) -> Tuple[List[Any], int] | Tuple[Dict[str, str], int]:
+    def get(self, n: int = 1) -> Response:
         """
-        Returns a list of the n most popular movies (default = 1). Must be between 1 and 20.
+        Returns a list of the n most popular movies (default = 1). Must be between 1 and 500.
         """
-        try:
-            if not 1 <= n <= 20:
-                # Invalid value for 'n'. It should be between 1 and 20.
-                response = jsonify({"error": "Bad Request"})
-                response.headers["Cache-Control"] = "no-store"
-                response.status_code = 400
-                return response
-
-            response = jsonify(get_popular_movies()[:n])
-            response.headers["Cache-Control"] = f"public, max-age={3600}"
-            return response
-        # pylint: disable=locally-disabled, broad-exception-caught
-        except Exception:
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+        return run_endpoint(endpoints.most_popular, n, request.args)
 
 
 class MoviesWithSameGenres(Resource):
@@ -142,11 +133,14 @@ class MoviesWithSameGenres(Resource):
                     "type": "string",
                     "required": True,
                     "description": "The title of the movie to find similar genre matches for.",
-                }
+                },
+                *PAGINATION_PARAMETERS,
+                *PROJECTION_PARAMETERS,
             ],
             "responses": {
                 200: {
-                    "description": "Returns list of movies with same genres as the input movie.",
+                    "description": "Returns list of movies with same genres as the input movie, "
+                    "the X-Next-Cursor header points at the next page.",
                     "content": {
                         "application/json": {
                             "examples": {
@@ -172,27 +166,11 @@ class MoviesWithSameGenres(Resource):
         }
     )
     @jwt_required
-    def get(
-        self, movie: str
-    ) -> Tuple[List[Any], int] | Tuple[Dict[str, str], int] | Tuple[str, int]:
+    def get(self, movie: str) -> Response:
         """
         Returns a list of movies that share all genres with the given movie.
         """
-        try:
-            movies = get_movies_with_same_genres(movie)
-
-            if not movies:
-                return {"error": "Not Found."}, 404
-
-            response = jsonify(movies)
-            response.headers["Cache-Control"] = f"public, max-age={86400}"
-            return response
-        # pylint: disable=locally-disabled, broad-exception-caught
-        except Exception:
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+        return run_endpoint(endpoints.movies_with_same_genres, movie, request.args)
 
 
 class MoviesWithSimilarRuntime(Resource):
@@ -211,11 +189,22 @@ class MoviesWithSimilarRuntime(Resource):
                     "type": "string",
                     "required": True,
                     "description": "The title of the movie to find similar genre matches for.",
-                }
+                },
+                {
+                    "name": "tolerance",
+                    "in": "query",
+                    "type": "integer",
+                    "required": False,
+                    "default": DEFAULT_RUNTIME_TOLERANCE,
+                    "description": f"Allowed runtime difference in minutes (0-{MAX_RUNTIME_TOLERANCE}).",
+                },
+                *PAGINATION_PARAMETERS,
+                *PROJECTION_PARAMETERS,
             ],
             "responses": {
                 200: {
-                    "description": "Returns list of movies with same genres as the input movie.",
+                    "description": "Returns list of movies with a similar runtime as the input "
+                    "movie, the X-Next-Cursor header points at the next page.",
                     "content": {
                         "application/json": {
                             "examples": {
@@ -243,33 +232,11 @@ class MoviesWithSimilarRuntime(Resource):
         }
     )
     @jwt_required
-    def get(
-        self, movie: str
-    ) -> Tuple[List[Any], int] | Tuple[Dict[str, str], int] | Tuple[str, int]:
+    def get(self, movie: str) -> Response:
         """
-        Given a movie, returns movies with a similar runtime (+- 10 minutes).
+        Given a movie, returns movies with a similar runtime (+- tolerance minutes, default 10).
         """
-        try:
-            result = get_movies_with_similar_runtime(movie)
-
-            if not result:
-                return {"error": "Not Found."}, 404
-
-            response = jsonify(result)
-            response.headers["Cache-Control"] = f"public, max-age={3600}"
-            return response
-
-        except HTTPException as e:
-            response = jsonify({"error": e})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 404
-            return response
-        # pylint: disable=locally-disabled, broad-exception-caught
-        except Exception:
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+        return run_endpoint(endpoints.movies_with_similar_runtime, movie, request.args)
 
 
 class CreateUser(Resource):
@@ -316,6 +283,7 @@ class CreateUser(Resource):
             "responses": {
                 201: {"description": "User created successfully"},
                 409: {"description": "Username already exists"},
+                429: {"description": "Too many concurrent sign ups, retry later"},
                 500: {"description": "Internal server error"},
             },
         }
@@ -342,21 +310,14 @@ class CreateUser(Resource):
                 response.status_code = 201
                 return response
 
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+            return error_response({"message": "Internal server error"}, 500)
 
         except asyncpg.UniqueViolationError:
-            response = jsonify({"error": "Username already exists"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 409
-            return response
+            return error_response({"error": "Username already exists"}, 409)
+        except HashPoolBusy:
+            return too_many_requests(RETRY_AFTER)
         except Exception:  # pylint: disable=broad-exception-caught
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+            return error_response({"message": "Internal server error"}, 500)
 
 
 class Login(Resource):
@@ -403,6 +364,7 @@ class Login(Resource):
             "responses": {
                 200: {"description": "login successfull"},
                 401: {"description": "Unauthorized (wrong username or password)"},
+                429: {"description": "Too many concurrent logins, retry later"},
                 500: {"description": "Internal server error"},
             },
         }
@@ -433,15 +395,11 @@ class Login(Resource):
                 response.headers["Cache-Control"] = f"public, max-age={3600*3}"
                 return response
 
-            response = jsonify({"error": "Unathorized"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 401
-            return response
+            return error_response({"error": "Unathorized"}, 401)
+        except HashPoolBusy:
+            return too_many_requests(RETRY_AFTER)
         except Exception:  # pylint: disable=broad-exception-caught
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+            return error_response({"message": "Internal server error"}, 500)
 
 
 class FavoriteMovies(Resource):
@@ -454,10 +412,13 @@ class FavoriteMovies(Resource):
             "tags": ["Favorites"],
             "security": [{"BearerAuth": []}],
             "summary": "Get user's favorite movies",
-            "description": "Retrieve list of movies marked as favorites by the authenticated user",
+            "description": "Retrieve list of movies marked as favorites by the authenticated user, "
+            "by movie id",
+            "parameters": PROJECTION_PARAMETERS + KEYSET_PARAMETERS,
             "responses": {
                 200: {
-                    "description": "Successfully retrieved favorite movies",
+                    "description": "Successfully retrieved favorite movies, when more "
+                    "follow the X-Next-After header holds the after of the next page",
                     "schema": {
                         "type": "object",
                         "properties": {
@@ -475,52 +436,33 @@ class FavoriteMovies(Resource):
                                         },
                                     },
                                 },
-                            }
+                            },
+                            "errors": {
+                                "type": "array",
+                                "description": "Favorites whose details could not be fetched",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "movie_id": {"type": "integer"},
+                                        "error": {"type": "string"},
+                                    },
+                                },
+                            },
                         },
                     },
                 },
+                400: {"description": "Invalid view or fields parameter"},
                 401: {"description": "Unauthorized - Invalid or missing JWT token"},
                 500: {"description": "Internal server error"},
             },
         }
     )
     @jwt_required
-    def get(self):
+    def get(self) -> Response:
         """
         Returns a list of the users favorite movies
         """
-
-        user_id = request.user["user_id"]
-        favorites_table = Favorites(db=db)
-        print("user id:", user_id)
-
-        async def get_favorites():
-            return await favorites_table.get_favorites(user_id=user_id)
-
-        try:
-            result = async_request(get_favorites)
-            response = jsonify(
-                {
-                    "results": (
-                        [get_movie_details(dict(row).get("movie_id")) for row in result]
-                        if result
-                        else []
-                    )
-                }
-            )
-            response.headers["Cache-Control"] = "no-store"
-            return response
-        except asyncpg.PostgresError:
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
-        except Exception as e:  # pylint: disable=broad-exception-caught
-            print("error :", e)
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+        return run_endpoint(endpoints.favorite_movies, request.user, request.args)
 
 
 class AddFavorite(Resource):
@@ -570,15 +512,9 @@ class AddFavorite(Resource):
             response.status_code = 201
             return response
         except asyncpg.PostgresError:
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+            return error_response({"message": "Internal server error"}, 500)
         except Exception:  # pylint: disable=broad-exception-caught
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+            return error_response({"message": "Internal server error"}, 500)
 
 
 class RemoveFavorite(Resource):
@@ -628,10 +564,7 @@ class RemoveFavorite(Resource):
             response.headers["Cache-Control"] = "no-store"
             return response
         except Exception:  # pylint: disable=broad-exception-caught
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+            return error_response({"message": "Internal server error"}, 500)
 
 
 class SearchMovie(Resource):
@@ -644,8 +577,10 @@ class SearchMovie(Resource):
             "tags": ["Search"],
             "security": [{"BearerAuth": []}],
             "summary": "Search movies by title",
-            "description": "Searches The Movie Database (TMDB) for movies "
-            "matching the given title.",
+            "description": "Searches the local movie catalog for movies matching the "
+            "given title (word prefixes and typos allowed), falling back to The Movie "
+            "Database (TMDB) when no catalog title matches or the catalog does not "
+            "fill the requested page.",
             "parameters": [
                 {
                     "name": "title",
@@ -653,11 +588,14 @@ class SearchMovie(Resource):
                     "type": "string",
                     "required": True,
                     "description": "Title of the movie to search for",
-                }
+                },
+                *PAGINATION_PARAMETERS,
+                *PROJECTION_PARAMETERS,
             ],
             "responses": {
                 200: {
-                    "description": "Successfully retrieved movie search results",
+                    "description": "Successfully retrieved movie search results, "
+                    "the X-Next-Cursor header points at the next page",
                     "schema": {
                         "type": "object",
                         "properties": {
@@ -677,42 +615,91 @@ class SearchMovie(Resource):
                         },
                     },
                 },
-                400: {"description": "Missing or invalid title parameter"},
+                400: {"description": "Missing or invalid title or query parameter"},
                 401: {"description": "Unauthorized"},
                 500: {"description": "Internal server error"},
             },
         }
     )
     @jwt_required
-    def get(self, title: str):
+    def get(self, title: str) -> Response:
         """
         A function to search for a movie given the title
         """
+        return run_endpoint(endpoints.search, title, request.args)
 
-        if not title:
-            return {"message": "Missing 'title' query parameter"}, 400
-        try:
-            results = search_movie(title)
-            response = jsonify({"results": results})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 200
-            return response
-        except Exception:  # pylint: disable=broad-exception-caught
-            response = jsonify({"message": "Internal server error"})
-            response.headers["Cache-Control"] = "no-store"
-            response.status_code = 500
-            return response
+
+class SuggestMovie(Resource):
+    """
+    Suggest movie titles while the user is typing
+    """
+
+    @swag_from(
+        {
+            "tags": ["Search"],
+            "security": [{"BearerAuth": []}],
+            "summary": "Suggest movie titles for a prefix",
+            "description": "Returns the most popular movies seen so far with a title "
+            "word starting with the given prefix, without calling TMDB.",
+            "parameters": [
+                {
+                    "name": "prefix",
+                    "in": "path",
+                    "type": "string",
+                    "required": True,
+                    "description": "What the user typed so far",
+                },
+                {
+                    "name": "limit",
+                    "in": "query",
+                    "type": "integer",
+                    "required": False,
+                    "description": f"Number of suggestions (1-{MAX_SUGGESTIONS}, default 10).",
+                },
+            ],
+            "responses": {
+                200: {
+                    "description": "Suggestions, most popular first",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "results": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "id": {"type": "integer"},
+                                        "title": {"type": "string"},
+                                        "release_date": {"type": "string"},
+                                        "popularity": {"type": "number"},
+                                    },
+                                },
+                            }
+                        },
+                    },
+                },
+                400: {"description": "Invalid limit parameter"},
+                401: {"description": "Unauthorized"},
+            },
+        }
+    )
+    @jwt_required
+    def get(self, prefix: str) -> Response:
+        """
+        A function to suggest movies given the start of a title
+        """
+        return to_response(endpoints.suggest(prefix, request.args))
 
 
-def async_request(async_function):
+def run_endpoint(endpoint: Callable[..., Awaitable[Result]], *args) -> Response:
     """
-    A function to send async requests in sync functions
+    Runs a shared endpoint on the background loop and returns its response,
+    one that does not finish within the request timeout is an internal error
     """
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(async_function())
-    loop.close()
-    return result
+    try:
+        return to_response(async_request(lambda: endpoint(*args)))
+    except TimeoutError:
+        return to_response(endpoints.internal_error())
 
 
 def add_endpoints(api: Api) -> None:
@@ -723,6 +710,7 @@ def add_endpoints(api: Api) -> None:
     """
     api.add_resource(Welcome, "/", "/movies")
     api.add_resource(SearchMovie, "/movies/<string:title>")
+    api.add_resource(SuggestMovie, "/movies/suggest/<string:prefix>")
     api.add_resource(
         MostPopular, "/movies/most_popular", "/movies/most_popular/<int:n>"
     )
@@ -733,3 +721,5 @@ def add_endpoints(api: Api) -> None:
     api.add_resource(FavoriteMovies, "/movies/favorite")
     api.add_resource(AddFavorite, "/movies/favorite/<int:movie_id>")
     api.add_resource(RemoveFavorite, "/movies/favorite/<int:movie_id>")
+    api.add_resource(BulkFavorites, "/movies/favorite/batch")
+    api.add_resource(FavoritesCount, "/movies/favorite/count")
@@ -0,0 +1,434 @@
+"""
+A file containing the async twins of the methods in tmdb_client.py
+
+All calls share one pooled httpx.AsyncClient, identical in-flight requests are
+coalesced into one upstream call and a global semaphore caps concurrency to
+stay under the TMDB rate limit.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from ds_webapp.api_client.http_client import (
+    DEFAULT_TIMEOUT,
+    ENDPOINT_TIMEOUTS,
+    MAX_BACKOFF,
+    RETRY_STATUS_CODES,
+    TMDBError,
+    retry_settings,
+)
+from ds_webapp.api_client.tmdb_client import (
+    API_KEY,
+    API_URL,
+    DETAILS_TTL,
+    DISCOVER_TTL,
+    GENRES_TTL,
+    POPULAR_TTL,
+    DEFAULT_RUNTIME_TOLERANCE,
+    SEARCH_TTL,
+    runtime_index,
+    title_index,
+)
+from ds_webapp.api_client.pagination import PAGE_SIZE, apaginate, local_window
+from ds_webapp.api_client.utils import first_result_id, same_genre_filters
+from ds_webapp.cache.cache import cached_async, get_cache, make_key
+from ds_webapp.json_backend import loads
+
+# the genre list is refreshed well before it expires, so requests find it warm
+GENRES_REFRESH_INTERVAL = GENRES_TTL / 2
+GENRES_RETRY_INTERVAL = 60
+
+
+class AsyncTMDBClient:  # pylint: disable=too-many-instance-attributes
+    """
+    A class owning a pooled httpx.AsyncClient for The Movie Database API.
+
+    The http client, semaphore and in-flight table are bound to the event loop
+    they were created on and are recreated when used from another loop.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        base_url: str,
+        api_key: str,
+        *,
+        max_connections: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        backoff_factor: float = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_connections = max_connections or int(os.getenv("TMDB_POOL_SIZE", "10"))
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("TMDB_MAX_CONCURRENCY", "20")
+        )
+        self.max_retries, self.backoff_factor = retry_settings(
+            max_retries, backoff_factor
+        )
+        self.transport = transport
+        self._loop = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    def _bind_to_running_loop(self):
+        """
+        Create the loop-bound state on first use in the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._client is not None:
+            return
+
+        if self._client is not None:
+            self._discard(self._client, self._loop)
+        self._loop = loop
+        self._client = httpx.AsyncClient(
+            headers={"accept": "application/json", "Authorization": self.api_key},
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            transport=self.transport,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight = {}
+
+    def _discard(self, old: httpx.AsyncClient, old_loop: asyncio.AbstractEventLoop):
+        """
+        Close a client left behind by another event loop, on that loop while it
+        still runs (in another thread), otherwise on the running loop.
+        """
+        if old_loop.is_running() and not old_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(old.aclose(), old_loop)
+            return
+
+        task = asyncio.get_running_loop().create_task(old.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closed)
+
+    def _closed(self, task: asyncio.Task):
+        """
+        Forget a finished close, connections of a closed loop may fail to close
+        but are dropped anyway, so its error is retrieved and ignored.
+        """
+        self._closing.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    def timeout_for(path: str) -> httpx.Timeout:
+        """
+        Returns the timeout of the most specific endpoint prefix matching path.
+        """
+        matches = [prefix for prefix in ENDPOINT_TIMEOUTS if path.startswith(prefix)]
+        connect, read = (
+            ENDPOINT_TIMEOUTS[max(matches, key=len)] if matches else DEFAULT_TIMEOUT
+        )
+        return httpx.Timeout(read, connect=connect)
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None):
+        """
+        Send a GET request to the given TMDB path and return the decoded body.
+        Identical requests that are already in flight share one upstream call.
+        """
+        self._bind_to_running_loop()
+        key = (path, tuple(sorted((params or {}).items())))
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(path, params))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+
+        # shielded so a cancelled caller does not cancel the call others wait on
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Tuple, future: asyncio.Future):
+        """
+        Remove a finished request from the in-flight table.
+        """
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def _fetch(self, path: str, params: Optional[Dict[str, Any]]):
+        """
+        Fetch path, retrying 429/5xx responses, connection errors and timeouts
+        with exponential backoff up to MAX_BACKOFF. A response asking to retry
+        after more than MAX_BACKOFF seconds raises TMDBError right away.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(
+                        f"{self.base_url}{path}",
+                        params=params,
+                        timeout=self.timeout_for(path),
+                    )
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                return loads(response.content)
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+            if attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After", "")
+                if not retry_after.isdigit():
+                    await asyncio.sleep(self.backoff(attempt))
+                elif int(retry_after) <= MAX_BACKOFF:
+                    await asyncio.sleep(int(retry_after))
+                else:
+                    break
+
+        raise TMDBError(response)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns the seconds to wait before retrying after a failed attempt.
+        """
+        return min(self.backoff_factor * 2**attempt, MAX_BACKOFF)
+
+    async def close(self):
+        """
+        Close all pooled connections.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+client = AsyncTMDBClient(API_URL, API_KEY)
+
+
+@cached_async("popular", ttl=POPULAR_TTL)
+async def get_popular_movies(page: int = 1) -> list[Any]:
+    """
+    Request a page of the most popular movies
+    :param page: TMDB page, 20 movies each
+    """
+    body = await client.get_json(
+        "/movie/popular", params={"language": "en-US", "page": page}
+    )
+    title_index.add_many(body.get("results"))
+    return body.get("results")
+
+
+@cached_async("search", ttl=SEARCH_TTL)
+async def search_movie(title: str, page: int = 1) -> list[Any]:
+    """
+    Search for movie in MovieDB
+    :param title: movie title
+    :param page: TMDB page, 20 movies each
+    """
+    body = await client.get_json(
+        "/search/movie", params={"language": "en-US", "query": title, "page": page}
+    )
+    title_index.add_many(body.get("results"))
+    return body.get("results")
+
+
+@cached_async("discover_genres", ttl=DISCOVER_TTL)
+async def search_movies_with_genres(
+    genres_to_include: str, genres_to_exclude: str, page: int = 1
+) -> list[Any]:
+    """
+    Search for movies in MovieDB by genre
+    :param genres_to_exclude: list of genre ids to exclude
+    :param genres_to_include: list of genre ids to include
+    :param page: TMDB page, 20 movies each
+    """
+    body = await client.get_json(
+        "/discover/movie",
+        params={
+            "language": "en-US",
+            "with_genres": genres_to_include,
+            "without_genres": genres_to_exclude,
+            "page": page,
+        },
+    )
+    return body.get("results")
+
+
+@cached_async("genres", ttl=GENRES_TTL)
+async def get_movie_genres() -> list[Any]:
+    """
+    Get all movie genres from MovieDB
+    """
+    body = await client.get_json("/genre/movie/list", params={"language": "en-US"})
+    return body.get("genres")
+
+
+async def refresh_genres_forever():
+    """
+    Keep the cached genre list warm by refetching it before it expires.
+    """
+    while True:
+        try:
+            genres = await get_movie_genres.__wrapped__()
+            await get_cache().set_async(make_key("genres"), genres, GENRES_TTL)
+            await asyncio.sleep(GENRES_REFRESH_INTERVAL)
+        except Exception:  # pylint: disable=broad-exception-caught
+            await asyncio.sleep(GENRES_RETRY_INTERVAL)
+
+
+_GENRES_REFRESHER: Optional[asyncio.Task] = None
+
+
+def ensure_genres_warm():
+    """
+    Start the genre refresher on the running loop if it is not running yet.
+    """
+    global _GENRES_REFRESHER  # pylint: disable=global-statement
+
+    loop = asyncio.get_running_loop()
+    if (
+        _GENRES_REFRESHER is None
+        or _GENRES_REFRESHER.done()
+        or _GENRES_REFRESHER.get_loop() is not loop
+    ):
+        _GENRES_REFRESHER = loop.create_task(refresh_genres_forever())
+
+
+async def get_movies_with_same_genres(
+    movie_title: str,
+    local_lookup: Optional[Callable[[List[int], int], Awaitable[List[Any]]]] = None,
+    offset: int = 0,
+    limit: int = PAGE_SIZE,
+) -> List[Any]:
+    """
+    Given a movie title, returns movies that share the same genres.
+
+    The genre list comes from the warm cache (or is fetched concurrently with
+    the search on a cold start), so the critical path is the search followed
+    by the discover call, and just the discover call when the search is cached.
+
+    :param local_lookup: optional coroutine function returning up to limit movies
+        with exactly the given genre ids from a local catalog, most popular first
+        like TMDB, which is only asked when the catalog does not fill the whole
+        window from offset (or fails)
+    :param offset: index of the first movie to return
+    :param limit: maximum number of movies to return
+    """
+    ensure_genres_warm()
+    genres, search_result = await asyncio.gather(
+        get_movie_genres(), search_movie(movie_title)
+    )
+
+    filters = same_genre_filters(genres, search_result)
+    if filters is None:
+        return []
+
+    if local_lookup is not None:
+        try:
+            local = await local_lookup(search_result[0]["genre_ids"], offset + limit)
+        except Exception:  # pylint: disable=broad-exception-caught
+            local = None
+        page = local_window(local, offset, limit)
+        if page is not None:
+            return page
+
+    return await apaginate(
+        lambda page: search_movies_with_genres(*filters, page), offset, limit
+    )
+
+
+@cached_async("details", ttl=DETAILS_TTL)
+async def get_movie_details(movie_id: int) -> dict[str, int | str | None]:
+    """
+    Get detail info about movie from movie_db
+    :param movie_id: unique id of movie
+    """
+    details = await client.get_json(f"/movie/{movie_id}", params={"language": "en-US"})
+    runtime_index.add(details)
+    return details
+
+
+async def get_movie_details_batch(
+    movie_ids: List[int],
+) -> Tuple[List[Optional[dict[str, int | str | None]]], Dict[int, str]]:
+    """
+    Get detail info about many movies concurrently
+    :param movie_ids: unique ids of the movies
+    :return: the details in the order of movie_ids (None where fetching failed)
+        and a dict mapping each failed movie id to its error
+    """
+    responses = await asyncio.gather(
+        *(get_movie_details(movie_id) for movie_id in movie_ids),
+        return_exceptions=True,
+    )
+
+    results = []
+    errors = {}
+    for movie_id, response in zip(movie_ids, responses):
+        if isinstance(response, Exception):
+            results.append(None)
+            errors[movie_id] = str(response)
+        else:
+            results.append(response)
+    return results, errors
+
+
+async def search_movies_with_duration(
+    min_duration: int, max_duration: int, page: int = 1
+) -> list:
+    """
+    Get movies from MovieDB with a duration: min_duration <= duration <= max_duration
+    :param min_duration: minimum duration
+    :param max_duration: maximum duration
+    :param page: TMDB page, 20 movies each
+    """
+    body = await client.get_json(
+        "/discover/movie",
+        params={
+            "language": "en-US",
+            "with_runtime.gte": min_duration,
+            "with_runtime.lte": max_duration,
+            "page": page,
+        },
+    )
+    return body.get("results")
+
+
+async def get_movies_with_similar_runtime(
+    movie_title: str,
+    tolerance: int = DEFAULT_RUNTIME_TOLERANCE,
+    offset: int = 0,
+    limit: int = PAGE_SIZE,
+) -> List[Any]:
+    """
+    Given a movie title, return movies with a runtime within +/- tolerance minutes.
+    Answered from the local runtime index when it knows enough such movies to
+    fill the whole window from offset.
+    :param offset: index of the first movie to return
+    :param limit: maximum number of movies to return
+    """
+    movie_id = first_result_id(await search_movie(movie_title))
+    if movie_id is None:
+        return []
+
+    duration = (await get_movie_details(movie_id) or {}).get("runtime")
+    if duration is None:
+        return []
+
+    page = local_window(
+        runtime_index.similar(duration, tolerance, limit=offset + limit), offset, limit
+    )
+    if page is not None:
+        return page
+
+    return await apaginate(
+        lambda page: search_movies_with_duration(
+            duration - tolerance, duration + tolerance, page
+        ),
+        offset,
+        limit,
+    )
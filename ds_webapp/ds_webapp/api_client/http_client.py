@@ -0,0 +1,135 @@
+"""
+A file containing the pooled HTTP client used for all calls to The Movie Database API
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# the longest wait in seconds before a retry, a longer Retry-After is not waited for
+MAX_BACKOFF = float(os.getenv("TMDB_MAX_BACKOFF", "5"))
+
+# (connect timeout, read timeout) in seconds, per endpoint
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 5)
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "/genre/movie/list": (3.05, 3),
+    "/movie/popular": (3.05, 5),
+    "/search/movie": (3.05, 5),
+    "/movie": (3.05, 5),
+    "/discover/movie": (3.05, 8),
+}
+
+
+def retry_settings(
+    max_retries: Optional[int], backoff_factor: Optional[float]
+) -> Tuple[int, float]:
+    """
+    Returns the given retry settings, falling back to TMDB_MAX_RETRIES and TMDB_BACKOFF_FACTOR
+    """
+    if max_retries is None:
+        max_retries = int(os.getenv("TMDB_MAX_RETRIES", "3"))
+    if backoff_factor is None:
+        backoff_factor = float(os.getenv("TMDB_BACKOFF_FACTOR", "0.3"))
+    return max_retries, backoff_factor
+
+
+class TMDBError(Exception):
+    """
+    Raised when The Movie Database API answers with an unexpected status code.
+    """
+
+    def __init__(self, response: Any):
+        """
+        :param response: a requests or httpx response
+        """
+        self.status_code = response.status_code
+        super().__init__(f"TMDB returned {response.status_code} for {response.url}")
+
+
+class TMDBClient:
+    """
+    A class owning a keep-alive requests.Session with a bounded connection pool,
+    retry-with-backoff on 429/5xx and per-endpoint timeouts.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        base_url: str,
+        api_key: str,
+        *,
+        pool_size: int = None,
+        max_retries: int = None,
+        backoff_factor: float = None,
+        timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        self.base_url = base_url
+        self.pool_size = pool_size or int(os.getenv("TMDB_POOL_SIZE", "10"))
+        self.max_retries, self.backoff_factor = retry_settings(
+            max_retries, backoff_factor
+        )
+        self.timeouts = {**ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.session = self._create_session(api_key)
+
+    def _create_session(self, api_key: str) -> requests.Session:
+        """
+        Create a session whose headers are built once and whose connections are reused.
+        """
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {
+                "accept": "application/json",
+                "Authorization": api_key,
+                "Connection": "keep-alive",
+            }
+        )
+        return session
+
+    def timeout_for(self, path: str) -> Tuple[float, float]:
+        """
+        Returns the timeout of the most specific endpoint prefix matching path.
+        """
+        matches = [prefix for prefix in self.timeouts if path.startswith(prefix)]
+        if not matches:
+            return DEFAULT_TIMEOUT
+        return self.timeouts[max(matches, key=len)]
+
+    def get(
+        self, path: str, params: Optional[Dict[str, Any]] = None
+    ) -> requests.Response:
+        """
+        Send a GET request to the given TMDB path
+        :param path: endpoint path, e.g. "/movie/popular"
+        :param params: query parameters
+        :return: the response
+        """
+        return self.session.get(
+            f"{self.base_url}{path}",
+            params=params,
+            timeout=self.timeout_for(path),
+        )
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        self.session.close()
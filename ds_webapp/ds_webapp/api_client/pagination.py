@@ -0,0 +1,171 @@
+"""
+A file containing helpers to page through TMDB list endpoints lazily
+"""
+
+import asyncio
+import base64
+import binascii
+from collections import deque
+from concurrent.futures import Executor, Future
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+# TMDB list endpoints return 20 results per page and serve at most 500 pages
+PAGE_SIZE = 20
+MAX_PAGES = 500
+
+
+def encode_cursor(offset: int) -> str:
+    """
+    Returns an opaque cursor pointing at the result with index offset
+    """
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Returns the offset a cursor points at
+    :raises ValueError: when the cursor is invalid
+    """
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return offset
+
+
+def is_last_page(page: int, results: List[Any]) -> bool:
+    """
+    Returns whether no page follows this one
+    """
+    return len(results) < PAGE_SIZE or page >= MAX_PAGES
+
+
+def iter_pages(
+    fetch_page: Callable[[int], List[Any]],
+    executor: Executor,
+    first_page: int = 1,
+    prefetch: int = 1,
+) -> Iterator[List[Any]]:
+    """
+    Yield the results of consecutive pages, starting at first_page.
+    While a page is being consumed the next prefetch pages are already fetched on executor.
+    """
+    pending: Deque[Tuple[int, Future]] = deque()
+    next_page = first_page
+    try:
+        while True:
+            while len(pending) <= prefetch and next_page <= MAX_PAGES:
+                pending.append((next_page, executor.submit(fetch_page, next_page)))
+                next_page += 1
+            if not pending:
+                return
+
+            page, future = pending.popleft()
+            results = future.result() or []
+            yield results
+            if is_last_page(page, results):
+                return
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+async def aiter_pages(
+    fetch_page: Callable[[int], Awaitable[List[Any]]],
+    first_page: int = 1,
+    prefetch: int = 1,
+) -> AsyncIterator[List[Any]]:
+    """
+    The coroutine counterpart of iter_pages, prefetching pages in tasks.
+    """
+    pending: Deque[Tuple[int, asyncio.Future]] = deque()
+    next_page = first_page
+    try:
+        while True:
+            while len(pending) <= prefetch and next_page <= MAX_PAGES:
+                pending.append(
+                    (next_page, asyncio.ensure_future(fetch_page(next_page)))
+                )
+                next_page += 1
+            if not pending:
+                return
+
+            page, task = pending.popleft()
+            results = await task or []
+            yield results
+            if is_last_page(page, results):
+                return
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+def page_window(offset: int, limit: int) -> Tuple[int, int, int]:
+    """
+    Returns the TMDB page holding the result with index offset, its index in that page
+    and the number of pages holding the limit results from offset on
+    """
+    first_page, skip = offset // PAGE_SIZE + 1, offset % PAGE_SIZE
+    return first_page, skip, -(-(skip + limit) // PAGE_SIZE)
+
+
+def local_window(
+    results: Optional[List[Any]], offset: int, limit: int
+) -> Optional[List[Any]]:
+    """
+    Returns the limit results from offset on of a local source that was read up to
+    offset + limit results, or None when it holds fewer: a partly filled source
+    would cut later pages short, so they are paginated from TMDB instead.
+    Callers ask one result past the page, so a full window also tells a next page follows.
+    """
+    if results is None or len(results) < offset + limit:
+        return None
+    return results[offset : offset + limit]
+
+
+def paginate(
+    fetch_page: Callable[[int], List[Any]], executor: Executor, offset: int, limit: int
+) -> List[Any]:
+    """
+    Returns up to limit results starting at index offset, fetching the pages needed
+    concurrently and stopping at the last page
+    """
+    first_page, skip, pages = page_window(offset, limit)
+    results = (
+        result
+        for page in iter_pages(fetch_page, executor, first_page, prefetch=pages - 1)
+        for result in page
+    )
+    return list(islice(results, skip, skip + limit))
+
+
+async def apaginate(
+    fetch_page: Callable[[int], Awaitable[List[Any]]], offset: int, limit: int
+) -> List[Any]:
+    """
+    The coroutine counterpart of paginate
+    """
+    first_page, skip, pages = page_window(offset, limit)
+    collected: List[Any] = []
+    results = aiter_pages(fetch_page, first_page, prefetch=pages - 1)
+    try:
+        async for page in results:
+            collected.extend(page)
+            if len(collected) >= skip + limit:
+                break
+    finally:
+        await results.aclose()
+    return collected[skip : skip + limit]
@@ -0,0 +1,144 @@
+"""
+A file containing a sorted runtime index over the movies seen so far
+and the catalog movies whose runtime is known
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def to_list_item(details: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a movie details payload (or a list result) to the shape of a TMDB list result
+    """
+    if "genres" in details:
+        genre_ids = [genre["id"] for genre in details.get("genres") or []]
+    else:
+        genre_ids = list(details.get("genre_ids") or [])
+    return {
+        "adult": details.get("adult"),
+        "backdrop_path": details.get("backdrop_path"),
+        "genre_ids": genre_ids,
+        "id": details.get("id"),
+        "original_language": details.get("original_language"),
+        "original_title": details.get("original_title"),
+        "overview": details.get("overview"),
+        "popularity": details.get("popularity"),
+        "poster_path": details.get("poster_path"),
+        "release_date": details.get("release_date"),
+        "title": details.get("title"),
+        "video": details.get("video"),
+        "vote_average": details.get("vote_average"),
+        "vote_count": details.get("vote_count"),
+    }
+
+
+class RuntimeIndex:
+    """
+    A class keeping (runtime, movie_id) pairs in a sorted array, so that
+    "movies between a and b minutes" is two bisects and a slice.
+    """
+
+    def __init__(self, max_entries: int = 50_000, min_results: int = 10):
+        """
+        :param max_entries: bound on the number of movies, the oldest are evicted first
+        :param min_results: fewest matches for which a query is answered locally
+        """
+        self.max_entries = max_entries
+        self.min_results = min_results
+        self._keys: List[Tuple[int, int]] = []
+        self._movies: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, details: Dict[str, Any]) -> None:
+        """
+        Add (or update) a movie from its details payload, movies without a runtime are skipped
+        """
+        movie_id = details.get("id")
+        runtime = details.get("runtime")
+        if movie_id is None or not runtime:
+            return
+
+        with self._lock:
+            self._remove(movie_id)
+            insort(self._keys, (runtime, movie_id))
+            self._movies[movie_id] = (runtime, to_list_item(details))
+            self._evict()
+
+    def add_many(self, movies: List[Dict[str, Any]]) -> None:
+        """
+        Add (or update) many movies in the shape of a TMDB list result with a
+        runtime, e.g. catalog rows, movies without a runtime are skipped.
+        The keys are sorted once instead of inserted one by one.
+        """
+        entries = {
+            movie["id"]: (movie["runtime"], to_list_item(movie))
+            for movie in movies
+            if movie.get("id") is not None and movie.get("runtime")
+        }
+        if not entries:
+            return
+
+        with self._lock:
+            for movie_id, entry in entries.items():
+                self._movies.pop(movie_id, None)
+                self._movies[movie_id] = entry
+            self._keys = sorted(
+                (runtime, movie_id) for movie_id, (runtime, _) in self._movies.items()
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Remove the oldest movies beyond max_entries, the lock must be held
+        """
+        while len(self._movies) > self.max_entries:
+            self._remove(next(iter(self._movies)))
+
+    def _remove(self, movie_id: int) -> None:
+        """
+        Remove a movie, the lock must be held
+        """
+        entry = self._movies.pop(movie_id, None)
+        if entry is None:
+            return
+        position = bisect_left(self._keys, (entry[0], movie_id))
+        del self._keys[position]
+
+    def runtime_of(self, movie_id: int) -> Optional[int]:
+        """
+        Returns the indexed runtime of a movie
+        """
+        entry = self._movies.get(movie_id)
+        return entry[0] if entry else None
+
+    def range(self, min_runtime: int, max_runtime: int) -> List[Dict[str, Any]]:
+        """
+        Returns the movies with min_runtime <= runtime <= max_runtime,
+        most popular first like the discover endpoint
+        """
+        with self._lock:
+            start = bisect_left(self._keys, (min_runtime, -1))
+            end = bisect_right(self._keys, (max_runtime, float("inf")))
+            movies = [
+                self._movies[movie_id][1] for _, movie_id in self._keys[start:end]
+            ]
+        return sorted(
+            movies, key=lambda movie: movie.get("popularity") or 0, reverse=True
+        )
+
+    def similar(
+        self, runtime: int, tolerance: int, limit: int = 20
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns up to limit movies within runtime +/- tolerance, or None when
+        the index knows too few of them to answer without TMDB
+        """
+        movies = self.range(runtime - tolerance, runtime + tolerance)
+        if len(movies) < self.min_results:
+            return None
+        return movies[:limit]
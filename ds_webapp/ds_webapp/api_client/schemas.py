@@ -25,3 +25,38 @@ class Movie(BaseModel):
     video: Optional[bool] = None
     vote_average: Optional[float] = None
     vote_count: Optional[int] = None
+
+
+class Genre(BaseModel):
+    """
+    A class representing a genre as it appears in movie details
+    """
+
+    id: int
+    name: Optional[str] = None
+
+
+class MovieTitle(BaseModel):
+    """
+    A compact view of a movie, enough to list or pick it
+    """
+
+    id: int
+    title: str
+
+
+class MovieCard(MovieTitle):
+    """
+    A compact view of a movie with the fields the UI renders in movie lists
+    """
+
+    release_date: Optional[str] = None
+    vote_average: Optional[float] = None
+    vote_count: Optional[int] = None
+    poster_path: Optional[str] = None
+    genre_ids: Optional[List[int]] = None
+    genres: Optional[List[Genre]] = None
+
+
+# named views for the view= query parameter, "full" returns movies unchanged
+MOVIE_VIEWS = {"title": MovieTitle, "card": MovieCard}
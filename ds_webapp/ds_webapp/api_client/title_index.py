@@ -0,0 +1,271 @@
+"""
+A file containing a sorted prefix index over the movie titles seen so far
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Tuple
+
+# prefixes up to this length are answered from a bucket kept by popularity,
+# they match too many titles to rank on every keystroke
+SHORT_PREFIX = 2
+# longer prefixes matching more keys than this walk the bucket of their first
+# SHORT_PREFIX characters by popularity instead of ranking every match
+MAX_SCAN = 512
+# movies added per hold of the lock, so suggestions never wait for a whole batch
+CHUNK = 32
+# a batch of keys is inserted into (deleted from) a sorted array one by one
+# while the array holds more than FEW times as many keys
+FEW = 64
+
+
+def normalize_title(title: str) -> str:
+    """
+    Lowercase a title, strip accents and collapse punctuation to single spaces
+    """
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.findall(r"[^\W_]+", stripped.lower()))
+
+
+def word_suffixes(normalized: str) -> List[str]:
+    """
+    Returns the title from each word on, so that "potter" finds "harry potter"
+    """
+    words = normalized.split(" ")
+    return [" ".join(words[position:]) for position in range(len(words))]
+
+
+def short_prefixes(suffixes: List[str]) -> List[str]:
+    """
+    Returns the distinct prefixes of up to SHORT_PREFIX characters of the suffixes
+    """
+    return list(
+        {
+            suffix[:length]
+            for suffix in suffixes
+            for length in range(1, min(SHORT_PREFIX, len(suffix)) + 1)
+        }
+    )
+
+
+def merge(keys: list, new_keys: list) -> None:
+    """
+    Merge new_keys into the sorted list keys in place: one by one while they are
+    few compared to keys, else appended and sorted with keys
+    """
+    if len(new_keys) * FEW > len(keys):
+        keys.extend(new_keys)
+        keys.sort()
+    else:
+        for key in new_keys:
+            insort(keys, key)
+
+
+def delete(keys: list, stale_keys: list) -> None:
+    """
+    Delete stale_keys, which must be present, from the sorted list keys in place:
+    one by one while they are few compared to keys, else by filtering keys
+    """
+    if len(stale_keys) * FEW > len(keys):
+        stale = set(stale_keys)
+        keys[:] = [key for key in keys if key not in stale]
+    else:
+        for key in stale_keys:
+            del keys[bisect_left(keys, key)]
+
+
+class TitleIndex:
+    """
+    A class keeping (title suffix, movie_id) pairs in a sorted array, so that all
+    titles with a word starting with a prefix are one bisect and a scan away.
+    Short prefixes, which match a large part of the titles, are answered from
+    per-prefix buckets of (-popularity, movie_id) pairs in a sorted array instead,
+    so a suggestion never ranks more than the requested number of movies.
+    """
+
+    def __init__(self, max_entries: int = 50_000):
+        """
+        :param max_entries: bound on the number of movies, the least popular are evicted first
+        """
+        self.max_entries = max_entries
+        self._keys: List[Tuple[str, int]] = []
+        self._buckets: Dict[str, List[Tuple[float, int]]] = {}
+        # movie_id -> (popularity, suffixes, short prefixes, suggestion)
+        self._movies: Dict[
+            int, Tuple[float, List[str], List[str], Dict[str, Any]]
+        ] = {}
+        # (popularity, movie_id) min-heap, entries of updated movies are skipped lazily
+        self._by_popularity: List[Tuple[float, int]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    def add(self, movie: Dict[str, Any]) -> None:
+        """
+        Add (or update) a movie from a TMDB list result
+        """
+        self.add_many([movie])
+
+    def add_many(self, movies: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add (or update) many movies from TMDB list results, movies without a title
+        are skipped. Movies indexed under the same title only have their popularity
+        and suggestion updated. New keys are merged into the sorted arrays a chunk
+        of movies at a time.
+        """
+        entries = {}
+        for movie in movies or ():
+            movie_id = movie.get("id")
+            normalized = normalize_title(movie.get("title"))
+            if movie_id is not None and normalized:
+                entries[movie_id] = (normalized, movie)
+        if not entries:
+            return
+
+        items = list(entries.items())
+        for start in range(0, len(items), CHUNK):
+            with self._lock:
+                self._add_chunk(items[start : start + CHUNK])
+
+    def _add_chunk(self, items: List[Tuple[int, Tuple[str, Dict[str, Any]]]]) -> None:
+        """
+        Add (or update) (movie_id, (normalized title, list result)) items,
+        the lock must be held
+        """
+        new_keys: List[Tuple[str, int]] = []
+        new_ranks: Dict[str, List[Tuple[float, int]]] = {}
+        for movie_id, (normalized, movie) in items:
+            popularity = movie.get("popularity") or 0.0
+            suggestion = {
+                "id": movie_id,
+                "title": movie.get("title"),
+                "release_date": movie.get("release_date") or None,
+                "popularity": popularity,
+            }
+            old = self._movies.get(movie_id)
+            if old is not None and old[1][0] == normalized:
+                if old[0] != popularity:
+                    self._rerank(movie_id, old[0], popularity, old[2])
+                self._movies[movie_id] = (popularity, old[1], old[2], suggestion)
+                continue
+
+            self._remove_many([movie_id])
+            suffixes = word_suffixes(normalized)
+            prefixes = short_prefixes(suffixes)
+            new_keys.extend((suffix, movie_id) for suffix in suffixes)
+            for prefix in prefixes:
+                new_ranks.setdefault(prefix, []).append((-popularity, movie_id))
+            self._movies[movie_id] = (popularity, suffixes, prefixes, suggestion)
+            heapq.heappush(self._by_popularity, (popularity, movie_id))
+
+        merge(self._keys, new_keys)
+        for prefix, ranks in new_ranks.items():
+            merge(self._buckets.setdefault(prefix, []), ranks)
+        self._evict()
+
+    def _rerank(
+        self, movie_id: int, old: float, popularity: float, prefixes: List[str]
+    ) -> None:
+        """
+        Move a movie to its new popularity in its buckets, the lock must be held
+        """
+        for prefix in prefixes:
+            bucket = self._buckets[prefix]
+            del bucket[bisect_left(bucket, (-old, movie_id))]
+            insort(bucket, (-popularity, movie_id))
+        heapq.heappush(self._by_popularity, (popularity, movie_id))
+
+    def _remove_many(self, movie_ids: List[int]) -> None:
+        """
+        Remove movies, the lock must be held
+        """
+        removed = []
+        for movie_id in movie_ids:
+            entry = self._movies.pop(movie_id, None)
+            if entry is not None:
+                removed.append((movie_id, entry))
+        if not removed:
+            return
+
+        stale_keys = [
+            (suffix, movie_id) for movie_id, entry in removed for suffix in entry[1]
+        ]
+        delete(self._keys, stale_keys)
+
+        stale_ranks: Dict[str, List[Tuple[float, int]]] = {}
+        for movie_id, (popularity, _, prefixes, _) in removed:
+            for prefix in prefixes:
+                stale_ranks.setdefault(prefix, []).append((-popularity, movie_id))
+        for prefix, ranks in stale_ranks.items():
+            bucket = self._buckets[prefix]
+            delete(bucket, ranks)
+            if not bucket:
+                del self._buckets[prefix]
+
+    def _evict(self) -> None:
+        """
+        Remove the least popular movies until max_entries fit, the lock must be held
+        """
+        evicted: Dict[int, None] = {}
+        while len(self._movies) - len(evicted) > self.max_entries:
+            popularity, movie_id = heapq.heappop(self._by_popularity)
+            entry = self._movies.get(movie_id)
+            if entry is not None and entry[0] == popularity:
+                evicted[movie_id] = None
+        self._remove_many(list(evicted))
+
+        # drop the stale heap entries once they outnumber the live ones
+        if len(self._by_popularity) > 2 * len(self._movies) + 1024:
+            self._by_popularity = [
+                (entry[0], movie_id) for movie_id, entry in self._movies.items()
+            ]
+            heapq.heapify(self._by_popularity)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns up to limit movies with a title word starting with prefix,
+        most popular first
+        """
+        normalized = normalize_title(prefix)
+        if not normalized:
+            return []
+
+        with self._lock:
+            if len(normalized) <= SHORT_PREFIX:
+                best = [
+                    movie_id
+                    for _, movie_id in self._buckets.get(normalized, [])[:limit]
+                ]
+            else:
+                best = self._suggest_long(normalized, limit)
+            return [dict(self._movies[movie_id][3]) for movie_id in best]
+
+    def _suggest_long(self, normalized: str, limit: int) -> List[int]:
+        """
+        Returns the ids of up to limit movies matching a prefix longer than
+        SHORT_PREFIX, most popular first, the lock must be held
+        """
+        start = bisect_left(self._keys, (normalized,))
+        # every key starting with normalized sorts below normalized + the last code point
+        end = bisect_left(self._keys, (normalized + "\U0010ffff",), lo=start)
+        if end - start <= MAX_SCAN:
+            matches = {movie_id for _, movie_id in self._keys[start:end]}
+            return heapq.nlargest(
+                limit, matches, key=lambda movie_id: self._movies[movie_id][0]
+            )
+
+        # many matches: the bucket of the shorter prefix meets them early on
+        best = []
+        for _, movie_id in self._buckets.get(normalized[:SHORT_PREFIX], []):
+            if any(
+                suffix.startswith(normalized) for suffix in self._movies[movie_id][1]
+            ):
+                best.append(movie_id)
+                if len(best) == limit:
+                    break
+        return best
@@ -3,198 +3,118 @@ A file containing methods that call The Movie Database API
 """
 
 import os
-from typing import Any, List
+from typing import Any
 
-import requests
 from flask.cli import load_dotenv
 
+from ds_webapp.api_client.http_client import TMDBClient, TMDBError
+from ds_webapp.api_client.runtime_index import RuntimeIndex
 from ds_webapp.api_client.schemas import Movie
-from ds_webapp.api_client.utils import take_genre_set_difference
+from ds_webapp.api_client.title_index import TitleIndex
+from ds_webapp.cache.cache import cached
+from ds_webapp.json_backend import loads
 
 load_dotenv()
 
 API_URL = os.getenv("API_URL")
 API_KEY = os.getenv("API_KEY")
 
+client = TMDBClient(API_URL, API_KEY)
 
-def get_popular_movies() -> list[Any] | tuple[dict[str, str], int]:
-    """
-    Request a list of the n most popular movies,
-    :param n: an int
-    :precondition: 1 <= n <= 20
-    :return:
-    """
-
-    headers = {"accept": "application/json", "Authorization": API_KEY}
-
-    params = {"language": "en-US"}
-
-    response = requests.get(
-        f"{API_URL}/movie/popular", headers=headers, params=params, timeout=5
-    )
+# cache ttls in seconds
+GENRES_TTL = 24 * 3600
+POPULAR_TTL = 3600
+SEARCH_TTL = 3600
+DETAILS_TTL = 6 * 3600
+DISCOVER_TTL = 3600
 
-    if response.status_code == 200:
-        return response.json().get("results")
+# loaded from the catalog movies with a known runtime when a worker starts
+# (endpoints.warm_runtime_index), and filled with every movie whose details pass
+# through get_movie_details
+runtime_index = RuntimeIndex(
+    max_entries=int(os.getenv("RUNTIME_INDEX_MAX_ENTRIES", "50000")),
+    min_results=int(os.getenv("RUNTIME_INDEX_MIN_RESULTS", "10")),
+)
+DEFAULT_RUNTIME_TOLERANCE = 10
 
-    raise response
+# filled with every movie that passes through search_movie and get_popular_movies
+title_index = TitleIndex(max_entries=int(os.getenv("TITLE_INDEX_MAX_ENTRIES", "50000")))
 
 
-def search_movie(title: str) -> list[Movie] | tuple[dict[str, str | int], int]:
+@cached("popular", ttl=POPULAR_TTL)
+def get_popular_movies(page: int = 1) -> list[Any] | tuple[dict[str, str], int]:
     """
-    Search for movie in MovieDB
-    :param title: movie title
+    Request a page of the most popular movies
+    :param page: TMDB page, 20 movies each
     :return:
     """
 
-    headers = {"accept": "application/json", "Authorization": API_KEY}
+    params = {"language": "en-US", "page": page}
 
-    params = {"language": "en-US", "query": title}
-
-    response = requests.get(
-        f"{API_URL}/search/movie", headers=headers, params=params, timeout=5
-    )
+    response = client.get("/movie/popular", params=params)
 
     if response.status_code == 200:
-        return response.json().get("results")
+        results = loads(response.content).get("results")
+        title_index.add_many(results)
+        return results
 
-    raise response
+    raise TMDBError(response)
 
 
-def search_movies_with_genres(
-    genres_to_include: str, genres_to_exclude: str
-) -> list[Any] | tuple[dict[str, str], int]:
+@cached("search", ttl=SEARCH_TTL)
+def search_movie(
+    title: str, page: int = 1
+) -> list[Movie] | tuple[dict[str, str | int], int]:
     """
     Search for movie in MovieDB
-    :param genres_to_exclude: list of genre ids to exclude
-    :param genres_to_include: list of genre ids to include
+    :param title: movie title
+    :param page: TMDB page, 20 movies each
     :return:
     """
 
-    headers = {"accept": "application/json", "Authorization": API_KEY}
-
-    params = {
-        "language": "en-US",
-        "with_genres": genres_to_include,
-        "without_genres": genres_to_exclude,
-    }
+    params = {"language": "en-US", "query": title, "page": page}
 
-    response = requests.get(
-        f"{API_URL}/discover/movie", headers=headers, params=params, timeout=5
-    )
+    response = client.get("/search/movie", params=params)
 
     if response.status_code == 200:
-        return response.json().get("results")
+        results = loads(response.content).get("results")
+        title_index.add_many(results)
+        return results
 
-    raise response
+    raise TMDBError(response)
 
 
+@cached("genres", ttl=GENRES_TTL)
 def get_movie_genres() -> list[Any] | tuple[dict[str, str], int]:
     """
      Get all movie genres from MovieDB
     :return:
     """
 
-    headers = {"accept": "application/json", "Authorization": API_KEY}
-
     params = {"language": "en-US"}
 
-    response = requests.get(
-        f"{API_URL}/genre/movie/list", headers=headers, params=params, timeout=5
-    )
+    response = client.get("/genre/movie/list", params=params)
 
     if response.status_code == 200:
-        return response.json().get("genres")
-
-    raise response
-
-
-def get_movies_with_same_genres(movie_title: str) -> List[Any]:
-    """
-    Given a movie title, returns movies that share the same genres.
-    """
-    genres = get_movie_genres()
-    search_result = search_movie(movie_title)
-
-    if not search_result:
-        return []
+        return loads(response.content).get("genres")
 
-    genres_to_include = search_result[0].get("genre_ids")
-    if genres_to_include is None or not genres:
-        return []
-
-    genres_to_exclude = take_genre_set_difference(genres, genres_to_include)
-
-    return search_movies_with_genres(
-        ",".join(str(genre_id) for genre_id in genres_to_include),
-        ",".join(str(genre_id) for genre_id in genres_to_exclude),
-    )
+    raise TMDBError(response)
 
 
+@cached("details", ttl=DETAILS_TTL)
 def get_movie_details(movie_id: int) -> dict[str, int | str | None]:
     """
     Get detail info about movie from movie_db
     :param movie_id: unique id of movie
     """
 
-    headers = {"accept": "application/json", "Authorization": API_KEY}
-
     params = {"language": "en-US"}
 
-    response = requests.get(
-        f"{API_URL}/movie/{movie_id}", headers=headers, params=params, timeout=5
-    )
-
-    if response.status_code == 200:
-
-        return response.json()
-
-    raise response
-
-
-def search_movies_with_duration(min_duration: int, max_duration: int) -> list[Movie]:
-    """
-     Get movies from MovieDB with a duration: min_duration <= duration <= max_duration
-     :param min_duration: minimum duration
-     :param max_duration: maximum duration
-    :return:
-    """
-
-    headers = {"accept": "application/json", "Authorization": API_KEY}
-
-    params = {
-        "language": "en-US",
-        "with_runtime.gte": min_duration,
-        "with_runtime.lte": max_duration,
-    }
-
-    response = requests.get(
-        f"{API_URL}/discover/movie", headers=headers, params=params, timeout=5
-    )
+    response = client.get(f"/movie/{movie_id}", params=params)
 
     if response.status_code == 200:
+        details = loads(response.content)
+        runtime_index.add(details)
+        return details
 
-        return response.json().get("results")
-
-    raise response
-
-
-def get_movies_with_similar_runtime(movie_title: str) -> List[Any]:
-    """
-    Given a movie title, return movies with a runtime within +/- 10 minutes.
-    """
-    search_result = search_movie(movie_title)
-    if not search_result:
-        return []
-
-    movie_id = search_result[0].get("id")
-    if movie_id is None:
-        return []
-
-    details = get_movie_details(movie_id)
-    if not details or details.get("runtime") is None:
-        return []
-
-    duration = details["runtime"]
-    return search_movies_with_duration(
-        min_duration=duration - 10, max_duration=duration + 10
-    )
+    raise TMDBError(response)
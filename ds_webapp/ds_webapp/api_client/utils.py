@@ -2,7 +2,8 @@
 A file with utils to create and parse responses
 """
 
-from typing import Union, List, Dict
+from typing import Dict, List, Union
+
 from ds_webapp.api_client.schemas import Movie
 
 
@@ -48,13 +49,43 @@ def take_genre_set_difference(
     genre_list: List[Dict[str, Union[str, int]]], to_exclude: List[int]
 ) -> list[int]:
     """
-    Takes list of all possible genres and excludes genres listed in to_exlude
+    Takes list of all possible genres and excludes genres listed in to_exclude
     :param genre_list: list of all possible genres
     :param to_exclude: genres to exclude from list
-    :return:
+    :return: the remaining genre ids, in genre list order
+    """
+    to_exclude = set(to_exclude)
+    return [genre["id"] for genre in genre_list if genre["id"] not in to_exclude]
+
+
+def same_genre_filters(
+    genre_list: List[Dict[str, Union[str, int]]], search_result: list[dict]
+) -> tuple[str, str] | None:
+    """
+    Builds the discover filters matching movies with exactly the genres of the first search result
+    :param genre_list: list of all possible genres
+    :param search_result: movie search results
+    :return: comma separated genre ids to include and to exclude, or None
+    """
+    if not search_result:
+        return None
+
+    genres_to_include = search_result[0].get("genre_ids")
+    if genres_to_include is None or not genre_list:
+        return None
+
+    genres_to_exclude = take_genre_set_difference(genre_list, genres_to_include)
+
+    return (
+        ",".join(str(genre_id) for genre_id in genres_to_include),
+        ",".join(str(genre_id) for genre_id in genres_to_exclude),
+    )
+
+
+def first_result_id(search_result: list[dict]) -> int | None:
+    """
+    Returns the id of the first movie in search_result, or None
     """
-    result = []
-    for genre in genre_list:
-        if genre["id"] not in to_exclude:
-            result.append(genre["id"])
-    return result
+    if not search_result:
+        return None
+    return search_result[0].get("id")
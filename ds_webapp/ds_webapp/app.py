@@ -10,19 +10,24 @@ from flask_restful import Api
 from flask_cors import CORS
 
 import ds_webapp.api
+from ds_webapp.json_backend import JSONProvider
+from ds_webapp.responses import finalize_response
 
 load_dotenv()
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
 CORS(
     app,
     resources={r"/*": {"origins": "*"}},
     supports_credentials=True,
     methods=["GET", "POST", "OPTIONS", "DELETE"],
     allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["X-Next-Cursor", "X-Next-After"],
 )
 
 api = Api(app)
+app.after_request(finalize_response)
 
 # Configuring Swagger
 app.config["SWAGGER"] = {
@@ -0,0 +1,298 @@
+"""
+A file containing the ASGI app: the endpoints in endpoints.py that wait on TMDB
+or the database, awaited on the server's event loop, so one worker multiplexes
+many slow upstream requests without a thread each.
+
+The routes come from the same add_endpoints call as the Flask app. Resources
+without a shared endpoint (users, login, favorite changes, swagger) are served
+by the Flask app through a thread pool, sharing the event loop for their queries.
+
+Run with: poetry run serve --asgi
+"""
+
+import asyncio
+import contextlib
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.background import BackgroundTasks
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from ds_webapp import endpoints
+from ds_webapp.api import (
+    FavoriteMovies,
+    MostPopular,
+    MoviesWithSameGenres,
+    MoviesWithSimilarRuntime,
+    SearchMovie,
+    SuggestMovie,
+    add_endpoints,
+)
+from ds_webapp.api_client import async_tmdb_client, tmdb_client
+from ds_webapp.authentication.authentication import authenticate
+from ds_webapp.background_loop import get_background_loop, submit_coroutine
+from ds_webapp.bridge import db
+from ds_webapp.endpoints import Result, warm_runtime_index
+from ds_webapp.json_backend import dumps
+from ds_webapp.responses import negotiate
+
+logger = logging.getLogger(__name__)
+
+# seconds the app waits for its DB pool at startup before serving without it
+STARTUP_TIMEOUT = 10
+# threads serving the resources without a shared endpoint
+WSGI_THREADS = 8
+
+# flask converters and their starlette counterparts
+ROUTE_PARAMETER = re.compile(r"<(?:(\w+):)?(\w+)>")
+CONVERTERS = {"string": "str", "int": "int", "float": "float", "path": "path"}
+
+AsyncView = Callable[[Request], Awaitable[Response]]
+
+
+def json_response(
+    request: Request,
+    result: Result,
+    background: Optional[BackgroundTasks] = None,
+) -> Response:
+    """
+    Returns the body, status and headers of an endpoint as a JSON response,
+    successful ones with an ETag and compressed like the Flask app's
+    (see responses.finalize_response)
+    """
+    body, status, headers = result
+    content = dumps(body)
+    headers = dict(headers)
+    media_type = "application/json"
+    if status == 200:
+        status, content, negotiated = negotiate(
+            content,
+            media_type,
+            request.headers.get("Accept-Encoding"),
+            request.headers.get("If-None-Match"),
+        )
+        headers.update(negotiated)
+        if status == 304:
+            media_type = None
+    return Response(
+        content,
+        status_code=status,
+        headers=headers,
+        media_type=media_type,
+        background=background,
+    )
+
+
+async def wait_for(coroutine: Awaitable[Any]) -> None:
+    """
+    Await a coroutine deferred by an endpoint
+    """
+    await coroutine
+
+
+def after_response(background: BackgroundTasks) -> endpoints.Defer:
+    """
+    Returns the defer of an endpoint whose coroutines run once the response is sent
+    """
+    return lambda coroutine: background.add_task(wait_for, coroutine)
+
+
+def jwt_required(view: AsyncView) -> AsyncView:
+    """
+    The async counterpart of authentication.jwt_required,
+    stores the verified token payload in request.state.user
+    """
+
+    async def wrapper(request: Request) -> Response:
+        user, error = authenticate(request.headers.get("Authorization", ""))
+        if error is not None:
+            return json_response(request, endpoints.error(error, 401))
+        request.state.user = user
+        return await view(request)
+
+    return wrapper
+
+
+@jwt_required
+async def most_popular(request: Request) -> Response:
+    """
+    Serves endpoints.most_popular
+    """
+    result = await endpoints.most_popular(
+        request.path_params.get("n", 1), request.query_params
+    )
+    return json_response(request, result)
+
+
+@jwt_required
+async def movies_with_same_genres(request: Request) -> Response:
+    """
+    Serves endpoints.movies_with_same_genres
+    """
+    result = await endpoints.movies_with_same_genres(
+        request.path_params["movie"], request.query_params
+    )
+    return json_response(request, result)
+
+
+@jwt_required
+async def movies_with_similar_runtime(request: Request) -> Response:
+    """
+    Serves endpoints.movies_with_similar_runtime
+    """
+    result = await endpoints.movies_with_similar_runtime(
+        request.path_params["movie"], request.query_params
+    )
+    return json_response(request, result)
+
+
+@jwt_required
+async def search(request: Request) -> Response:
+    """
+    Serves endpoints.search
+    """
+    background = BackgroundTasks()
+    result = await endpoints.search(
+        request.path_params["title"],
+        request.query_params,
+        defer=after_response(background),
+    )
+    return json_response(request, result, background)
+
+
+@jwt_required
+async def suggest(request: Request) -> Response:
+    """
+    Serves endpoints.suggest
+    """
+    result = endpoints.suggest(request.path_params["prefix"], request.query_params)
+    return json_response(request, result)
+
+
+@jwt_required
+async def favorite_movies(request: Request) -> Response:
+    """
+    Serves endpoints.favorite_movies
+    """
+    background = BackgroundTasks()
+    result = await endpoints.favorite_movies(
+        request.state.user, request.query_params, defer=after_response(background)
+    )
+    return json_response(request, result, background)
+
+
+# the resources served natively, by method
+ASYNC_VIEWS: Dict[type, Dict[str, AsyncView]] = {
+    MostPopular: {"GET": most_popular},
+    MoviesWithSameGenres: {"GET": movies_with_same_genres},
+    MoviesWithSimilarRuntime: {"GET": movies_with_similar_runtime},
+    SearchMovie: {"GET": search},
+    SuggestMovie: {"GET": suggest},
+    FavoriteMovies: {"GET": favorite_movies},
+}
+
+
+def to_starlette_path(rule: str) -> str:
+    """
+    Returns a Flask url rule (/movies/<int:n>) as a Starlette path (/movies/{n:int})
+    """
+
+    def parameter(match: re.Match) -> str:
+        converter = CONVERTERS.get(match.group(1) or "string", "str")
+        return f"{{{match.group(2)}:{converter}}}"
+
+    return ROUTE_PARAMETER.sub(parameter, rule)
+
+
+def route_order(path: str) -> List[bool]:
+    """
+    Returns a sort key putting static path segments before parameters at each
+    position, so /movies/favorite is matched before /movies/{title} like in Flask
+    """
+    return [segment.startswith("{") for segment in path.split("/")]
+
+
+class AsyncRoutes:
+    """
+    Collects the routes add_endpoints registers, standing in for a Flask-RESTful Api
+    """
+
+    def __init__(self, views: Dict[type, Dict[str, AsyncView]]):
+        self.views = views
+        self.routes: List[Route] = []
+
+    def add_resource(self, resource: type, *urls: str, **_kwargs) -> None:
+        """
+        Register the async views of resource for each url, resources without
+        any are left to the Flask app
+        """
+        for method, view in self.views.get(resource, {}).items():
+            for url in urls:
+                self.routes.append(
+                    Route(to_starlette_path(url), view, methods=[method])
+                )
+
+    def sorted_routes(self) -> List[Route]:
+        """
+        Returns the collected routes, the most specific paths first
+        """
+        return sorted(self.routes, key=lambda route: route_order(route.path))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app: Starlette):
+    """
+    Share the server's event loop with the sync code, so the DB pool and the TMDB
+    client are created once on it, load the runtime index from the catalog, and
+    close them on shutdown
+    """
+    get_background_loop().attach(asyncio.get_running_loop())
+    async_tmdb_client.ensure_genres_warm()
+    try:
+        await asyncio.wait_for(db.create_pool(), timeout=STARTUP_TIMEOUT)
+        submit_coroutine(warm_runtime_index())
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # the pool is created on first use instead
+        logger.warning("Started without a DB pool: %s", e)
+    try:
+        yield
+    finally:
+        await async_tmdb_client.client.close()
+        await db.close()
+        tmdb_client.client.close()
+        get_background_loop().detach()
+
+
+def create_app(wsgi_threads: int = WSGI_THREADS) -> Starlette:
+    """
+    Returns the ASGI app serving the routes of ds_webapp.app
+    """
+    # pylint: disable=import-outside-toplevel
+    from ds_webapp.app import app as flask_app
+
+    routes = AsyncRoutes(ASYNC_VIEWS)
+    add_endpoints(routes)
+    return Starlette(
+        routes=[
+            *routes.sorted_routes(),
+            Mount("/", app=WSGIMiddleware(flask_app, workers=wsgi_threads)),
+        ],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=["*"],
+                allow_credentials=True,
+                allow_methods=["GET", "POST", "OPTIONS", "DELETE"],
+                allow_headers=["Content-Type", "Authorization"],
+                expose_headers=["X-Next-Cursor", "X-Next-After"],
+            )
+        ],
+        lifespan=lifespan,
+    )
@@ -2,9 +2,14 @@
 A file for JWT authentication
 """
 
+from collections import OrderedDict
 from functools import wraps
+import hashlib
 import os
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
 from dotenv import load_dotenv
 from flask import request
 import jwt
@@ -15,26 +20,138 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 
 
+class TokenCache:
+    """
+    A bounded cache of verified token payloads, keyed by the token digest.
+    Entries expire with the token (its exp claim), the least recently used
+    entry is evicted when the cache is full.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("JWT_CACHE_MAX_ENTRIES", "4096"))
+        )
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        """
+        Returns the cache key of a token, tokens are not kept in memory
+        """
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Returns a copy of the payload of a verified, unexpired token, None otherwise
+        """
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(payload)
+
+    def set(self, token: str, payload: dict) -> None:
+        """
+        Store the payload of a verified token until its exp claim,
+        tokens without one are not cached
+        """
+        if self.max_entries <= 0 or "exp" not in payload:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (dict(payload), float(payload["exp"]))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        """
+        Removes a token from the cache
+        """
+        with self._lock:
+            self._entries.pop(self.key(token), None)
+
+    def clear(self) -> None:
+        """
+        Removes all tokens
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+# returns whether a verified token (given with its payload) was revoked
+RevocationHook = Callable[[str, dict], bool]
+_REVOCATION_HOOK: Optional[RevocationHook] = None
+
+
+def set_revocation_hook(hook: Optional[RevocationHook]) -> None:
+    """
+    Install a hook that is asked about every verified token, cached or not,
+    and rejects it by returning True (e.g. a denylist lookup). None removes it.
+    """
+    global _REVOCATION_HOOK  # pylint: disable=global-statement
+    _REVOCATION_HOOK = hook
+
+
 def create_jwt_token(payload: dict) -> str:
     """
     Create and return a JWT token
     """
-    payload["exp"] = datetime.now() + timedelta(hours=3)
+    # aware, pyjwt reads naive datetimes as UTC
+    payload["iat"] = datetime.now(timezone.utc)
+    payload["exp"] = payload["iat"] + timedelta(hours=3)
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
 
 def verify_jwt_token(token):
     """
-    A function that returns wether token is valid
+    A function that returns the payload of a valid token, False otherwise.
+    Verified tokens are cached until they expire, so repeated requests with
+    the same token skip the signature check.
     """
-    try:
-        decoded_payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return decoded_payload
-    except jwt.ExpiredSignatureError:
-        return False
-    except jwt.InvalidTokenError:
+    decoded_payload = token_cache.get(token)
+    if decoded_payload is None:
+        try:
+            decoded_payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            return False
+        except jwt.InvalidTokenError:
+            return False
+        token_cache.set(token, decoded_payload)
+
+    if _REVOCATION_HOOK is not None and _REVOCATION_HOOK(token, decoded_payload):
+        token_cache.invalidate(token)
         return False
+    return decoded_payload
+
+
+def authenticate(auth_header: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Returns the payload of the bearer token in an Authorization header and None,
+    or None and the body of the 401 response to send
+    """
+    if not auth_header.startswith("Bearer "):
+        return None, {"error": auth_header}
+    token = auth_header.split(" ")[1]
+    user_data = verify_jwt_token(token)
+    if not user_data:
+        return None, {"error": "Unauthorized"}
+    return user_data, None
 
 
 def jwt_required(func):
@@ -45,15 +162,10 @@ def jwt_required(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        auth_header = request.headers.get("Authorization", "")
-        if not auth_header.startswith("Bearer "):
-            return {"error": auth_header}, 401
-        token = auth_header.split(" ")[1]
-        try:
-            user_data = verify_jwt_token(token)
-            request.user = user_data
-        except ValueError:
-            return {"error": "Unauthorized"}, 401
+        user_data, error = authenticate(request.headers.get("Authorization", ""))
+        if error is not None:
+            return error, 401
+        request.user = user_data
         return func(*args, **kwargs)
 
     return wrapper
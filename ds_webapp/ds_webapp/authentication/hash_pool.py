@@ -0,0 +1,146 @@
+"""
+A file containing the pool password hashes are computed on.
+
+bcrypt is slow on purpose and releases the GIL while hashing, so hashes run on a
+few dedicated threads instead of the request path. The pool accepts a bounded
+number of waiting hashes and rejects the rest, so a login spike is answered with
+429s instead of piling up requests that time out anyway.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# seconds a rejected client is asked to wait before retrying
+RETRY_AFTER = 1
+
+
+class HashPoolBusy(Exception):
+    """
+    Raised when the hash pool has no room for another hash
+    """
+
+
+class HashPool:  # pylint: disable=too-many-instance-attributes
+    """
+    A class running password hashes on a bounded thread pool and timing them.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None):
+        """
+        :param workers: threads hashing concurrently (HASH_WORKERS, default one per CPU)
+        :param max_queue: hashes that may wait for a thread (HASH_MAX_QUEUE,
+            default 4 per worker), more are rejected with HashPoolBusy
+        """
+        self.workers = workers or int(os.getenv("HASH_WORKERS", str(os.cpu_count())))
+        self.max_queue = (
+            max_queue
+            if max_queue is not None
+            else int(os.getenv("HASH_MAX_QUEUE", str(4 * self.workers)))
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="hash-pool"
+        )
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        # per operation: number of hashes and total/max seconds spent hashing
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.queue_seconds = 0.0
+
+    async def run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) on the pool and return its result
+        :param operation: name the timing is recorded under, e.g. "hash" or "verify"
+        :raises HashPoolBusy: when all threads are busy and the queue is full
+        """
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashPoolBusy(f"{self.pending} hashes pending")
+            self.pending += 1
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._record(operation, submitted, started, time.perf_counter())
+
+        future = self.executor.submit(timed)
+        # released when the hash is done, even if the caller stopped waiting for it
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future) -> None:
+        """
+        Free the room of a finished (or cancelled) hash
+        """
+        with self._lock:
+            self.pending -= 1
+
+    def _record(
+        self, operation: str, submitted: float, started: float, finished: float
+    ) -> None:
+        """
+        Add one hash to the timings of operation
+        """
+        elapsed = finished - started
+        with self._lock:
+            timing = self.timings.setdefault(
+                operation, {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+            )
+            timing["count"] += 1
+            timing["seconds"] += elapsed
+            timing["max_seconds"] = max(timing["max_seconds"], elapsed)
+            self.queue_seconds += started - submitted
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the pending and rejected hashes, the mean time hashes waited for a
+        thread and the count, mean and max latency of each operation in ms
+        """
+        with self._lock:
+            count = sum(timing["count"] for timing in self.timings.values())
+            stats = {
+                "pending": self.pending,
+                "rejected": self.rejected,
+                "queue_mean_ms": 1000 * self.queue_seconds / count if count else 0.0,
+            }
+            for operation, timing in self.timings.items():
+                stats[f"{operation}_count"] = timing["count"]
+                stats[f"{operation}_mean_ms"] = (
+                    1000 * timing["seconds"] / timing["count"]
+                )
+                stats[f"{operation}_max_ms"] = 1000 * timing["max_seconds"]
+            return stats
+
+    def shutdown(self) -> None:
+        """
+        Stop the threads once the hashes already submitted are done
+        """
+        self.executor.shutdown(wait=True)
+
+
+_HASH_POOL: Optional[HashPool] = None
+_HASH_POOL_PID: Optional[int] = None
+_HASH_POOL_LOCK = threading.Lock()
+
+
+def get_hash_pool() -> HashPool:
+    """
+    Returns the hash pool of the current process, a forked worker creates its own
+    """
+    global _HASH_POOL, _HASH_POOL_PID  # pylint: disable=global-statement
+
+    pid = os.getpid()
+    with _HASH_POOL_LOCK:
+        if _HASH_POOL is None or _HASH_POOL_PID != pid:
+            _HASH_POOL = HashPool()
+            _HASH_POOL_PID = pid
+        return _HASH_POOL
@@ -0,0 +1,198 @@
+"""
+A file containing a long-lived asyncio event loop running in a background thread.
+
+Sync code (e.g. Flask handlers) submits coroutines to it, so objects bound to
+an event loop (connection pools, async HTTP clients) survive across requests.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def log_failure(future: Future):
+    """
+    Log the exception of a finished coroutine nobody waits for.
+    """
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Background coroutine failed", exc_info=future.exception())
+
+
+class BackgroundLoop:
+    """
+    A class owning an asyncio event loop that runs forever in a daemon thread.
+    """
+
+    def __init__(self, name: str = "ds-webapp-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+        # False while the loop of an async server is attached instead of our own
+        self._owned = True
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the loop thread if it is not running yet and return the loop.
+        """
+        with self._lock:
+            if self.is_running():
+                return self.loop
+
+            self._started.clear()
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=self._run_forever, name=self.name, daemon=True
+            )
+            self.thread.start()
+            self._started.wait()
+            return self.loop
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """
+        Use a loop running in the calling thread (e.g. an ASGI server's) instead of
+        starting one, so coroutines submitted from sync code share its pools.
+        """
+        with self._lock:
+            if self._owned and self.is_running():
+                raise RuntimeError("BackgroundLoop is already running its own loop")
+            self.loop = loop
+            self.thread = threading.current_thread()
+            self._owned = False
+
+    def detach(self):
+        """
+        Forget an attached loop, the next start() creates our own again.
+        """
+        with self._lock:
+            if not self._owned:
+                self.loop = None
+                self.thread = None
+                self._owned = True
+
+    def _run_forever(self):
+        """
+        Thread target: run the loop until stop() is called.
+        """
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def is_running(self) -> bool:
+        """
+        Returns whether the loop thread is alive.
+        """
+        return (
+            self.loop is not None
+            and not self.loop.is_closed()
+            and self.thread is not None
+            and self.thread.is_alive()
+        )
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the background loop and block until it finishes.
+
+        :param coroutine: the coroutine to run
+        :param timeout: seconds to wait before the coroutine is cancelled
+        :raises TimeoutError: when the coroutine did not finish in time
+        """
+        if self.is_running() and threading.current_thread() is self.thread:
+            raise RuntimeError("BackgroundLoop.run() called from its own loop thread")
+
+        loop = self.start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError as e:
+            future.cancel()
+            raise TimeoutError(
+                f"Coroutine did not finish within {timeout} seconds"
+            ) from e
+        except BaseException:
+            # e.g. KeyboardInterrupt while waiting, don't leave the task running
+            future.cancel()
+            raise
+
+    def submit(self, coroutine: Awaitable) -> Future:
+        """
+        Schedule a coroutine on the background loop without waiting for it,
+        its exception (if any) is logged since nobody may read the future.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.start())
+        future.add_done_callback(log_failure)
+        return future
+
+    def stop(self, timeout: Optional[float] = 5):
+        """
+        Cancel pending tasks, stop the loop and join its thread.
+        An attached loop belongs to its server and is only detached.
+        """
+        if not self._owned:
+            self.detach()
+            return
+        with self._lock:
+            if not self.is_running():
+                return
+
+            async def cancel_pending():
+                tasks = [
+                    task
+                    for task in asyncio.all_tasks()
+                    if task is not asyncio.current_task()
+                ]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            asyncio.run_coroutine_threadsafe(cancel_pending(), self.loop).result(
+                timeout=timeout
+            )
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=timeout)
+
+
+_BACKGROUND_LOOP: Optional[BackgroundLoop] = None
+_BACKGROUND_LOOP_PID: Optional[int] = None
+_BACKGROUND_LOOP_LOCK = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """
+    Returns the background loop of the current process.
+
+    A forked worker does not inherit the parent's loop thread, so a new
+    loop is created when the process id changes.
+    """
+    global _BACKGROUND_LOOP, _BACKGROUND_LOOP_PID  # pylint: disable=global-statement
+
+    pid = os.getpid()
+    with _BACKGROUND_LOOP_LOCK:
+        if _BACKGROUND_LOOP is None or _BACKGROUND_LOOP_PID != pid:
+            _BACKGROUND_LOOP = BackgroundLoop()
+            _BACKGROUND_LOOP_PID = pid
+        return _BACKGROUND_LOOP
+
+
+def run_coroutine(coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the process-wide background loop and return its result.
+    """
+    return get_background_loop().run(coroutine, timeout=timeout)
+
+
+def submit_coroutine(coroutine: Awaitable) -> Future:
+    """
+    Schedule a coroutine on the process-wide background loop without waiting for it.
+    """
+    return get_background_loop().submit(coroutine)
@@ -0,0 +1,23 @@
+"""
+A file containing what the sync resources share: the pooled database and the
+bridge that runs their coroutines on the background loop
+"""
+
+import os
+
+from ds_webapp.background_loop import run_coroutine
+from ds_webapp.database.connect import Database
+
+db = Database(pooled=True)
+
+ASYNC_REQUEST_TIMEOUT = float(os.getenv("ASYNC_REQUEST_TIMEOUT", "30"))
+
+
+def async_request(async_function, timeout: float = ASYNC_REQUEST_TIMEOUT):
+    """
+    A function to send async requests in sync functions.
+
+    The coroutine runs on the process-wide background loop, so the DB pool is
+    reused across requests. It is cancelled if it exceeds the timeout.
+    """
+    return run_coroutine(async_function(), timeout=timeout)
@@ -0,0 +1,158 @@
+"""
+A file containing the storage backends of the response cache
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Tuple, Type
+
+from ds_webapp.json_backend import dumps, loads
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    An abstract base class for cache backends, values are stored with a ttl in seconds.
+    """
+
+    evictions = 0
+    # whether calls may block on I/O, async callers then run them in a thread
+    blocking = False
+    # errors of an unavailable store, the cache treats them as a miss
+    errors: Tuple[Type[BaseException], ...] = ()
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """
+        Returns the value stored under key, or MISSING
+        """
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """
+        Stores value under key for ttl seconds
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Removes key from the cache
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Removes all keys from the cache
+        """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """
+        Returns the number of stored keys
+        """
+
+
+class MemoryBackend(CacheBackend):
+    """
+    An in-process backend: a bounded LRU dict whose entries expire after their ttl.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """
+    A shared backend storing JSON encoded values in Redis (or any client exposing
+    get, set(ex=), delete and scan_iter), so that worker processes share one cache.
+    Size bounds and LRU eviction are left to the Redis maxmemory policy.
+    """
+
+    blocking = True
+    # socket errors of a plain client, from_url adds the redis client's own
+    errors: Tuple[Type[BaseException], ...] = (OSError,)
+
+    def __init__(self, client, prefix: str = "ds_webapp:", errors=None):
+        self.client = client
+        self.prefix = prefix
+        if errors is not None:
+            self.errors = tuple(errors)
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "ds_webapp:") -> "RedisBackend":
+        """
+        Create a backend connected to the Redis server at url
+        """
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ImportError(
+                "The redis cache backend requires the 'redis' package"
+            ) from e
+        return cls(
+            redis.Redis.from_url(url),
+            prefix=prefix,
+            errors=(
+                OSError,
+                redis.exceptions.ConnectionError,
+                redis.exceptions.TimeoutError,
+            ),
+        )
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return MISSING
+        return loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(self.prefix + key, dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
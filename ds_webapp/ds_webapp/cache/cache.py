@@ -0,0 +1,223 @@
+"""
+A file containing the response cache placed in front of slow upstream calls
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from ds_webapp.cache.backends import MISSING, CacheBackend, MemoryBackend, RedisBackend
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:  # pylint: disable=too-few-public-methods
+    """
+    An in-flight computation that concurrent callers of the same key wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """
+    A class caching results per key with a ttl, counting hits/misses/evictions.
+
+    Concurrent misses of the same key are de-duplicated (single-flight): one
+    caller computes the value, the others wait for it.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        # not `backend or ...`, an empty backend is falsy through __len__
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the cached value for key or MISSING, counting a hit or miss.
+        An unavailable backend is logged and counted as a miss.
+        """
+        try:
+            value = self.backend.get(key)
+        except self.backend.errors as e:
+            logger.warning("Cache get of %s failed: %s", key, e)
+            value = MISSING
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """
+        Stores value under key for ttl seconds, an unavailable backend is logged
+        and the value not stored
+        """
+        try:
+            self.backend.set(key, value, ttl)
+        except self.backend.errors as e:
+            logger.warning("Cache set of %s failed: %s", key, e)
+
+    async def get_async(self, key: str) -> Any:
+        """
+        The coroutine counterpart of get, a blocking backend is read in a thread
+        so that the event loop keeps serving other coroutines
+        """
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def set_async(self, key: str, value: Any, ttl: float) -> None:
+        """
+        The coroutine counterpart of set, a blocking backend is written in a thread
+        """
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, key, value, ttl)
+        else:
+            self.set(key, value, ttl)
+
+    def get_or_compute(self, key: str, ttl: float, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, computing and storing it on a miss.
+        Exceptions raised by compute are passed to every waiting caller and not cached.
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, key: str) -> None:
+        """
+        Removes key from the cache
+        """
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        """
+        Removes all entries and resets the counters
+        """
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.backend.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit, miss and eviction counters and the current size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "size": len(self.backend),
+        }
+
+
+def create_backend() -> CacheBackend:
+    """
+    Create the backend configured by CACHE_BACKEND ("memory" or "redis")
+    """
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        return RedisBackend.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryBackend(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")))
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """
+    Returns the process-wide response cache
+    """
+    global _CACHE  # pylint: disable=global-statement
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache(create_backend())
+        return _CACHE
+
+
+def make_key(namespace: str, *args, **kwargs) -> str:
+    """
+    Build a cache key from a namespace and call arguments
+    """
+    parts = [repr(arg) for arg in args]
+    parts += [f"{name}={value!r}" for name, value in sorted(kwargs.items())]
+    return f"{namespace}:{','.join(parts)}"
+
+
+def cached(namespace: str, ttl: float, cache: Optional[ResponseCache] = None):
+    """
+    A decorator caching a function's results for ttl seconds, keyed by its arguments.
+    The undecorated function stays available as __wrapped__.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return (cache or get_cache()).get_or_compute(
+                make_key(namespace, *args, **kwargs),
+                ttl,
+                lambda: func(*args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def cached_async(namespace: str, ttl: float, cache: Optional[ResponseCache] = None):
+    """
+    The coroutine counterpart of cached, sharing its keys so that sync and async
+    callers share entries. Concurrent misses are left to the caller to coalesce.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            response_cache = cache or get_cache()
+            key = make_key(namespace, *args, **kwargs)
+            value = await response_cache.get_async(key)
+            if value is MISSING:
+                value = await func(*args, **kwargs)
+                await response_cache.set_async(key, value, ttl)
+            return value
+
+        return wrapper
+
+    return decorator
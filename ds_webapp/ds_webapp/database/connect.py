@@ -4,22 +4,64 @@ A containing the database connnection and query class
 
 import os
 import asyncio
+from contextlib import asynccontextmanager
 import asyncpg
 
+from ds_webapp.database.statements import StatementConnection
 
-class Database:
+
+class Database:  # pylint: disable=too-many-instance-attributes
     """
     A class for interacting with a PostgreSQL database using asyncpg.
+
+    In pooled mode, queries borrow a connection from a shared asyncpg pool
+    instead of opening (and closing) a new connection per query.
     """
 
-    def __init__(self, debug_mode=False):
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        debug_mode=False,
+        *,
+        pooled=False,
+        min_size: int = None,
+        max_size: int = None,
+        max_inactive_connection_lifetime: float = None,
+        acquire_timeout: float = None,
+    ):
         """
         Initialize parameters
         """
         self.conn = None
+        self.pool = None
         self.max_retries = 2
         self.retry_delay = 1
         self.debug_mode = debug_mode
+        self.pooled = pooled
+        self.min_size = min_size or int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1"))
+        self.max_size = max_size or int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10"))
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime or (
+            float(os.getenv("POSTGRES_POOL_MAX_IDLE", "300"))
+        )
+        self.acquire_timeout = acquire_timeout or float(
+            os.getenv("POSTGRES_POOL_ACQUIRE_TIMEOUT", "5")
+        )
+        self._pool_loop = None
+        self._pool_lock = None
+
+    @staticmethod
+    def _connect_kwargs() -> dict:
+        """
+        Returns the connection parameters shared by single connections and pools.
+        """
+        return {
+            "user": os.getenv("POSTGRES_USER"),
+            "password": os.getenv("POSTGRES_PASSWORD"),
+            "database": os.getenv("POSTGRES_DB"),
+            "host": os.getenv("POSTGRES_HOST"),
+            "port": 5432,
+            "timeout": 5.0,
+            "connection_class": StatementConnection,
+        }
 
     async def connect(self):
         """
@@ -27,14 +69,7 @@ class Database:
         """
         for attempt in range(self.max_retries):
             try:
-                self.conn = await asyncpg.connect(
-                    user=os.getenv("POSTGRES_USER"),
-                    password=os.getenv("POSTGRES_PASSWORD"),
-                    database=os.getenv("POSTGRES_DB"),
-                    host=os.getenv("POSTGRES_HOST"),
-                    port=5432,
-                    timeout=5.0,
-                )
+                self.conn = await asyncpg.connect(**self._connect_kwargs())
                 return
             except asyncpg.PostgresConnectionError as e:
                 if attempt < self.max_retries - 1:
@@ -42,10 +77,73 @@ class Database:
                 else:
                     raise e
 
+    async def create_pool(self):
+        """
+        Create the connection pool (with retries) if it does not exist yet.
+
+        A pool is bound to the event loop it was created on, so it is
+        recreated when called from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self.pool and not self.pool.is_closing() and self._pool_loop is loop:
+            return self.pool
+
+        if self._pool_lock is None or self._pool_loop is not loop:
+            self._discard_pool()
+            self._pool_lock = asyncio.Lock()
+            self._pool_loop = loop
+
+        async with self._pool_lock:
+            if self.pool and not self.pool.is_closing():
+                return self.pool
+
+            for attempt in range(self.max_retries):
+                try:
+                    self.pool = await asyncpg.create_pool(
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+                        **self._connect_kwargs(),
+                    )
+                    return self.pool
+                except (asyncpg.PostgresConnectionError, OSError) as e:
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(self.retry_delay)
+                    else:
+                        raise e
+        return self.pool
+
+    def _discard_pool(self):
+        """
+        Drop a pool that belongs to another (possibly closed) event loop.
+        """
+        if self.pool is None:
+            return
+        try:
+            self.pool.terminate()
+        except RuntimeError:
+            # the loop owning the pool is already closed
+            pass
+        self.pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Borrow a connection from the pool, waiting at most acquire_timeout seconds.
+        """
+        pool = await self.create_pool()
+        async with pool.acquire(timeout=self.acquire_timeout) as conn:
+            yield conn
+
     async def query(self, sql: str, params: list = None):
         """
         Run a SQL query with optional parameters. Returns all rows or False.
         """
+        if self.pooled:
+            async with self.acquire() as conn:
+                result = await conn.fetch(sql, *(params or []))
+                return result if result else False
+
         if not self.conn or self.conn.is_closed():
             await self.connect()
 
@@ -56,9 +154,48 @@ class Database:
         finally:
             await self.conn.close()
 
+    async def execute(self, name: str, params: list = None):
+        """
+        Run the registered statement name (see statements.py) with optional
+        parameters, prepared once per connection. Returns all rows or False.
+        """
+        if self.pooled:
+            async with self.acquire() as conn:
+                result = await conn.fetch_statement(name, *(params or []))
+                return result if result else False
+
+        if not self.conn or self.conn.is_closed():
+            await self.connect()
+
+        try:
+            result = await self.conn.fetch_statement(name, *(params or []))
+            return result if result else False
+
+        finally:
+            await self.conn.close()
+
+    async def health_check(self) -> bool:
+        """
+        Returns whether the database answers a trivial query.
+        """
+        try:
+            if self.pooled:
+                async with self.acquire() as conn:
+                    return await conn.fetchval("SELECT 1") == 1
+            conn = await asyncpg.connect(**self._connect_kwargs())
+            try:
+                return await conn.fetchval("SELECT 1") == 1
+            finally:
+                await conn.close()
+        except (asyncpg.PostgresError, OSError, asyncio.TimeoutError):
+            return False
+
     async def close(self):
         """
-        Close the DB connection.
+        Close the DB connection and the pool.
         """
         if self.conn:
             await self.conn.close()
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
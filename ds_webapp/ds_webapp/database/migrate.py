@@ -0,0 +1,264 @@
+"""
+A file containing the schema migration runner.
+
+Migrations are SQL files in database/migrations named <version>_<name>.up.sql, with
+an optional <version>_<name>.down.sql to revert them. They are applied in version
+order and recorded in the schema_migrations table. A migration runs in one
+transaction that gives up waiting for a table lock after MIGRATION_LOCK_TIMEOUT,
+unless it uses CONCURRENTLY (e.g. CREATE INDEX CONCURRENTLY, which Postgres refuses
+to run in a transaction): its statements then run one by one, so an index is built
+without locking writes to its table.
+
+Run with: poetry run migrate up | down [--to VERSION] | status
+"""
+
+import argparse
+import asyncio
+import os
+import re
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from ds_webapp.database.connect import Database
+
+load_dotenv()
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_FILE = re.compile(r"(\d+)_(\w+)\.(up|down)\.sql")
+# any key shared by all runners, so two of them never migrate at the same time
+ADVISORY_LOCK_KEY = 7_254_001
+# how long a statement in a transaction waits for a table lock before the
+# migration fails, instead of queueing every query on that table behind it
+LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+
+
+class Migration(NamedTuple):
+    """
+    A versioned schema change and the SQL applying and reverting it
+    """
+
+    version: int
+    name: str
+    up: str
+    down: Optional[str] = None
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    Returns the migrations in directory by version
+    :raises ValueError: when a file name is invalid, versions clash or a
+        down script has no up script
+    """
+    scripts: Dict[int, Dict[str, str]] = {}
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE.fullmatch(path.name)
+        if not match:
+            raise ValueError(f"Invalid migration file name: {path.name}")
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        script = scripts.setdefault(version, {"name": name})
+        if script["name"] != name or direction in script:
+            raise ValueError(f"Duplicate migration version {version}")
+        script[direction] = path.read_text(encoding="utf-8")
+
+    migrations = []
+    for version, script in sorted(scripts.items()):
+        if "up" not in script:
+            raise ValueError(f"Migration {version} has no up script")
+        migrations.append(
+            Migration(version, script["name"], script["up"], script.get("down"))
+        )
+    return migrations
+
+
+def transactional(sql: str) -> bool:
+    """
+    Returns whether sql can run in a transaction
+    """
+    return not re.search(r"\bCONCURRENTLY\b", sql, re.IGNORECASE)
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Returns the statements of sql, split on semicolons that end a line.
+    Statements of a migration outside a transaction have to be sent one by one.
+    """
+    statements = []
+    for statement in re.split(r";[ \t]*(?:--[^\n]*)?(?:\n|$)", sql):
+        code = "\n".join(
+            line for line in statement.splitlines() if not line.strip().startswith("--")
+        ).strip()
+        if code:
+            statements.append(code)
+    return statements
+
+
+class Migrator:
+    """
+    A class applying and reverting migrations on the database of a Database
+    """
+
+    def __init__(self, db: Database, migrations: List[Migration] = None):
+        self.db = db
+        self.migrations = load_migrations() if migrations is None else migrations
+
+    @staticmethod
+    async def applied(conn: asyncpg.Connection) -> Dict[int, str]:
+        """
+        Returns the name of each applied migration by version
+        """
+        rows = await conn.fetch("SELECT version, name FROM schema_migrations")
+        return {row["version"]: row["name"] for row in rows}
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Borrow a connection holding the migration lock, with the migrations table created
+        """
+        async with self.db.acquire() as conn:
+            await conn.execute("SELECT pg_advisory_lock($1)", ADVISORY_LOCK_KEY)
+            try:
+                await conn.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                           version INT PRIMARY KEY,
+                           name TEXT NOT NULL,
+                           applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                       );""")
+                yield conn
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_KEY)
+
+    @staticmethod
+    async def run(conn: asyncpg.Connection, sql: str, record: str, *params) -> None:
+        """
+        Run the sql of a migration followed by the record statement (with params)
+        that updates schema_migrations, in one transaction when sql allows it
+        """
+        if transactional(sql):
+            async with conn.transaction():
+                await conn.execute(
+                    "SELECT set_config('lock_timeout', $1, true)", LOCK_TIMEOUT
+                )
+                await conn.execute(sql)
+                await conn.execute(record, *params)
+            return
+
+        # concurrent builds wait for older transactions without blocking anyone.
+        # a failed statement leaves the earlier ones applied and the migration
+        # unrecorded, so it runs again: its statements have to be repeatable
+        for statement in split_statements(sql):
+            await conn.execute(statement)
+        await conn.execute(record, *params)
+
+    async def status(self) -> List[Dict[str, object]]:
+        """
+        Returns the version, name and whether it is applied of every migration
+        """
+        async with self.session() as conn:
+            applied = await self.applied(conn)
+        return [
+            {
+                "version": migration.version,
+                "name": migration.name,
+                "applied": migration.version in applied,
+            }
+            for migration in self.migrations
+        ]
+
+    async def up(self, target: int = None) -> List[Migration]:
+        """
+        Apply the pending migrations up to version target (all by default),
+        returns the applied migrations
+        """
+        done = []
+        async with self.session() as conn:
+            applied = await self.applied(conn)
+            for migration in self.migrations:
+                if migration.version in applied or (
+                    target is not None and migration.version > target
+                ):
+                    continue
+                await self.run(
+                    conn,
+                    migration.up,
+                    "INSERT INTO schema_migrations(version, name) VALUES($1, $2)",
+                    migration.version,
+                    migration.name,
+                )
+                done.append(migration)
+        return done
+
+    async def down(self, target: int = None) -> List[Migration]:
+        """
+        Revert the applied migrations above version target, by default only the
+        last one, returns the reverted migrations
+        :raises ValueError: when a migration to revert has no down script
+        """
+        done = []
+        async with self.session() as conn:
+            applied = await self.applied(conn)
+            reverting = [
+                migration
+                for migration in reversed(self.migrations)
+                if migration.version in applied
+                and (target is None or migration.version > target)
+            ]
+            for migration in reverting if target is not None else reverting[:1]:
+                if migration.down is None:
+                    raise ValueError(
+                        f"Migration {migration.version} has no down script"
+                    )
+                await self.run(
+                    conn,
+                    migration.down,
+                    "DELETE FROM schema_migrations WHERE version = $1",
+                    migration.version,
+                )
+                done.append(migration)
+        return done
+
+
+async def migrate(command: str, target: int = None) -> None:
+    """
+    Run command (up, down or status) and print what was done
+    """
+    db = Database(pooled=True, min_size=1, max_size=1)
+    migrator = Migrator(db=db)
+    try:
+        if command == "status":
+            for migration in await migrator.status():
+                state = "applied" if migration["applied"] else "pending"
+                print(f"{migration['version']:04d} {migration['name']:<40} {state}")
+            return
+
+        done = await (migrator.up if command == "up" else migrator.down)(target)
+        verb = "Applied" if command == "up" else "Reverted"
+        for migration in done:
+            print(f"{verb} {migration.version:04d} {migration.name}")
+        if not done:
+            print("Nothing to migrate")
+    finally:
+        await db.close()
+
+
+def start():
+    """
+    Start the migration runner
+    """
+    parser = argparse.ArgumentParser(description="Migrate the database schema")
+    parser.add_argument("command", choices=["up", "down", "status"])
+    parser.add_argument(
+        "--to",
+        type=int,
+        default=None,
+        help="up: last version to apply (default all), "
+        "down: version to revert to (default only the last migration)",
+    )
+    args = parser.parse_args()
+    asyncio.run(migrate(args.command, args.to))
+
+
+if __name__ == "__main__":
+    start()
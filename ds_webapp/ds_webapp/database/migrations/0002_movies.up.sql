@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS movies (
+    id INT PRIMARY KEY,
+    title TEXT NOT NULL,
+    original_title TEXT,
+    release_date TEXT,
+    runtime INT,
+    popularity REAL,
+    vote_average REAL,
+    details JSONB NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS catalog (
+    id INT PRIMARY KEY,
+    title TEXT NOT NULL,
+    original_title TEXT,
+    original_language TEXT,
+    overview TEXT,
+    genre_ids INT[] NOT NULL DEFAULT '{}',
+    popularity REAL,
+    vote_average REAL,
+    vote_count INT,
+    release_date TEXT,
+    poster_path TEXT,
+    backdrop_path TEXT,
+    adult BOOLEAN,
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS catalog_genre_ids_idx ON catalog USING GIN (genre_ids);
+CREATE INDEX IF NOT EXISTS catalog_popularity_idx ON catalog (popularity DESC);
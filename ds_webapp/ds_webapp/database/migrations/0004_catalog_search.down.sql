@@ -0,0 +1,3 @@
+DROP INDEX IF EXISTS catalog_title_trgm_idx;
+DROP INDEX IF EXISTS catalog_search_vector_idx;
+ALTER TABLE catalog DROP COLUMN IF EXISTS search_vector;
@@ -0,0 +1,11 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE catalog ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(original_title, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(overview, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS catalog_search_vector_idx ON catalog USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS catalog_title_trgm_idx ON catalog USING GIN (title gin_trgm_ops);
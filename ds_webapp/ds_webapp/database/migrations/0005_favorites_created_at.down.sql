@@ -0,0 +1 @@
+ALTER TABLE favorites DROP COLUMN IF EXISTS created_at;
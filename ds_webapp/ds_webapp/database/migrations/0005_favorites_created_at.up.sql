@@ -0,0 +1,2 @@
+-- a constant default, so existing rows are not rewritten
+ALTER TABLE favorites ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now();
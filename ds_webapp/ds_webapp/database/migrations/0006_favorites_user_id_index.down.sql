@@ -0,0 +1 @@
+DROP INDEX CONCURRENTLY IF EXISTS favorites_user_id_movie_id_idx;
@@ -0,0 +1,6 @@
+-- the primary key leads with movie_id, favorites are looked up and paginated by user.
+-- created_at is included so that get_favorites is answered from the index alone.
+-- a build that failed half-way leaves an invalid index behind, drop it first.
+DROP INDEX CONCURRENTLY IF EXISTS favorites_user_id_movie_id_idx;
+CREATE INDEX CONCURRENTLY favorites_user_id_movie_id_idx
+    ON favorites (user_id, movie_id) INCLUDE (created_at);
@@ -0,0 +1 @@
+ALTER TABLE catalog DROP COLUMN IF EXISTS runtime;
@@ -0,0 +1,3 @@
+-- list results carry no runtime, the ingester fills it from movie details.
+-- nullable without a default, so existing rows are not rewritten
+ALTER TABLE catalog ADD COLUMN IF NOT EXISTS runtime INT;
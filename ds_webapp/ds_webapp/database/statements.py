@@ -0,0 +1,138 @@
+"""
+A file containing the registry of named SQL statements.
+
+Every connection prepares a registered statement the first time it runs it and
+keeps the handle, so Postgres parses and plans hot queries once per pooled
+connection. Executions are counted and timed per statement.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+
+class StatementRegistry:
+    """
+    A class holding the SQL of each named statement and its execution statistics
+    """
+
+    def __init__(self):
+        self.sql: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # per statement: executions, prepares and total/max seconds executing
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, sql: str) -> str:
+        """
+        Register sql under name and return the name
+        :raises ValueError: when name is registered with other SQL
+        """
+        if self.sql.setdefault(name, sql) != sql:
+            raise ValueError(f"Statement {name!r} is already registered")
+        return name
+
+    def _timing(self, name: str) -> Dict[str, float]:
+        """
+        Returns the timing entry of name, callers hold the lock
+        """
+        return self._timings.setdefault(
+            name, {"count": 0, "prepares": 0, "seconds": 0.0, "max_seconds": 0.0}
+        )
+
+    def record_prepare(self, name: str) -> None:
+        """
+        Count a prepare of name
+        """
+        with self._lock:
+            self._timing(name)["prepares"] += 1
+
+    def record_execution(self, name: str, seconds: float) -> None:
+        """
+        Count an execution of name that took seconds
+        """
+        with self._lock:
+            timing = self._timing(name)
+            timing["count"] += 1
+            timing["seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns per statement the executions, prepares and mean and max latency in ms
+        """
+        with self._lock:
+            return {
+                name: {
+                    "count": timing["count"],
+                    "prepares": timing["prepares"],
+                    "mean_ms": (
+                        1000 * timing["seconds"] / timing["count"]
+                        if timing["count"]
+                        else 0.0
+                    ),
+                    "max_ms": 1000 * timing["max_seconds"],
+                }
+                for name, timing in self._timings.items()
+            }
+
+    def reset(self) -> None:
+        """
+        Clear the statistics
+        """
+        with self._lock:
+            self._timings.clear()
+
+
+statements = StatementRegistry()
+
+
+def register_statement(name: str, sql: str) -> str:
+    """
+    Register sql under name in the process-wide registry and return the name
+    """
+    return statements.register(name, sql)
+
+
+class StatementConnection(asyncpg.Connection):
+    """
+    An asyncpg connection keeping the prepared handle of each registered statement
+    it ran. asyncpg's own statement cache is an LRU of limited size, these
+    handles live as long as the connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prepared: Dict[str, PreparedStatement] = {}
+
+    async def prepared(self, name: str) -> PreparedStatement:
+        """
+        Returns the prepared handle of the registered statement name
+        """
+        statement = self._prepared.get(name)
+        if statement is None:
+            statement = await self.prepare(statements.sql[name])
+            statements.record_prepare(name)
+            self._prepared[name] = statement
+        return statement
+
+    async def fetch_statement(self, name: str, *args: Any) -> list:
+        """
+        Run the registered statement name and return its rows. A handle that was
+        invalidated by a schema change is prepared again once.
+        """
+        started = time.perf_counter()
+        try:
+            statement = await self.prepared(name)
+            try:
+                return await statement.fetch(*args)
+            except (
+                asyncpg.InvalidCachedStatementError,
+                asyncpg.OutdatedSchemaCacheError,
+            ):
+                del self._prepared[name]
+                return await (await self.prepared(name)).fetch(*args)
+        finally:
+            statements.record_execution(name, time.perf_counter() - started)
@@ -2,8 +2,17 @@
 A file containing a class for each of the database tables and methods to query them
 """
 
+import os
+import re
+
 import bcrypt
+from ds_webapp.authentication.hash_pool import HashPool, HashPoolBusy, get_hash_pool
 from ds_webapp.database.connect import Database
+from ds_webapp.database.statements import register_statement
+from ds_webapp.json_backend import dumps, loads
+
+# bcrypt cost factor of new hashes, stored hashes of another cost are rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 
 class Users:
@@ -11,19 +20,35 @@ class Users:
     A class representing the users(id, username, password)
     """
 
-    def __init__(self, db: Database):
+    add_user_statement = register_statement(
+        "users.add_user",
+        "INSERT INTO users(username, password) VALUES($1, $2) RETURNING id",
+    )
+    # usernames are unique
+    get_user_id_statement = register_statement(
+        "users.get_user_id", "SELECT id, password FROM users WHERE username = $1"
+    )
+    rehash_password_statement = register_statement(
+        "users.rehash_password",
+        "UPDATE users SET password = $1 WHERE id = $2 AND password = $3",
+    )
+
+    def __init__(self, db: Database, hash_pool: HashPool = None):
         self.columns = "username, password"
         self.db = db
+        self.hash_pool = hash_pool or get_hash_pool()
 
     async def add_user(self, username: str, password: str) -> int:
         """
         Adds user to table users
+        :raises HashPoolBusy: when the password cannot be hashed right now
         """
-        sql = f"""INSERT INTO users({self.columns})
-                  VALUES($1, $2)
-                  RETURNING id;"""
-        params = [username, Hasher.hash_password(password)]
-        result = await self.db.query(sql=sql, params=params)
+        hashed_password = await self.hash_pool.run(
+            "hash", Hasher.hash_password, password
+        )
+        result = await self.db.execute(
+            self.add_user_statement, params=[username, hashed_password]
+        )
         return result[0]["id"] if result else False
 
     async def get_user(self, user_id: int):
@@ -35,19 +60,40 @@ class Users:
 
     async def get_user_id(self, username: str, password: str):
         """
-        Returns user_id based on username and password
+        Returns user_id based on username and password.
+        A password hashed with another cost than BCRYPT_ROUNDS is rehashed.
+        :raises HashPoolBusy: when the password cannot be verified right now
         """
-        sql = "SELECT * FROM users WHERE username = $1"
-        search_result = await self.db.query(sql=sql, params=[username])
+        search_result = await self.db.execute(
+            self.get_user_id_statement, params=[username]
+        )
 
         if not search_result:
             return False
-        for user in search_result:
-            if Hasher.verify_password(
-                hashed_password=user["password"].encode("utf-8"),
-                password=password,
-            ):
-                return user["id"]
+        user = search_result[0]
+        if not await self.hash_pool.run(
+            "verify", Hasher.verify_password, user["password"].encode("utf-8"), password
+        ):
+            return False
+
+        if Hasher.needs_rehash(user["password"]):
+            try:
+                await self.rehash_password(user["id"], user["password"], password)
+            except HashPoolBusy:
+                pass  # the next login tries again
+        return user["id"]
+
+    async def rehash_password(self, user_id: int, old_hash: str, password: str):
+        """
+        Replace the hash of a verified password with one of cost BCRYPT_ROUNDS,
+        unless the password changed in the meantime
+        """
+        hashed_password = await self.hash_pool.run(
+            "hash", Hasher.hash_password, password
+        )
+        await self.db.execute(
+            self.rehash_password_statement, params=[hashed_password, user_id, old_hash]
+        )
 
     async def get_users(self):
         """
@@ -73,13 +119,26 @@ class Hasher:
     """
 
     @staticmethod
-    def hash_password(password: str):
+    def hash_password(password: str, rounds: int = None):
         """
         A function that returns a hashed password (as a string)
+        :param rounds: bcrypt cost factor, BCRYPT_ROUNDS by default
         """
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
         return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
+    @staticmethod
+    def needs_rehash(hashed_password: str, rounds: int = None) -> bool:
+        """
+        A function that returns whether a hash was made with another cost factor
+        than rounds (BCRYPT_ROUNDS by default)
+        """
+        try:
+            # $2b$<cost>$<salt and hash>
+            return int(hashed_password.split("$")[2]) != (rounds or BCRYPT_ROUNDS)
+        except (IndexError, ValueError):
+            return True
+
     @staticmethod
     def verify_password(hashed_password: bytes, password: str) -> bool:
         """
@@ -96,6 +155,50 @@ class Favorites:
     A class representing the favorites (movie_id, user_id)
     """
 
+    like_movie_statement = register_statement(
+        "favorites.like_movie",
+        "INSERT INTO favorites(movie_id, user_id) VALUES($1, $2)",
+    )
+    unlike_movie_statement = register_statement(
+        "favorites.unlike_movie",
+        "DELETE FROM favorites WHERE movie_id = $1 AND user_id = $2",
+    )
+    like_movies_statement = register_statement(
+        "favorites.like_movies",
+        """INSERT INTO favorites(movie_id, user_id)
+           SELECT movie_id, $2 FROM unnest($1::int[]) AS movie_id
+           ON CONFLICT DO NOTHING
+           RETURNING movie_id""",
+    )
+    unlike_movies_statement = register_statement(
+        "favorites.unlike_movies",
+        """DELETE FROM favorites
+           WHERE user_id = $2 AND movie_id = ANY($1::int[])
+           RETURNING movie_id""",
+    )
+    get_favorite_movies_statement = register_statement(
+        "favorites.get_favorite_movies",
+        """SELECT f.movie_id, m.details,
+                  m.fetched_at < now() - make_interval(secs => $2) AS stale
+           FROM favorites f
+           LEFT JOIN movies m ON m.id = f.movie_id
+           WHERE f.user_id = $1 AND f.movie_id > $3
+           ORDER BY f.movie_id
+           LIMIT $4""",
+    )
+    # keyset pagination on (user_id, movie_id), served by favorites_user_id_movie_id_idx
+    get_favorites_statement = register_statement(
+        "favorites.get_favorites",
+        """SELECT movie_id, user_id, created_at FROM favorites
+           WHERE user_id = $1 AND movie_id > $2
+           ORDER BY movie_id
+           LIMIT $3""",
+    )
+    count_favorites_statement = register_statement(
+        "favorites.count_favorites",
+        "SELECT count(*) AS n FROM favorites WHERE user_id = $1",
+    )
+
     def __init__(self, db: Database):
         self.columns = "movie_id, user_id"
         self.db = db
@@ -104,27 +207,310 @@ class Favorites:
         """
         Adds (movie_id, user_id) to the favorites table
         """
-        sql = f"""INSERT INTO favorites({self.columns})
-                  VALUES($1, $2);"""
-        params = [movie_id, user_id]
-        return await self.db.query(sql=sql, params=params)
+        return await self.db.execute(
+            self.like_movie_statement, params=[movie_id, user_id]
+        )
 
     async def unlike_movie(self, movie_id: int, user_id: int) -> None:
         """
         Removes (movie_id, user_id) from the favorites table
         """
+        return await self.db.execute(
+            self.unlike_movie_statement, params=[movie_id, user_id]
+        )
+
+    async def like_movies(self, movie_ids: list[int], user_id: int) -> list[int]:
+        """
+        Adds many movies to the favorites of the user with user_id in one statement,
+        returns the ids of those that were not liked yet
+        """
+        result = await self.db.execute(
+            self.like_movies_statement, params=[movie_ids, user_id]
+        )
+        return [row["movie_id"] for row in result or []]
+
+    async def unlike_movies(self, movie_ids: list[int], user_id: int) -> list[int]:
+        """
+        Removes many movies from the favorites of the user with user_id in one statement,
+        returns the ids of those that were liked
+        """
+        result = await self.db.execute(
+            self.unlike_movies_statement, params=[movie_ids, user_id]
+        )
+        return [row["movie_id"] for row in result or []]
+
+    async def get_favorite_movies(
+        self, user_id: int, max_age: float, after: int = -1, limit: int = None
+    ) -> list[dict]:
+        """
+        Returns the movies liked by the user with user_id joined with their stored details,
+        at most limit (all by default) with an id above after, by movie id.
+        details is None for movies that are not stored yet, stale is true for
+        details older than max_age seconds.
+        """
+        result = await self.db.execute(
+            self.get_favorite_movies_statement, params=[user_id, max_age, after, limit]
+        )
+        return [
+            {
+                "movie_id": row["movie_id"],
+                "details": loads(row["details"]) if row["details"] else None,
+                "stale": bool(row["stale"]),
+            }
+            for row in result or []
+        ]
+
+    async def get_favorites(self, user_id: int, after: int = -1, limit: int = None):
+        """
+        Returns the movies liked by the user with user_id, at most limit (all by
+        default) with an id above after, by movie id
+        """
+        return await self.db.execute(
+            self.get_favorites_statement, params=[user_id, after, limit]
+        )
+
+    async def count_favorites(self, user_id: int) -> int:
+        """
+        Returns the number of movies liked by the user with user_id
+        """
+        result = await self.db.execute(self.count_favorites_statement, params=[user_id])
+        return result[0]["n"]
+
+
+class Movies:
+    """
+    A class representing the locally stored movie details
+    (id, title, original_title, release_date, runtime, popularity, vote_average, details, fetched_at)
+    """
+
+    def __init__(self, db: Database):
+        self.columns = (
+            "id, title, original_title, release_date, runtime, "
+            "popularity, vote_average, details, fetched_at"
+        )
+        self.db = db
+
+    async def upsert_movies(self, movies: list[dict]) -> None:
+        """
+        Inserts or refreshes the details of many movies in one statement
+        """
+        if not movies:
+            return None
+        sql = f"""INSERT INTO movies({self.columns})
+                  SELECT (m->>'id')::int, m->>'title', m->>'original_title',
+                         NULLIF(m->>'release_date', ''), (m->>'runtime')::int,
+                         (m->>'popularity')::real, (m->>'vote_average')::real,
+                         m, now()
+                  FROM jsonb_array_elements($1::jsonb) AS m
+                  ON CONFLICT (id) DO UPDATE SET
+                      title = EXCLUDED.title,
+                      original_title = EXCLUDED.original_title,
+                      release_date = EXCLUDED.release_date,
+                      runtime = EXCLUDED.runtime,
+                      popularity = EXCLUDED.popularity,
+                      vote_average = EXCLUDED.vote_average,
+                      details = EXCLUDED.details,
+                      fetched_at = EXCLUDED.fetched_at;"""
+        return await self.db.query(sql=sql, params=[dumps(movies).decode("utf-8")])
+
+    async def upsert_movie(self, movie: dict) -> None:
+        """
+        Inserts or refreshes the details of a movie
+        """
+        return await self.upsert_movies([movie])
+
+    async def get_movie(self, movie_id: int) -> dict | None:
+        """
+        Returns the stored details of the movie with movie_id
+        """
+        sql = "SELECT details FROM movies WHERE id = $1"
+        result = await self.db.query(sql=sql, params=[movie_id])
+        return loads(result[0]["details"]) if result else None
+
+    async def delete_movie(self, movie_id: int) -> None:
+        """
+        Removes the movie with movie_id
+        """
+        sql = "DELETE FROM movies WHERE id = $1"
+        return await self.db.query(sql=sql, params=[movie_id])
+
+
+class Catalog:
+    """
+    A class representing the local movie catalog, bulk-loaded from TMDB list results
+    (id, title, original_title, original_language, overview, genre_ids, popularity,
+    vote_average, vote_count, release_date, poster_path, backdrop_path, adult, runtime,
+    ingested_at). runtime is not part of list results, it is filled from movie details.
+    """
+
+    record_columns = (
+        "id",
+        "title",
+        "original_title",
+        "original_language",
+        "overview",
+        "genre_ids",
+        "popularity",
+        "vote_average",
+        "vote_count",
+        "release_date",
+        "poster_path",
+        "backdrop_path",
+        "adult",
+        "runtime",
+    )
+
+    def __init__(self, db: Database):
+        self.columns = ", ".join(self.record_columns)
+        self.db = db
+
+    @classmethod
+    def to_record(cls, movie: dict) -> tuple:
+        """
+        Returns a movie (a TMDB list result) as a tuple in record_columns order
+        """
+        record = {**movie, "genre_ids": movie.get("genre_ids") or []}
+        if record.get("release_date") == "":
+            record["release_date"] = None
+        return tuple(record.get(column) for column in cls.record_columns)
+
+    async def bulk_load(self, records: list[tuple]) -> int:
+        """
+        Upserts many records with COPY into a staging table followed by one
+        INSERT ... ON CONFLICT, returns the number of records loaded
+        """
+        if not records:
+            return 0
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in self.record_columns[1:]
+            if column != "runtime"
+        )
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""CREATE TEMP TABLE catalog_staging
+                       (LIKE catalog INCLUDING DEFAULTS) ON COMMIT DROP;""")
+                await conn.copy_records_to_table(
+                    "catalog_staging", records=records, columns=self.record_columns
+                )
+                await conn.execute(f"""INSERT INTO catalog({self.columns}, ingested_at)
+                        SELECT DISTINCT ON (id) {self.columns}, ingested_at
+                        FROM catalog_staging
+                        ON CONFLICT (id) DO UPDATE SET
+                            {updates},
+                            runtime = coalesce(EXCLUDED.runtime, catalog.runtime),
+                            ingested_at = EXCLUDED.ingested_at;""")
+        return len(records)
+
+    async def get_movies_with_genres(self, genre_ids: list[int], limit: int = 20):
+        """
+        Returns the most popular movies whose genres are exactly genre_ids
+        """
+        sql = f"""
+                SELECT {self.columns} FROM catalog
+                WHERE genre_ids @> $1::int[] AND genre_ids <@ $1::int[]
+                ORDER BY popularity DESC NULLS LAST
+                LIMIT $2
+              """
+        result = await self.db.query(sql=sql, params=[genre_ids, limit])
+        return [dict(row) for row in result or []]
+
+    @staticmethod
+    def prefix_query(text: str, weights: str = "") -> str:
+        """
+        Returns a tsquery matching every word of text as a prefix, e.g. "harry pot" -> "harry:* & pot:*",
+        only in the search_vector parts labelled with weights when given ("A" is the title)
+        """
+        return " & ".join(
+            f"{word}:*{weights}" for word in re.findall(r"[^\W_]+", text.lower())
+        )
+
+    async def search(self, text: str, limit: int = 20):
+        """
+        Returns the movies matching text, on word prefixes in title, original_title
+        and overview or fuzzily on the title, title matches first, then best matches
+        and most popular first. Returns nothing when no title matches, so that
+        callers ask TMDB, which searches by title, instead of serving overview or
+        fuzzy hits alone.
+        """
+        sql = f"""
+                SELECT {self.columns},
+                    search_vector @@ to_tsquery('simple', $4) AS title_match
+                FROM catalog
+                WHERE search_vector @@ to_tsquery('simple', $1) OR $2 <% title
+                ORDER BY title_match DESC, greatest(
+                        ts_rank(search_vector, to_tsquery('simple', $1)),
+                        word_similarity($2, title)
+                    ) * ln(2 + coalesce(popularity, 0)) DESC
+                LIMIT $3
+              """
+        result = await self.db.query(
+            sql=sql,
+            params=[
+                self.prefix_query(text),
+                text,
+                limit,
+                self.prefix_query(text, weights="A"),
+            ],
+        )
+        movies = [dict(row) for row in result or []]
+        if not movies or not movies[0].pop("title_match"):
+            return []
+        for movie in movies:
+            del movie["title_match"]
+        return movies
+
+    async def get_movies_with_runtime(self, limit: int):
+        """
+        Returns the most popular movies whose runtime is known
+        """
+        sql = f"""
+                SELECT {self.columns} FROM catalog
+                WHERE runtime IS NOT NULL
+                ORDER BY popularity DESC NULLS LAST
+                LIMIT $1
+              """
+        result = await self.db.query(sql=sql, params=[limit])
+        return [dict(row) for row in result or []]
+
+    async def get_ids_without_runtime(self, limit: int) -> list[int]:
+        """
+        Returns the ids of the most popular movies whose runtime is not known yet
+        """
         sql = """
-                DELETE FROM favorites
-                WHERE movie_id = $1 AND user_id = $2;
+                SELECT id FROM catalog
+                WHERE runtime IS NULL
+                ORDER BY popularity DESC NULLS LAST
+                LIMIT $1
               """
-        return await self.db.query(sql=sql, params=[movie_id, user_id])
+        result = await self.db.query(sql=sql, params=[limit])
+        return [row["id"] for row in result or []]
 
-    async def get_favorites(self, user_id: int) -> list[dict]:
+    async def set_runtimes(self, runtimes: dict[int, int]) -> None:
         """
-        Returns all movies liked by the user with user_id
+        Stores the runtimes of many movies, by movie id, in one statement
         """
+        if not runtimes:
+            return None
         sql = """
-                SELECT * FROM favorites
-                WHERE user_id = $1
+                UPDATE catalog SET runtime = r.runtime
+                FROM unnest($1::int[], $2::int[]) AS r(id, runtime)
+                WHERE catalog.id = r.id
               """
-        return await self.db.query(sql=sql, params=[user_id])
+        return await self.db.query(
+            sql=sql, params=[list(runtimes), list(runtimes.values())]
+        )
+
+    async def count(self) -> int:
+        """
+        Returns the number of movies in the catalog
+        """
+        result = await self.db.query(sql="SELECT count(*) AS n FROM catalog")
+        return result[0]["n"]
+
+    async def delete_movies(self, movie_ids: list[int]) -> None:
+        """
+        Removes the movies with the given ids
+        """
+        sql = "DELETE FROM catalog WHERE id = ANY($1::int[])"
+        return await self.db.query(sql=sql, params=[movie_ids])
@@ -0,0 +1,311 @@
+"""
+A file containing the logic of the endpoints that wait on TMDB or the database,
+shared by the Flask resources in api.py and the ASGI routes in asgi.py.
+
+Each endpoint takes its path parameters, query parameters and token claims and
+returns the body, status and headers of its response. The Flask resources run
+it on the background loop with async_request, the ASGI routes await it on the
+server's event loop. Work the response need not wait for is handed to defer.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+import asyncpg
+
+from ds_webapp.api_client import async_tmdb_client
+from ds_webapp.api_client.pagination import apaginate, local_window
+from ds_webapp.api_client.tmdb_client import (
+    DEFAULT_RUNTIME_TOLERANCE,
+    runtime_index,
+    title_index,
+)
+from ds_webapp.background_loop import submit_coroutine
+from ds_webapp.bridge import db
+from ds_webapp.database.tables import Catalog, Favorites, Movies
+from ds_webapp.ingest import to_catalog_records
+from ds_webapp.responses import (
+    MAX_PAGE_LIMIT,
+    int_arg,
+    keyset_args,
+    keyset_page,
+    paginated_body,
+    pagination_args,
+    project,
+    projection_args,
+)
+
+MAX_RUNTIME_TOLERANCE = 180
+MAX_SUGGESTIONS = 20
+# seconds after which stored movie details are refreshed from TMDB
+MOVIE_DETAILS_MAX_AGE = float(os.getenv("MOVIE_DETAILS_MAX_AGE", str(24 * 3600)))
+
+# failures of an unreachable catalog, searches then fall back to TMDB
+CATALOG_ERRORS = (
+    OSError,
+    asyncpg.PostgresError,
+    asyncpg.InterfaceError,
+    asyncio.TimeoutError,
+)
+
+# the body, status and headers of a response
+Result = Tuple[Any, int, Dict[str, str]]
+# runs a coroutine the response does not wait for, by default on the background loop
+Defer = Callable[[Awaitable[Any]], Any]
+
+
+def ok(
+    body: Any, cache_control: str, headers: Optional[Dict[str, str]] = None
+) -> Result:
+    """
+    Returns a successful response
+    """
+    return body, 200, {**(headers or {}), "Cache-Control": cache_control}
+
+
+def error(body: Dict[str, Any], status: int) -> Result:
+    """
+    Returns an uncacheable error response
+    """
+    return body, status, {"Cache-Control": "no-store"}
+
+
+def bad_request() -> Result:
+    """
+    Returns the response to invalid query parameters
+    """
+    return error({"error": "Bad Request"}, 400)
+
+
+def not_found() -> Result:
+    """
+    Returns the response to a movie without matches
+    """
+    return error({"error": "Not Found."}, 404)
+
+
+def internal_error() -> Result:
+    """
+    Returns the response to an unexpected failure
+    """
+    return error({"message": "Internal server error"}, 500)
+
+
+async def most_popular(n: int, args: Mapping[str, str]) -> Result:
+    """
+    Returns a page of the n most popular movies
+    """
+    try:
+        if not 1 <= n <= MAX_PAGE_LIMIT:
+            raise ValueError(f"n must be between 1 and {MAX_PAGE_LIMIT}")
+        offset, limit = pagination_args(default_limit=n, args=args)
+        fields = projection_args(args)
+    except ValueError:
+        return bad_request()
+
+    try:
+        movies = await apaginate(
+            async_tmdb_client.get_popular_movies, offset, limit + 1
+        )
+    except Exception:  # pylint: disable=broad-exception-caught
+        return internal_error()
+    body, headers = paginated_body(movies, offset, limit, fields=fields)
+    return ok(body, f"public, max-age={3600}", headers)
+
+
+async def movies_with_same_genres(movie: str, args: Mapping[str, str]) -> Result:
+    """
+    Returns a page of the movies that share all genres with the given movie
+    """
+    try:
+        offset, limit = pagination_args(args=args)
+        fields = projection_args(args)
+    except ValueError:
+        return bad_request()
+
+    try:
+        movies = await async_tmdb_client.get_movies_with_same_genres(
+            movie,
+            local_lookup=Catalog(db=db).get_movies_with_genres,
+            offset=offset,
+            limit=limit + 1,
+        )
+    except Exception:  # pylint: disable=broad-exception-caught
+        return internal_error()
+    if not movies:
+        return not_found()
+
+    body, headers = paginated_body(movies, offset, limit, fields=fields)
+    return ok(body, f"public, max-age={86400}", headers)
+
+
+async def movies_with_similar_runtime(movie: str, args: Mapping[str, str]) -> Result:
+    """
+    Returns a page of the movies with a runtime within the tolerance query
+    parameter of the given movie's
+    """
+    tolerance = int_arg(args, "tolerance", DEFAULT_RUNTIME_TOLERANCE)
+    try:
+        if not 0 <= tolerance <= MAX_RUNTIME_TOLERANCE:
+            raise ValueError(f"tolerance must be between 0 and {MAX_RUNTIME_TOLERANCE}")
+        offset, limit = pagination_args(args=args)
+        fields = projection_args(args)
+    except ValueError:
+        return bad_request()
+
+    try:
+        movies = await async_tmdb_client.get_movies_with_similar_runtime(
+            movie, tolerance=tolerance, offset=offset, limit=limit + 1
+        )
+    except Exception:  # pylint: disable=broad-exception-caught
+        return internal_error()
+    if not movies:
+        return not_found()
+
+    body, headers = paginated_body(movies, offset, limit, fields=fields)
+    return ok(body, f"public, max-age={3600}", headers)
+
+
+async def search_catalog(title: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Search the local catalog, an unreachable catalog counts as no results.
+    """
+    try:
+        return await Catalog(db=db).search(title, limit=limit)
+    except CATALOG_ERRORS:
+        return []
+
+
+async def search(
+    title: str, args: Mapping[str, str], defer: Defer = submit_coroutine
+) -> Result:
+    """
+    Returns a page of the movies matching title, from the local catalog when it
+    fills the page, otherwise from TMDB, whose results are written to the catalog
+    """
+    if not title:
+        return error({"message": "Missing 'title' query parameter"}, 400)
+    try:
+        offset, limit = pagination_args(args=args)
+        fields = projection_args(args)
+    except ValueError:
+        return error({"message": "Invalid query parameters"}, 400)
+
+    try:
+        local = await search_catalog(title, limit=offset + limit + 1)
+        if local:
+            # off the request path, suggestions wait for the index lock meanwhile
+            defer(asyncio.to_thread(title_index.add_many, local))
+        results = local_window(local, offset, limit + 1)
+        if results is None:
+            results = await apaginate(
+                lambda page: async_tmdb_client.search_movie(title, page),
+                offset,
+                limit + 1,
+            )
+            records, _ = to_catalog_records(results)
+            if records:
+                defer(Catalog(db=db).bulk_load(records))
+    except Exception:  # pylint: disable=broad-exception-caught
+        return internal_error()
+
+    body, headers = paginated_body(results, offset, limit, key="results", fields=fields)
+    return ok(body, "no-store", headers)
+
+
+def suggest(prefix: str, args: Mapping[str, str]) -> Result:
+    """
+    Returns the most popular movies seen so far with a title word starting with
+    prefix, without waiting on anything
+    """
+    limit = int_arg(args, "limit", 10)
+    if not 1 <= limit <= MAX_SUGGESTIONS:
+        return bad_request()
+
+    return ok(
+        {"results": title_index.suggest(prefix, limit=limit)}, "private, max-age=60"
+    )
+
+
+def by_id(
+    movie_ids: List[int], details: List[Dict[str, Any] | None]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Returns the details fetched for movie_ids by movie id, leaving out those that failed
+    """
+    return {
+        movie_id: movie
+        for movie_id, movie in zip(movie_ids, details)
+        if movie is not None
+    }
+
+
+async def refresh_movies(movie_ids: List[int]) -> None:
+    """
+    Fetch fresh details of the given movies from TMDB and store them
+    """
+    details, _ = await async_tmdb_client.get_movie_details_batch(movie_ids)
+    await Movies(db=db).upsert_movies([movie for movie in details if movie is not None])
+
+
+async def favorite_movies(
+    user: Dict[str, Any], args: Mapping[str, str], defer: Defer = submit_coroutine
+) -> Result:
+    """
+    Returns a page of the details of the user's favorite movies
+    """
+    try:
+        fields = projection_args(args)
+        after, limit = keyset_args(args)
+    except ValueError:
+        return bad_request()
+
+    try:
+        result, headers = keyset_page(
+            await Favorites(db=db).get_favorite_movies(
+                user_id=user["user_id"],
+                max_age=MOVIE_DETAILS_MAX_AGE,
+                after=after,
+                limit=limit and limit + 1,
+            ),
+            limit,
+        )
+
+        # movies not stored yet are fetched now, stale ones are served and refreshed later
+        missing = [row["movie_id"] for row in result if row["details"] is None]
+        fetched, errors = await async_tmdb_client.get_movie_details_batch(missing)
+        fetched = by_id(missing, fetched)
+        if fetched:
+            defer(Movies(db=db).upsert_movies(list(fetched.values())))
+
+        stale = [row["movie_id"] for row in result if row["stale"]]
+        if stale:
+            defer(refresh_movies(stale))
+    except Exception:  # pylint: disable=broad-exception-caught
+        return internal_error()
+
+    details = [row["details"] or fetched.get(row["movie_id"]) for row in result]
+    body = {
+        "results": project([movie for movie in details if movie is not None], fields),
+        "errors": [
+            {"movie_id": movie_id, "error": reason}
+            for movie_id, reason in errors.items()
+        ],
+    }
+    # revalidated with the ETag on every load, unchanged favorites cost a 304
+    return ok(body, "private, no-cache", headers)
+
+
+async def warm_runtime_index() -> None:
+    """
+    Fill the runtime index with the most popular catalog movies whose runtime is known,
+    with an unreachable catalog it only fills from movie details lookups
+    """
+    try:
+        movies = await Catalog(db=db).get_movies_with_runtime(
+            limit=runtime_index.max_entries
+        )
+    except CATALOG_ERRORS:
+        return
+    runtime_index.add_many(movies)
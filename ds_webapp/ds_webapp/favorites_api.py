@@ -0,0 +1,221 @@
+"""
+A file containing the favorites endpoints that work on many movies at once
+and the favorites count
+"""
+
+from flasgger import swag_from
+from flask import jsonify, request
+from flask_restful import Resource, reqparse
+
+from ds_webapp.authentication.authentication import jwt_required
+from ds_webapp.bridge import async_request, db
+from ds_webapp.database.tables import Favorites
+from ds_webapp.responses import error_response
+
+MAX_BULK_FAVORITES = 500
+# movie ids are stored as INT
+MAX_MOVIE_ID = 2**31 - 1
+
+BULK_FAVORITES_BODY = {
+    "name": "body",
+    "in": "body",
+    "required": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "movie_ids": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "maxItems": MAX_BULK_FAVORITES,
+            }
+        },
+        "required": ["movie_ids"],
+    },
+}
+
+
+def bulk_favorites_schema(outcomes: list) -> dict:
+    """
+    Returns the response schema listing the outcome of each movie id
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "movie_id": {"type": "integer"},
+                        "status": {"type": "string", "enum": outcomes},
+                    },
+                },
+            }
+        },
+    }
+
+
+class BulkFavorites(Resource):
+    """
+    Add or remove many favorite movies with one request
+    """
+
+    def __init__(self):
+        self.reqparse = reqparse.RequestParser()
+        self.reqparse.add_argument(
+            "movie_ids",
+            type=int,
+            action="append",
+            required=True,
+            help="movie_ids must be a list of movie ids",
+            location="json",
+        )
+        super().__init__()
+
+    def movie_ids(self) -> list[int] | None:
+        """
+        Returns the distinct movie ids of the request body in order,
+        None when there are too many or one is out of range
+        """
+        movie_ids = list(dict.fromkeys(self.reqparse.parse_args()["movie_ids"]))
+        if len(movie_ids) > MAX_BULK_FAVORITES or not all(
+            1 <= movie_id <= MAX_MOVIE_ID for movie_id in movie_ids
+        ):
+            return None
+        return movie_ids
+
+    def apply(self, change, movie_ids: list[int], outcomes: tuple[str, str]):
+        """
+        Apply change (like_movies or unlike_movies) to the movie ids of the user,
+        returns the outcome of each id: outcomes[0] when it changed, outcomes[1] otherwise
+        """
+        user_id = request.user["user_id"]
+
+        try:
+            changed = set(
+                async_request(lambda: change(movie_ids=movie_ids, user_id=user_id))
+            )
+        except Exception:  # pylint: disable=broad-exception-caught
+            return error_response({"message": "Internal server error"}, 500)
+
+        response = jsonify(
+            {
+                "results": [
+                    {
+                        "movie_id": movie_id,
+                        "status": outcomes[0] if movie_id in changed else outcomes[1],
+                    }
+                    for movie_id in movie_ids
+                ]
+            }
+        )
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    @swag_from(
+        {
+            "tags": ["Favorites"],
+            "security": [{"BearerAuth": []}],
+            "summary": "Add many movies to favorites",
+            "description": f"Add up to {MAX_BULK_FAVORITES} movies to the user's favorites list "
+            "with one statement",
+            "parameters": [BULK_FAVORITES_BODY],
+            "responses": {
+                200: {
+                    "description": "Outcome per movie id: added, or exists when "
+                    "it already was a favorite",
+                    "schema": bulk_favorites_schema(["added", "exists"]),
+                },
+                400: {"description": "Invalid or too many movie ids"},
+                401: {"description": "Unauthorized - Invalid or missing JWT token"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    @jwt_required
+    def post(self):
+        """
+        Adds many movies to the users favorites
+        """
+        movie_ids = self.movie_ids()
+        if movie_ids is None:
+            return error_response({"error": "Bad Request"}, 400)
+        return self.apply(
+            Favorites(db=db).like_movies, movie_ids, outcomes=("added", "exists")
+        )
+
+    @swag_from(
+        {
+            "tags": ["Favorites"],
+            "security": [{"BearerAuth": []}],
+            "summary": "Remove many movies from favorites",
+            "description": f"Remove up to {MAX_BULK_FAVORITES} movies from the user's favorites list "
+            "with one statement",
+            "parameters": [BULK_FAVORITES_BODY],
+            "responses": {
+                200: {
+                    "description": "Outcome per movie id: removed, or not_found when "
+                    "it was no favorite",
+                    "schema": bulk_favorites_schema(["removed", "not_found"]),
+                },
+                400: {"description": "Invalid or too many movie ids"},
+                401: {"description": "Unauthorized - Invalid or missing JWT token"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    @jwt_required
+    def delete(self):
+        """
+        Removes many movies from the users favorites
+        """
+        movie_ids = self.movie_ids()
+        if movie_ids is None:
+            return error_response({"error": "Bad Request"}, 400)
+        return self.apply(
+            Favorites(db=db).unlike_movies, movie_ids, outcomes=("removed", "not_found")
+        )
+
+
+class FavoritesCount(Resource):
+    """
+    Count the favorite movies of the authenticated user
+    """
+
+    @swag_from(
+        {
+            "tags": ["Favorites"],
+            "security": [{"BearerAuth": []}],
+            "summary": "Count user's favorite movies",
+            "description": "Number of movies in the user's favorites list, to page "
+            "through them with limit and after",
+            "responses": {
+                200: {
+                    "description": "Number of favorite movies",
+                    "schema": {
+                        "type": "object",
+                        "properties": {"count": {"type": "integer"}},
+                    },
+                },
+                401: {"description": "Unauthorized - Invalid or missing JWT token"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    @jwt_required
+    def get(self):
+        """
+        Returns the number of movies in the users favorites
+        """
+        user_id = request.user["user_id"]
+
+        try:
+            count = async_request(
+                lambda: Favorites(db=db).count_favorites(user_id=user_id)
+            )
+        except Exception:  # pylint: disable=broad-exception-caught
+            return error_response({"message": "Internal server error"}, 500)
+
+        response = jsonify({"count": count})
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
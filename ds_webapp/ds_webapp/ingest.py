@@ -0,0 +1,238 @@
+"""
+A file containing the catalog ingester: it pages through the TMDB popular,
+discover-by-genre and genre endpoints and bulk-loads the movies into Postgres.
+List results carry no runtime, it is then fetched from the details of the most
+popular movies that have none yet, for the runtime index of the API.
+
+Run with: poetry run ingest --pages 20 --runtimes 2000
+"""
+
+import argparse
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from ds_webapp.api_client import async_tmdb_client
+from ds_webapp.api_client.http_client import TMDBError
+from ds_webapp.api_client.pagination import MAX_PAGES
+from ds_webapp.api_client.schemas import Movie
+from ds_webapp.database.connect import Database
+from ds_webapp.database.tables import Catalog
+
+load_dotenv()
+
+_DONE = object()
+
+
+def catalog_sources(genres: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Returns the (path, params) listings to ingest: popular plus discover per genre
+    """
+    sources = [("/movie/popular", {"language": "en-US"})]
+    for genre in genres:
+        sources.append(
+            (
+                "/discover/movie",
+                {
+                    "language": "en-US",
+                    "sort_by": "popularity.desc",
+                    "with_genres": genre["id"],
+                },
+            )
+        )
+    return sources
+
+
+async def fetch_listing(
+    path: str,
+    params: Dict[str, Any],
+    pages: int,
+    semaphore: asyncio.Semaphore,
+    queue: asyncio.Queue,
+):
+    """
+    Fetch the first pages of one listing and put every page's results on the queue.
+    Page 1 tells how many pages exist, the remaining pages are fetched concurrently.
+    Returns the number of pages that could not be fetched.
+    """
+
+    async def fetch_page(page: int) -> Dict[str, Any]:
+        async with semaphore:
+            body = await async_tmdb_client.client.get_json(
+                path, {**params, "page": page}
+            )
+        await queue.put(body.get("results") or [])
+        return body
+
+    try:
+        first = await fetch_page(1)
+    except (TMDBError, httpx.HTTPError):
+        return 1
+
+    last_page = min(pages, first.get("total_pages") or 1, MAX_PAGES)
+    responses = await asyncio.gather(
+        *(fetch_page(page) for page in range(2, last_page + 1)),
+        return_exceptions=True,
+    )
+    for response in responses:
+        if not isinstance(response, (TMDBError, httpx.HTTPError)) and isinstance(
+            response, BaseException
+        ):
+            raise response
+    return sum(isinstance(response, BaseException) for response in responses)
+
+
+def to_catalog_records(results: List[Dict[str, Any]]) -> Tuple[List[tuple], int]:
+    """
+    Validate TMDB list results against the Movie schema.
+    Returns the catalog records of the valid movies and the number of rejected ones.
+    """
+    records = []
+    rejected = 0
+    for result in results:
+        try:
+            movie = Movie.model_validate(result)
+        except ValidationError:
+            rejected += 1
+            continue
+        records.append(Catalog.to_record(movie.model_dump()))
+    return records, rejected
+
+
+async def load_batches(queue: asyncio.Queue, catalog: Catalog, batch_size: int):
+    """
+    Validate the movies coming off the queue and bulk-load them in batches.
+    Returns the number of loaded and rejected movies.
+    """
+    batch = []
+    loaded = 0
+    rejected = 0
+
+    while True:
+        results = await queue.get()
+        if results is _DONE:
+            break
+
+        records, invalid = to_catalog_records(results)
+        batch.extend(records)
+        rejected += invalid
+
+        if len(batch) >= batch_size:
+            loaded += await catalog.bulk_load(batch)
+            batch = []
+
+    loaded += await catalog.bulk_load(batch)
+    return loaded, rejected
+
+
+async def fill_runtimes(catalog: Catalog, limit: int, semaphore: asyncio.Semaphore):
+    """
+    Fetch the details of the limit most popular catalog movies without a runtime
+    and store their runtimes. Returns the number of runtimes stored.
+    """
+
+    async def fetch_runtime(movie_id: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await async_tmdb_client.client.get_json(
+                f"/movie/{movie_id}", {"language": "en-US"}
+            )
+
+    movie_ids = await catalog.get_ids_without_runtime(limit) if limit > 0 else []
+    responses = await asyncio.gather(
+        *(fetch_runtime(movie_id) for movie_id in movie_ids), return_exceptions=True
+    )
+
+    runtimes = {}
+    for movie_id, response in zip(movie_ids, responses):
+        if isinstance(response, (TMDBError, httpx.HTTPError)):
+            continue
+        if isinstance(response, BaseException):
+            raise response
+        if response.get("runtime"):
+            runtimes[movie_id] = response["runtime"]
+    await catalog.set_runtimes(runtimes)
+    return len(runtimes)
+
+
+async def ingest(
+    pages: int, concurrency: int, batch_size: int, runtimes: int = 0
+) -> Tuple[int, int, int, int]:
+    """
+    Ingest the catalog and fill the runtimes of up to runtimes movies, returns the
+    number of loaded movies, rejected movies, failed pages and stored runtimes
+    """
+    db = Database(pooled=True)
+    catalog = Catalog(db=db)
+    semaphore = asyncio.Semaphore(concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    try:
+        genres = await async_tmdb_client.get_movie_genres()
+        loader = asyncio.create_task(load_batches(queue, catalog, batch_size))
+        try:
+            producers = asyncio.gather(
+                *(
+                    fetch_listing(path, params, pages, semaphore, queue)
+                    for path, params in catalog_sources(genres)
+                )
+            )
+
+            await asyncio.wait({loader, producers}, return_when=asyncio.FIRST_COMPLETED)
+            if loader.done():
+                # the loader only stops before the producers when loading failed
+                producers.cancel()
+                loader.result()
+
+            failed_pages = sum(await producers)
+            await queue.put(_DONE)
+            loaded, rejected = await loader
+        finally:
+            # when a producer failed the loader still waits on the queue, and may
+            # hold a COPY connection, which has to go back before the pool closes
+            loader.cancel()
+            await asyncio.gather(loader, return_exceptions=True)
+
+        filled = await fill_runtimes(catalog, runtimes, semaphore)
+        return loaded, rejected, failed_pages, filled
+    finally:
+        await async_tmdb_client.client.close()
+        await db.close()
+
+
+def start():
+    """
+    Start the catalog ingester
+    """
+    parser = argparse.ArgumentParser(description="Bulk-load TMDB movies into Postgres")
+    parser.add_argument(
+        "--pages", type=int, default=10, help="pages to ingest per listing"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="concurrent TMDB page requests"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="movies per COPY batch"
+    )
+    parser.add_argument(
+        "--runtimes",
+        type=int,
+        default=1000,
+        help="most popular movies without a runtime to fetch the details of",
+    )
+    args = parser.parse_args()
+
+    loaded, rejected, failed_pages, filled = asyncio.run(
+        ingest(args.pages, args.concurrency, args.batch_size, args.runtimes)
+    )
+    print(
+        f"Loaded {loaded} movies into the catalog "
+        f"({rejected} rejected, {failed_pages} pages failed), "
+        f"filled {filled} runtimes"
+    )
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,74 @@
+"""
+A file containing the JSON backend: orjson when it is installed (the orjson extra),
+the standard library json module otherwise
+"""
+
+import json
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, install with the orjson extra
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    # dates go through Flask's default so responses match the stdlib provider
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    Parse a JSON document
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize obj to compact UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS
+        )
+    return json.dumps(
+        obj,
+        default=DefaultJSONProvider.default,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    A Flask JSON provider that serializes jsonify responses with orjson,
+    it behaves like Flask's default provider when orjson is not installed
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        option = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=DefaultJSONProvider.default, option=option),
+            mimetype=self.mimetype,
+        )
@@ -0,0 +1,341 @@
+"""
+A file containing helpers to read request parameters and build JSON responses
+"""
+
+import gzip
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from flask import Response, jsonify, request
+from werkzeug.http import (
+    parse_accept_header,
+    parse_etags,
+    quote_etag,
+    remove_entity_headers,
+)
+
+try:
+    import brotli
+except ImportError:  # optional, install with the brotli extra
+    brotli = None
+
+from ds_webapp.api_client.pagination import (
+    MAX_PAGES,
+    PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+)
+from ds_webapp.api_client.schemas import MOVIE_VIEWS
+
+MAX_PAGE_LIMIT = 500
+
+PAGINATION_PARAMETERS = [
+    {
+        "name": "limit",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": f"Number of movies per page (1-{MAX_PAGE_LIMIT}, default {PAGE_SIZE}).",
+    },
+    {
+        "name": "page",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": "Page to return, counting from 1, pages are limit movies long.",
+    },
+    {
+        "name": "cursor",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Cursor from the X-Next-Cursor header of the previous page, "
+        "takes precedence over page.",
+    },
+]
+
+KEYSET_PARAMETERS = [
+    {
+        "name": "limit",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": f"Number of results per page (1-{MAX_PAGE_LIMIT}), all by default.",
+    },
+    {
+        "name": "after",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": "Return the results after this id, from the X-Next-After header "
+        "of the previous page.",
+    },
+]
+
+PROJECTION_PARAMETERS = [
+    {
+        "name": "view",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "enum": ["full", *MOVIE_VIEWS],
+        "description": "Named set of movie fields to return: "
+        "title (id, title), card (what movie lists render) or full (default).",
+    },
+    {
+        "name": "fields",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Comma separated movie fields to return, e.g. id,title, "
+        "takes precedence over view.",
+    },
+]
+
+FIELD_NAME = re.compile(r"[a-z_]+")
+
+# bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/plain")
+# content codings the server can produce, preferred first
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def int_arg(args: Mapping[str, str], name: str, default: int) -> int:
+    """
+    Returns the integer query parameter name, default when it is missing or no integer
+    (like request.args.get with type=int, for any mapping of query parameters)
+    """
+    try:
+        return int(args[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def pagination_args(
+    default_limit: int = PAGE_SIZE, args: Optional[Mapping[str, str]] = None
+) -> Tuple[int, int]:
+    """
+    Returns the (offset, limit) asked for with the limit, page and cursor query parameters.
+    :param args: the query parameters, those of the current Flask request by default
+    :raises ValueError: when they are invalid or point beyond the last TMDB page
+    """
+    args = request.args if args is None else args
+    limit = int_arg(args, "limit", default_limit)
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+
+    cursor = args.get("cursor")
+    if cursor:
+        offset = decode_cursor(cursor)
+    else:
+        page = int_arg(args, "page", 1)
+        if page < 1:
+            raise ValueError("page must be at least 1")
+        offset = (page - 1) * limit
+
+    if offset + limit > MAX_PAGES * PAGE_SIZE:
+        raise ValueError("page beyond the last available movie")
+    return offset, limit
+
+
+def keyset_args(
+    args: Optional[Mapping[str, str]] = None,
+) -> Tuple[int, Optional[int]]:
+    """
+    Returns the (after, limit) asked for with the after and limit query parameters,
+    limit is None when all results after after are asked for.
+    :param args: the query parameters, those of the current Flask request by default
+    :raises ValueError: when they are invalid
+    """
+    args = request.args if args is None else args
+    # ids are not negative, so by default the page starts at the first one
+    after = int_arg(args, "after", -1)
+    limit = int_arg(args, "limit", 0) if "limit" in args else None
+    if limit is not None and not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    return after, limit
+
+
+def keyset_page(
+    rows: List[Any], limit: Optional[int], key: str = "movie_id"
+) -> Tuple[List[Any], Dict[str, str]]:
+    """
+    Returns the first limit rows and the headers to send with them. The rows are
+    fetched one past the page, so when more follow the X-Next-After header holds
+    the key of the last row on the page.
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, {}
+    page = rows[:limit]
+    return page, {"X-Next-After": str(page[-1][key])}
+
+
+def projection_args(
+    args: Optional[Mapping[str, str]] = None,
+) -> Optional[Tuple[str, ...]]:
+    """
+    Returns the movie fields asked for with the fields or view query parameters,
+    or None when movies are returned in full.
+    :param args: the query parameters, those of the current Flask request by default
+    :raises ValueError: when a field name or view is invalid
+    """
+    args = request.args if args is None else args
+    fields = args.get("fields")
+    if fields:
+        names = tuple(dict.fromkeys(name.strip() for name in fields.split(",")))
+        if not all(FIELD_NAME.fullmatch(name) for name in names):
+            raise ValueError(f"Invalid fields: {fields!r}")
+        return names
+
+    view = args.get("view", "full")
+    if view == "full":
+        return None
+    if view not in MOVIE_VIEWS:
+        raise ValueError(f"Unknown view: {view!r}")
+    return tuple(MOVIE_VIEWS[view].model_fields)
+
+
+def project(
+    movies: List[Dict[str, Any]], fields: Optional[Tuple[str, ...]]
+) -> List[Dict[str, Any]]:
+    """
+    Returns the movies with only the given fields (those they have), all of them when fields is None
+    """
+    if fields is None:
+        return movies
+    return [
+        {field: movie[field] for field in fields if field in movie} for movie in movies
+    ]
+
+
+def paginated_body(
+    movies: List[Any],
+    offset: int,
+    limit: int,
+    key: str = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Tuple[Any, Dict[str, str]]:
+    """
+    Returns the first limit movies, projected on fields (under key, if given), and the
+    headers to send with them. The movies are fetched one past the page, so when more
+    follow the X-Next-Cursor header points at the next page.
+    """
+    page = project(movies[:limit], fields)
+    headers = {}
+    if len(movies) > limit:
+        headers["X-Next-Cursor"] = encode_cursor(offset + limit)
+    return ({key: page} if key else page), headers
+
+
+def error_response(body: Dict[str, Any], status: int) -> Response:
+    """
+    Returns an uncacheable JSON error response
+    """
+    response = jsonify(body)
+    response.headers["Cache-Control"] = "no-store"
+    response.status_code = status
+    return response
+
+
+def to_response(result: Tuple[Any, int, Dict[str, str]]) -> Response:
+    """
+    Returns the body, status and headers of a shared endpoint (see endpoints.py)
+    as a JSON response
+    """
+    body, status, headers = result
+    response = jsonify(body)
+    response.headers.update(headers)
+    response.status_code = status
+    return response
+
+
+def too_many_requests(retry_after: int):
+    """
+    Returns the response to a request the server has no room for right now
+    """
+    response = error_response({"error": "Too Many Requests"}, 429)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Returns body compressed with the given content coding (br or gzip)
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def negotiate(
+    body: bytes,
+    mimetype: Optional[str],
+    accept_encoding: Optional[str],
+    if_none_match: Optional[str],
+) -> Tuple[int, bytes, Dict[str, str]]:
+    """
+    Returns the status, body and headers of the representation of a successful GET
+    response to send: 304 without a body when If-None-Match holds a tag of any
+    representation of body, body compressed when it is at least COMPRESS_MIN_SIZE bytes
+    and the client accepts one of ENCODINGS, body as it is otherwise.
+
+    The strong ETag is computed from the uncompressed body and suffixed with the
+    content coding, so each representation has its own tag.
+    """
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    headers = {}
+
+    encoding = None
+    if len(body) >= COMPRESS_MIN_SIZE and mimetype in COMPRESSIBLE_MIMETYPES:
+        encoding = parse_accept_header(accept_encoding).best_match(ENCODINGS)
+        headers["Vary"] = "Accept-Encoding"
+
+    headers["ETag"] = quote_etag(f"{digest}-{encoding}" if encoding else digest)
+
+    etags = parse_etags(if_none_match)
+    if any(
+        etags.contains(tag)
+        for tag in [digest, *(f"{digest}-{coding}" for coding in ENCODINGS)]
+    ):
+        return 304, b"", headers
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return 200, compress(body, encoding), headers
+    return 200, body, headers
+
+
+def finalize_response(response: Response) -> Response:
+    """
+    Send the representation negotiate picks for successful GET responses.
+    """
+    if (
+        request.method not in ("GET", "HEAD")
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    status, body, headers = negotiate(
+        response.get_data(),
+        response.mimetype,
+        request.headers.get("Accept-Encoding"),
+        request.headers.get("If-None-Match"),
+    )
+    if "Vary" in headers:
+        response.vary.add(headers.pop("Vary"))
+    response.headers.update(headers)
+
+    if status == 304:
+        response.status_code = 304
+        response.set_data(b"")
+        remove_entity_headers(response.headers)
+        return response
+
+    response.set_data(body)
+    return response
@@ -0,0 +1,215 @@
+"""
+A file containing the production server: gunicorn running the app in several
+worker processes with a pool of threads each, or with --asgi the ASGI app
+(see asgi.py) on an event loop per worker.
+
+Run with: poetry run serve --workers 4 --threads 8
+Send SIGHUP to the master process to reload the workers gracefully.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+
+load_dotenv()
+
+logger = logging.getLogger("gunicorn.error")
+
+# seconds a worker waits for its DB pool at startup before serving without it
+WORKER_INIT_TIMEOUT = 10
+# connections all workers may hold together, below the max_connections of Postgres
+# (100 by default) to leave room for migrations, the ingester and admin sessions
+DB_CONNECTIONS = 80
+
+
+def init_worker(_worker):
+    """
+    Create the per-worker resources before the worker accepts requests: the
+    background event loop, the DB pool, the genre warm-up task and the runtime
+    index, which is loaded from the catalog in the background.
+    """
+    # imported here, the app is loaded in every worker after forking
+    # pylint: disable=import-outside-toplevel
+    from ds_webapp.bridge import db
+    from ds_webapp.endpoints import warm_runtime_index
+    from ds_webapp.api_client.async_tmdb_client import ensure_genres_warm
+    from ds_webapp.background_loop import run_coroutine, submit_coroutine
+
+    async def warm_up():
+        ensure_genres_warm()
+        await db.create_pool()
+        submit_coroutine(warm_runtime_index())
+
+    try:
+        run_coroutine(warm_up(), timeout=WORKER_INIT_TIMEOUT)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # the pool is created on first use instead
+        logger.warning("Worker %s started without a DB pool: %s", os.getpid(), e)
+
+
+def shutdown_worker(_server, _worker):
+    """
+    Close the per-worker connections when a worker exits (also on graceful reloads).
+    """
+    # pylint: disable=import-outside-toplevel
+    from ds_webapp.bridge import db
+    from ds_webapp.api_client import async_tmdb_client, tmdb_client
+    from ds_webapp.background_loop import get_background_loop, run_coroutine
+
+    async def close():
+        await async_tmdb_client.client.close()
+        await db.close()
+
+    try:
+        run_coroutine(close(), timeout=WORKER_INIT_TIMEOUT)
+    finally:
+        tmdb_client.client.close()
+        get_background_loop().stop()
+
+
+def pool_sizes(workers: int, db_connections: int) -> tuple[int, int]:
+    """
+    Returns the min and max DB pool size per worker, so that the pools of all workers
+    fit in db_connections. POSTGRES_POOL_MIN_SIZE and POSTGRES_POOL_MAX_SIZE still
+    lower them.
+    """
+    max_size = max(
+        1,
+        min(int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")), db_connections // workers),
+    )
+    min_size = min(int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1")), max_size)
+    return min_size, max_size
+
+
+def server_options(args: argparse.Namespace) -> dict:
+    """
+    Returns the gunicorn settings for the parsed command line
+    """
+    min_size, max_size = pool_sizes(args.workers, args.db_connections)
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": 5,
+        # recycle workers now and then, jittered so they do not restart together
+        "max_requests": args.max_requests,
+        "max_requests_jitter": max(1, args.max_requests // 10),
+        "accesslog": "-" if args.access_log else None,
+        "post_worker_init": init_worker,
+        "worker_exit": shutdown_worker,
+        # read by the DB pool of every worker
+        "raw_env": [
+            f"POSTGRES_POOL_MIN_SIZE={min_size}",
+            f"POSTGRES_POOL_MAX_SIZE={max_size}",
+        ],
+    }
+    if args.asgi:
+        # the app's lifespan creates and closes the per-worker resources on its loop
+        options["worker_class"] = "uvicorn_worker.UvicornWorker"
+        del options["post_worker_init"], options["worker_exit"]
+    return options
+
+
+class Server(BaseApplication):  # pylint: disable=abstract-method
+    """
+    A gunicorn application serving ds_webapp.app, or the ASGI app wrapping it
+    """
+
+    def __init__(self, options: dict, asgi: bool = False):
+        self.options = options
+        self.asgi = asgi
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # pylint: disable=import-outside-toplevel
+        if self.asgi:
+            from ds_webapp.asgi import create_app
+
+            return create_app(wsgi_threads=self.options["threads"])
+
+        from ds_webapp.app import app
+
+        return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse the command line, defaults come from the environment
+    """
+    parser = argparse.ArgumentParser(description="Serve the movie API with gunicorn")
+    parser.add_argument("--bind", default=os.getenv("BIND", "0.0.0.0:5000"))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.getenv("WEB_CONCURRENCY"),
+        help="worker processes, by default 2 per CPU + 1 within --db-connections",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.getenv("WEB_THREADS", "4")),
+        help="request threads per worker (with --asgi: for the routes served by Flask)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=int(os.getenv("WEB_TIMEOUT", "60")),
+        help="seconds before a silent worker is restarted",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30")),
+        help="seconds workers get to finish requests on reload or shutdown",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=int(os.getenv("WEB_MAX_REQUESTS", "10000")),
+        help="requests after which a worker is recycled",
+    )
+    parser.add_argument(
+        "--asgi",
+        action="store_true",
+        default=os.getenv("WEB_ASGI", "") not in ("", "0", "false"),
+        help="serve the async views on an event loop per worker",
+    )
+    parser.add_argument(
+        "--db-connections",
+        type=int,
+        default=int(os.getenv("WEB_DB_CONNECTIONS", str(DB_CONNECTIONS))),
+        help="DB connections the workers may hold together, split over their pools",
+    )
+    parser.add_argument(
+        "--no-access-log", dest="access_log", action="store_false", default=True
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers is None:
+        args.workers = min(multiprocessing.cpu_count() * 2 + 1, args.db_connections)
+    if args.workers > args.db_connections:
+        parser.error("every worker needs a DB connection, --workers > --db-connections")
+    return args
+
+
+def start():
+    """
+    Start the production server
+    """
+    args = parse_args()
+    Server(server_options(args), asgi=args.asgi).run()
+
+
+if __name__ == "__main__":
+    start()
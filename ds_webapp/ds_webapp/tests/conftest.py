@@ -15,6 +15,7 @@ from flask import Flask, jsonify
 from ds_webapp.app import app
 from ds_webapp.api_client.schemas import Movie
 from ds_webapp.database.connect import Database
+from ds_webapp.database.migrate import Migrator
 from ds_webapp.authentication.authentication import jwt_required
 
 load_dotenv()
@@ -75,8 +76,14 @@ def api_key() -> str:  # type: ignore
 @pytest_asyncio.fixture
 async def db():
     """
-    returns database instance
+    returns database instance, with the pending migrations applied
     """
+    migrations = Database(pooled=True, min_size=1, max_size=1)
+    try:
+        await Migrator(db=migrations).up()
+    finally:
+        await migrations.close()
+
     database = Database()
     yield database
     await database.close()
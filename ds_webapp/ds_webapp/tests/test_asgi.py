@@ -0,0 +1,166 @@
+"""
+A file to test asgi.py
+"""
+
+import pytest
+from starlette.testclient import TestClient
+
+from ds_webapp import endpoints
+from ds_webapp.api_client import async_tmdb_client
+from ds_webapp.api_client.tmdb_client import title_index
+from ds_webapp.asgi import create_app, route_order, to_starlette_path
+from ds_webapp.authentication.authentication import create_jwt_token
+from ds_webapp.database.tables import Catalog
+
+
+@pytest.fixture
+def asgi_client():
+    """
+    Fixture to provide a client of the ASGI app, without running its lifespan
+    """
+    return TestClient(create_app())
+
+
+@pytest.fixture
+def auth_headers():
+    """
+    Fixture to provide a valid Authorization header
+    """
+    return {"Authorization": f"Bearer {create_jwt_token({'user_id': 1})}"}
+
+
+def test_routes():
+    """
+    A function that tests Flask rules are converted and static segments are matched first
+    """
+    assert to_starlette_path("/movies/<int:n>") == "/movies/{n:int}"
+    assert to_starlette_path("/movies/<title>") == "/movies/{title:str}"
+
+    paths = sorted(
+        ["/movies/{title:str}", "/movies/favorite", "/movies/most_popular/{n:int}"],
+        key=route_order,
+    )
+    assert paths == [
+        "/movies/favorite",
+        "/movies/most_popular/{n:int}",
+        "/movies/{title:str}",
+    ]
+
+
+def test_async_views(asgi_client, auth_headers, monkeypatch):
+    """
+    A function that tests the async views authenticate, paginate and revalidate like the Flask ones
+    """
+
+    async def get_popular_movies(page: int = 1):
+        return [{"id": (page - 1) * 20 + i, "title": f"Movie {i}"} for i in range(20)]
+
+    monkeypatch.setattr(async_tmdb_client, "get_popular_movies", get_popular_movies)
+
+    assert asgi_client.get("/movies/most_popular/5").status_code == 401
+    assert (
+        asgi_client.get("/movies/most_popular/501", headers=auth_headers).status_code
+        == 400
+    )
+
+    response = asgi_client.get(
+        "/movies/most_popular/5?page=5&view=title", headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert [movie["id"] for movie in response.json()] == [20, 21, 22, 23, 24]
+    assert response.headers["X-Next-Cursor"]
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+
+    title_index.add({"id": 7, "title": "Zardoz", "popularity": 1})
+    response = asgi_client.get("/movies/suggest/zard", headers=auth_headers)
+    assert response.json() == {
+        "results": [{"id": 7, "title": "Zardoz", "release_date": None, "popularity": 1}]
+    }
+    revalidated = asgi_client.get(
+        "/movies/suggest/zard",
+        headers={**auth_headers, "If-None-Match": response.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
+    assert not revalidated.content
+
+
+def test_search_pages_past_the_catalog(
+    asgi_client, auth_headers, monkeypatch, movie_list_example
+):
+    """
+    A function that tests a search page the catalog only partly holds comes from TMDB
+    """
+    loaded = []
+    movie = movie_list_example[0].model_dump()
+
+    async def search_catalog(_title, limit):
+        # the catalog holds the first page (and one more) written back earlier
+        return [{"id": i, "title": f"Movie {i}"} for i in range(min(limit, 21))]
+
+    async def search_movie(_title, page=1):
+        return [{**movie, "id": (page - 1) * 20 + i} for i in range(20)]
+
+    async def bulk_load(_self, records):
+        loaded.append(len(records))
+
+    monkeypatch.setattr(endpoints, "search_catalog", search_catalog)
+    monkeypatch.setattr(async_tmdb_client, "search_movie", search_movie)
+    monkeypatch.setattr(Catalog, "bulk_load", bulk_load)
+
+    response = asgi_client.get("/movies/movie?limit=20", headers=auth_headers)
+    assert [movie["id"] for movie in response.json()["results"]] == list(range(20))
+    assert response.headers["X-Next-Cursor"]
+    assert not loaded
+
+    response = asgi_client.get(
+        f"/movies/movie?limit=20&cursor={response.headers['X-Next-Cursor']}",
+        headers=auth_headers,
+    )
+    assert [movie["id"] for movie in response.json()["results"]] == list(range(20, 40))
+    assert response.headers["X-Next-Cursor"]
+    assert loaded == [21]
+
+
+def test_flask_fallback(asgi_client):
+    """
+    A function that tests resources without a shared endpoint are served by the Flask app
+    """
+    response = asgi_client.get("/")
+    assert response.status_code == 200
+    assert response.json() == asgi_client.get("/movies").json()
+    assert asgi_client.post("/login", json={}).status_code == 400
+
+
+def test_flask_and_asgi_share_endpoints(client, asgi_client, auth_headers, monkeypatch):
+    """
+    A function that tests both apps answer from the same endpoint, with the same
+    body, status and headers
+    """
+
+    async def get_movies_with_similar_runtime(movie, tolerance, offset, limit):
+        assert (movie, tolerance) == ("Heat", 5)
+        return [{"id": i, "title": f"Movie {i}"} for i in range(offset, offset + limit)]
+
+    monkeypatch.setattr(
+        async_tmdb_client,
+        "get_movies_with_similar_runtime",
+        get_movies_with_similar_runtime,
+    )
+
+    url = "/movies/similar_runtime/Heat?tolerance=5&limit=2&view=title"
+    flask_response = client.get(url, headers=auth_headers)
+    asgi_response = asgi_client.get(url, headers=auth_headers)
+    assert (
+        flask_response.get_json()
+        == asgi_response.json()
+        == [
+            {"id": 0, "title": "Movie 0"},
+            {"id": 1, "title": "Movie 1"},
+        ]
+    )
+    for header in ("Cache-Control", "X-Next-Cursor"):
+        assert flask_response.headers[header] == asgi_response.headers[header]
+
+    url = "/movies/similar_runtime/Heat?tolerance=500"
+    assert client.get(url, headers=auth_headers).status_code == 400
+    assert asgi_client.get(url, headers=auth_headers).status_code == 400
@@ -0,0 +1,362 @@
+"""
+A file to test the async TMDB client
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from ds_webapp.api_client import async_tmdb_client
+from ds_webapp.api_client.async_tmdb_client import AsyncTMDBClient
+from ds_webapp.api_client.http_client import TMDBError
+from ds_webapp.cache.cache import get_cache
+
+BASE_URL = "https://tmdb.test/3"
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_coalesced():
+    """
+    A function that tests concurrent identical requests share one upstream call
+    """
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"results": [{"id": 1}]})
+
+    client = AsyncTMDBClient(
+        BASE_URL, "Bearer token", transport=httpx.MockTransport(handler)
+    )
+    try:
+        results = await asyncio.gather(
+            *(
+                client.get_json("/movie/popular", {"language": "en-US"})
+                for _ in range(5)
+            ),
+            client.get_json("/movie/popular", {"language": "nl-NL"}),
+        )
+    finally:
+        await client.close()
+
+    assert all(result == {"results": [{"id": 1}]} for result in results)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped():
+    """
+    A function that tests no more than max_concurrency requests run at once
+    """
+    running = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return httpx.Response(200, json={"id": request.url.path})
+
+    client = AsyncTMDBClient(
+        BASE_URL,
+        "Bearer token",
+        max_concurrency=3,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        await asyncio.gather(*(client.get_json(f"/movie/{i}") for i in range(10)))
+    finally:
+        await client.close()
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_and_error():
+    """
+    A function that tests 429 responses are retried and other errors raised
+    """
+    statuses = {"/3/movie/1": [429, 200], "/3/movie/2": [404]}
+
+    async def handler(request):
+        status = statuses[request.url.path].pop(0)
+        return httpx.Response(status, json={"id": 1})
+
+    client = AsyncTMDBClient(
+        BASE_URL,
+        "Bearer token",
+        backoff_factor=0,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        assert await client.get_json("/movie/1") == {"id": 1}
+        with pytest.raises(TMDBError):
+            await client.get_json("/movie/2")
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_long_retry_after_is_not_waited_for(monkeypatch):
+    """
+    A function that tests a Retry-After beyond MAX_BACKOFF gives up with a TMDBError
+    """
+    monkeypatch.setattr(async_tmdb_client, "MAX_BACKOFF", 1)
+    retry_after = {"/3/movie/1": ["1"], "/3/movie/2": ["3600", "3600"]}
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        headers = retry_after[request.url.path]
+        if headers:
+            return httpx.Response(429, headers={"Retry-After": headers.pop(0)})
+        return httpx.Response(200, json={"id": 1})
+
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(async_tmdb_client.asyncio, "sleep", sleep)
+    client = AsyncTMDBClient(
+        BASE_URL,
+        "Bearer token",
+        backoff_factor=0,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        assert await client.get_json("/movie/1") == {"id": 1}
+        with pytest.raises(TMDBError):
+            await client.get_json("/movie/2")
+    finally:
+        await client.close()
+
+    assert sleeps == [1]
+    assert calls.count("/3/movie/2") == 1
+
+
+@pytest.mark.asyncio
+async def test_transport_errors_are_retried():
+    """
+    A function that tests connection errors and timeouts are retried like 5xx responses
+    """
+    failures = {
+        "/3/movie/1": [httpx.ConnectError("refused"), httpx.ReadTimeout("slow")],
+        "/3/movie/2": [httpx.ConnectError("refused")] * 3,
+    }
+
+    async def handler(request):
+        if failures[request.url.path]:
+            raise failures[request.url.path].pop(0)
+        return httpx.Response(200, json={"id": 1})
+
+    client = AsyncTMDBClient(
+        BASE_URL,
+        "Bearer token",
+        max_retries=2,
+        backoff_factor=0,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        assert await client.get_json("/movie/1") == {"id": 1}
+        with pytest.raises(httpx.ConnectError):
+            await client.get_json("/movie/2")
+    finally:
+        await client.close()
+
+
+def test_client_of_a_previous_loop_is_closed():
+    """
+    A function that tests the http client is closed when replaced on another loop
+    """
+    client = AsyncTMDBClient(
+        BASE_URL,
+        "Bearer token",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+    )
+    asyncio.run(client.get_json("/movie/1"))
+    first = client._client  # pylint: disable=protected-access
+
+    async def second_loop():
+        await client.get_json("/movie/1")
+        await asyncio.sleep(0)
+        await client.close()
+
+    asyncio.run(second_loop())
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_same_genres_runs_independent_calls_concurrently(monkeypatch):
+    """
+    A function that tests the genre list and the search are in flight together
+    and that only the discover call waits for both
+    """
+    events = []
+    bodies = {
+        "/3/genre/movie/list": {"genres": [{"id": 12}, {"id": 14}, {"id": 28}]},
+        "/3/search/movie": {"results": [{"id": 671, "genre_ids": [12, 14]}]},
+        "/3/discover/movie": {"results": [{"id": 672}]},
+    }
+
+    async def handler(request):
+        events.append(("start", request.url.path))
+        await asyncio.sleep(0.01)
+        events.append(("end", request.url.path))
+        return httpx.Response(200, json=bodies[request.url.path])
+
+    client = AsyncTMDBClient(BASE_URL, "token", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(async_tmdb_client, "client", client)
+    get_cache().clear()
+
+    try:
+        result = await async_tmdb_client.get_movies_with_same_genres("Harry Potter")
+    finally:
+        async_tmdb_client._GENRES_REFRESHER.cancel()  # pylint: disable=protected-access
+        await client.close()
+        get_cache().clear()
+
+    assert result == [{"id": 672}]
+    assert events[:2] == [
+        ("start", "/3/genre/movie/list"),
+        ("start", "/3/search/movie"),
+    ]
+    assert events[-2] == ("start", "/3/discover/movie")
+    # the warm-up refresher and the request share one genre call
+    assert events.count(("start", "/3/genre/movie/list")) == 1
+
+
+@pytest.mark.asyncio
+async def test_movie_details_batch(monkeypatch):
+    """
+    A function that tests batched details keep their order and report failures per id
+    """
+
+    async def handler(request):
+        movie_id = int(request.url.path.rsplit("/", 1)[1])
+        if movie_id == 404:
+            return httpx.Response(404)
+        return httpx.Response(200, json={"id": movie_id})
+
+    client = AsyncTMDBClient(BASE_URL, "token", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(async_tmdb_client, "client", client)
+    get_cache().clear()
+
+    try:
+        details, errors = await async_tmdb_client.get_movie_details_batch(
+            [3, 404, 1, 2]
+        )
+        assert await async_tmdb_client.get_movie_details_batch([]) == ([], {})
+    finally:
+        await client.close()
+        get_cache().clear()
+
+    assert [movie and movie["id"] for movie in details] == [3, None, 1, 2]
+    assert list(errors) == [404]
+
+
+@pytest.mark.asyncio
+async def test_same_genres_answers_from_local_catalog(monkeypatch):
+    """
+    A function that tests a local catalog hit skips the discover call
+    and a miss falls back to TMDB
+    """
+    paths = []
+    bodies = {
+        "/3/genre/movie/list": {"genres": [{"id": 12}, {"id": 14}]},
+        "/3/search/movie": {"results": [{"id": 671, "genre_ids": [12, 14]}]},
+        "/3/discover/movie": {"results": [{"id": 672}]},
+    }
+
+    async def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(200, json=bodies[request.url.path])
+
+    async def catalog_hit(genre_ids, limit):
+        assert genre_ids == [12, 14]
+        assert limit == 20
+        return [{"id": 673}] * limit
+
+    async def catalog_miss(*_):
+        return []
+
+    client = AsyncTMDBClient(BASE_URL, "token", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(async_tmdb_client, "client", client)
+    get_cache().clear()
+
+    try:
+        hit = await async_tmdb_client.get_movies_with_same_genres(
+            "Harry Potter", local_lookup=catalog_hit
+        )
+        assert "/3/discover/movie" not in paths
+        miss = await async_tmdb_client.get_movies_with_same_genres(
+            "Harry Potter", local_lookup=catalog_miss
+        )
+    finally:
+        async_tmdb_client._GENRES_REFRESHER.cancel()  # pylint: disable=protected-access
+        await client.close()
+        get_cache().clear()
+
+    assert hit == [{"id": 673}] * 20
+    assert miss == [{"id": 672}]
+
+
+@pytest.mark.asyncio
+async def test_later_pages_beyond_a_partly_filled_local_source(monkeypatch):
+    """
+    A function that tests a page the local catalog or runtime index cannot fill
+    is paginated from TMDB instead of coming back cut short
+    """
+    discovered = []
+    bodies = {
+        "/3/genre/movie/list": {"genres": [{"id": 12}, {"id": 14}]},
+        "/3/search/movie": {"results": [{"id": 671, "genre_ids": [12, 14]}]},
+        "/3/movie/671": {"id": 671, "runtime": 100},
+    }
+
+    async def handler(request):
+        if request.url.path == "/3/discover/movie":
+            page = int(request.url.params["page"])
+            discovered.append(page)
+            return httpx.Response(
+                200,
+                json={"results": [{"id": (page - 1) * 20 + i} for i in range(20)]},
+            )
+        return httpx.Response(200, json=bodies[request.url.path])
+
+    async def catalog(_genre_ids, limit):
+        return [{"id": i} for i in range(min(limit, 25))]
+
+    client = AsyncTMDBClient(BASE_URL, "token", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(async_tmdb_client, "client", client)
+    monkeypatch.setattr(
+        async_tmdb_client.runtime_index,
+        "similar",
+        lambda runtime, tolerance, limit: [{"id": i} for i in range(min(limit, 25))],
+    )
+    get_cache().clear()
+
+    try:
+        first = await async_tmdb_client.get_movies_with_same_genres(
+            "Harry Potter", local_lookup=catalog, offset=0, limit=21
+        )
+        assert not discovered
+        second = await async_tmdb_client.get_movies_with_same_genres(
+            "Harry Potter", local_lookup=catalog, offset=20, limit=21
+        )
+        assert discovered == [2, 3]
+        runtime = await async_tmdb_client.get_movies_with_similar_runtime(
+            "Harry Potter", offset=20, limit=21
+        )
+    finally:
+        async_tmdb_client._GENRES_REFRESHER.cancel()  # pylint: disable=protected-access
+        await client.close()
+        get_cache().clear()
+
+    assert [movie["id"] for movie in first] == list(range(21))
+    assert [movie["id"] for movie in second] == list(range(20, 41))
+    assert [movie["id"] for movie in runtime] == list(range(20, 41))
@@ -2,7 +2,18 @@
 A file the test authentication.py
 """
 
-from ds_webapp.authentication.authentication import create_jwt_token, verify_jwt_token
+import time
+
+import jwt
+
+from ds_webapp.authentication import authentication
+from ds_webapp.authentication.authentication import (
+    TokenCache,
+    create_jwt_token,
+    set_revocation_hook,
+    token_cache,
+    verify_jwt_token,
+)
 
 
 def test_jwt_token_happy_day():
@@ -21,6 +32,22 @@ def test_jwt_token_happy_day():
     assert not verify_jwt_token("token")
 
 
+def test_tokens_issued_east_of_utc(monkeypatch):
+    """
+    A function that tests a token issued on a host ahead of UTC verifies right away
+    """
+    try:
+        for tz in ("Asia/Tokyo", "Europe/Berlin", "America/New_York"):
+            monkeypatch.setenv("TZ", tz)
+            time.tzset()
+            token_cache.clear()
+            token = create_jwt_token({"user_id": 0})
+            assert verify_jwt_token(token)["iat"] <= time.time()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
 def test_jwt_required_decorator(test_app):
     """
     A function to test jwt token verification wrapper
@@ -36,3 +63,53 @@ def test_jwt_required_decorator(test_app):
     response = client.get("/protected", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
     assert response.get_json()["message"] == "Access granted"
+
+    response = client.get("/protected", headers={"Authorization": "Bearer token"})
+    assert response.status_code == 401
+
+
+def test_verified_tokens_are_cached(monkeypatch):
+    """
+    A function that tests a token is decoded once and a revoked token is rejected
+    """
+    token = create_jwt_token({"user_id": 7})
+    decodes = []
+    real_decode = jwt.decode
+
+    def decode(*args, **kwargs):
+        decodes.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(authentication.jwt, "decode", decode)
+    token_cache.clear()
+    try:
+        assert verify_jwt_token(token)["user_id"] == 7
+        verify_jwt_token(token)["user_id"] = 8
+        assert verify_jwt_token(token)["user_id"] == 7
+        assert len(decodes) == 1
+
+        set_revocation_hook(lambda _token, payload: payload["user_id"] == 7)
+        assert not verify_jwt_token(token)
+        assert len(token_cache) == 0
+    finally:
+        set_revocation_hook(None)
+        token_cache.clear()
+
+
+def test_token_cache_expiry_and_bound():
+    """
+    A function that tests expired entries are dropped and the least recently used is evicted
+    """
+    cache = TokenCache(max_entries=2)
+    cache.set("expired", {"exp": time.time() - 1})
+    cache.set("no exp", {"user_id": 1})
+    assert cache.get("expired") is None
+    assert cache.get("no exp") is None
+
+    exp = time.time() + 60
+    for token in ("a", "b"):
+        cache.set(token, {"user_id": token, "exp": exp})
+    assert cache.get("a")["user_id"] == "a"
+    cache.set("c", {"user_id": "c", "exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
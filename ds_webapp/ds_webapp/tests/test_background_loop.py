@@ -0,0 +1,124 @@
+"""
+A file to test background_loop.py
+"""
+
+import asyncio
+
+import pytest
+from ds_webapp.background_loop import BackgroundLoop, get_background_loop
+
+
+def test_run_reuses_loop():
+    """
+    A function that tests coroutines run on one long-lived loop
+    """
+    background_loop = BackgroundLoop()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    try:
+        first = background_loop.run(current_loop())
+        second = background_loop.run(current_loop())
+        assert first is second
+        assert background_loop.run(asyncio.sleep(0, result=42)) == 42
+    finally:
+        background_loop.stop()
+
+    assert not background_loop.is_running()
+
+
+def test_run_timeout_cancels():
+    """
+    A function that tests a timed out coroutine is cancelled
+    """
+    background_loop = BackgroundLoop()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def was_cancelled():
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        return cancelled.is_set()
+
+    try:
+        with pytest.raises(TimeoutError):
+            background_loop.run(slow(), timeout=0.05)
+        assert background_loop.run(was_cancelled())
+    finally:
+        background_loop.stop()
+
+
+def test_run_propagates_exceptions():
+    """
+    A function that tests exceptions raised by the coroutine reach the caller
+    """
+    background_loop = BackgroundLoop()
+
+    async def fail():
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError):
+            background_loop.run(fail())
+    finally:
+        background_loop.stop()
+
+
+def test_submit_logs_exceptions(caplog):
+    """
+    A function that tests exceptions of fire-and-forget coroutines are logged
+    """
+    background_loop = BackgroundLoop()
+
+    async def fail():
+        raise ValueError("boom")
+
+    try:
+        future = background_loop.submit(fail())
+        with pytest.raises(ValueError):
+            future.result(timeout=1)
+        # the callback runs on the loop thread, let it finish
+        background_loop.run(asyncio.sleep(0))
+    finally:
+        background_loop.stop()
+
+    assert "Background coroutine failed" in caplog.text
+    assert "boom" in caplog.text
+
+
+def test_get_background_loop_is_shared():
+    """
+    A function that tests the process-wide loop is a singleton
+    """
+    assert get_background_loop() is get_background_loop()
+
+
+def test_attach_running_loop():
+    """
+    A function that tests coroutines submitted from threads run on an attached loop
+    """
+    background_loop = BackgroundLoop()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        background_loop.attach(loop)
+        try:
+            assert await asyncio.to_thread(background_loop.run, current_loop()) is loop
+            coroutine = current_loop()
+            with pytest.raises(RuntimeError):
+                background_loop.run(coroutine)
+            coroutine.close()
+        finally:
+            background_loop.stop()
+
+    asyncio.run(serve())
+    assert not background_loop.is_running()
@@ -0,0 +1,268 @@
+"""
+A file to test the response cache and its backends
+"""
+
+import threading
+import time
+
+import pytest
+
+from ds_webapp.cache.backends import MISSING, CacheBackend, MemoryBackend, RedisBackend
+from ds_webapp.cache.cache import ResponseCache, cached, cached_async
+
+
+class FakeRedis:
+    """
+    A local stand-in for a Redis client
+    """
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        """Returns the stored bytes or None"""
+        entry = self.store.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ex=None):
+        """Stores value, expiring after ex seconds"""
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        self.store[key] = (time.monotonic() + (ex or 3600), value)
+
+    def delete(self, key):
+        """Removes key"""
+        self.store.pop(key, None)
+
+    def scan_iter(self, match="*"):
+        """Iterates over keys matching a prefix pattern"""
+        prefix = match.rstrip("*")
+        return [key for key in list(self.store) if key.startswith(prefix)]
+
+
+class ThreadRecordingRedis(FakeRedis):
+    """
+    A FakeRedis recording the thread every get and set runs on
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def get(self, key):
+        """Returns the stored bytes or None"""
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value, ex=None):
+        """Stores value, expiring after ex seconds"""
+        self.threads.append(threading.get_ident())
+        super().set(key, value, ex=ex)
+
+
+class DownRedis(FakeRedis):
+    """
+    A FakeRedis whose server cannot be reached
+    """
+
+    def get(self, key):
+        """Fails to connect"""
+        raise ConnectionRefusedError("Connection refused")
+
+    def set(self, key, value, ex=None):
+        """Fails to connect"""
+        raise TimeoutError("Timed out")
+
+
+def test_memory_backend_lru_eviction():
+    """
+    A function that tests the least recently used entry is evicted first
+    """
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1
+
+    backend.set("c", 3, ttl=60)
+
+    assert backend.get("b") is MISSING
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+    assert backend.evictions == 1
+
+
+def test_incomplete_backend_fails_on_construction():
+    """
+    A function that tests a backend missing abstract methods cannot be created
+    """
+
+    class GetOnlyBackend(CacheBackend):  # pylint: disable=abstract-method
+        """A backend that only implements get"""
+
+        def get(self, key):
+            return MISSING
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()  # pylint: disable=abstract-class-instantiated
+
+
+def test_memory_backend_ttl():
+    """
+    A function that tests entries expire after their ttl
+    """
+    backend = MemoryBackend()
+    backend.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("a") is MISSING
+
+
+def test_cache_counters():
+    """
+    A function that tests hits and misses are counted
+    """
+    cache = ResponseCache(MemoryBackend())
+    calls = []
+
+    @cached("double", ttl=60, cache=cache)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    assert double(2) == 4
+    assert double(2) == 4
+    assert double(3) == 6
+    assert calls == [2, 3]
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 0, "size": 2}
+
+
+def test_single_flight():
+    """
+    A function that tests concurrent misses of one key run a single computation
+    """
+    cache = ResponseCache(MemoryBackend())
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(timeout=1)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("key", 60, compute))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached():
+    """
+    A function that tests failing computations are retried on the next call
+    """
+    cache = ResponseCache(MemoryBackend())
+
+    def fail():
+        raise ValueError("upstream error")
+
+    try:
+        cache.get_or_compute("key", 60, fail)
+    except ValueError:
+        pass
+
+    assert cache.get_or_compute("key", 60, lambda: "value") == "value"
+
+
+def test_redis_backend():
+    """
+    A function that tests the shared backend with a local Redis stand-in
+    """
+    client = FakeRedis()
+    cache = ResponseCache(RedisBackend(client, prefix="test:"))
+
+    assert cache.get_or_compute("genres", 60, lambda: [{"id": 28}]) == [{"id": 28}]
+    assert cache.get("genres") == [{"id": 28}]
+    assert cache.stats()["size"] == 1
+    assert list(client.store) == ["test:genres"]
+
+    cache.clear()
+    assert cache.get("genres") is MISSING
+
+
+def test_unavailable_backend_falls_through():
+    """
+    A function that tests a backend connection error is a miss and skips the store
+    """
+    cache = ResponseCache(RedisBackend(DownRedis(), prefix="test:"))
+    calls = []
+
+    @cached("double", ttl=60, cache=cache)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    assert double(2) == 4
+    assert double(2) == 4
+    assert calls == [2, 2]
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_async_falls_through_an_unavailable_backend():
+    """
+    A function that tests async callers also reach upstream when the backend is down
+    """
+    cache = ResponseCache(RedisBackend(DownRedis(), prefix="test:"))
+
+    @cached_async("double", ttl=60, cache=cache)
+    async def double(x):
+        return 2 * x
+
+    assert await double(3) == 6
+
+
+def test_backend_errors_are_not_swallowed_by_default():
+    """
+    A function that tests only the backend's declared errors fall through
+    """
+
+    class BrokenRedis(FakeRedis):
+        """A FakeRedis with a bug"""
+
+        def get(self, key):
+            """Fails with a programming error"""
+            raise KeyError(key)
+
+    cache = ResponseCache(RedisBackend(BrokenRedis(), prefix="test:"))
+    with pytest.raises(KeyError):
+        cache.get("key")
+
+
+@pytest.mark.asyncio
+async def test_cached_async_keeps_blocking_backends_off_the_loop():
+    """
+    A function that tests async callers reach a blocking backend from a worker thread
+    """
+    client = ThreadRecordingRedis()
+    cache = ResponseCache(RedisBackend(client, prefix="test:"))
+
+    @cached_async("double", ttl=60, cache=cache)
+    async def double(x):
+        return 2 * x
+
+    assert await double(2) == 4
+    assert await double(2) == 4
+    assert len(client.threads) == 3
+    assert threading.get_ident() not in client.threads
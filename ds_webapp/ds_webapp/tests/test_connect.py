@@ -4,6 +4,7 @@ A file with database connection tests
 
 import pytest
 from ..database.connect import Database
+from ..database.statements import register_statement, statements
 
 
 @pytest.mark.asyncio
@@ -81,3 +82,43 @@ async def test_insert():
         sql_drop = "DROP TABLE IF EXISTS test_users;"
         await db.query(sql=sql_drop, params=[])
         await db.close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_query():
+    """
+    A function to test queries that borrow connections from the pool
+    """
+    db = Database(pooled=True, min_size=1, max_size=2)
+
+    try:
+        assert await db.health_check()
+
+        result = await db.query(sql="SELECT $1::int AS value;", params=[1])
+        assert result[0]["value"] == 1
+
+        pool = db.pool
+        await db.query(sql="SELECT 1;", params=[])
+        assert db.pool is pool
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_statement():
+    """
+    A function to test that a registered statement is prepared once per pooled connection
+    """
+    register_statement("tests.select_value", "SELECT $1::int AS value")
+    db = Database(pooled=True, min_size=1, max_size=1)
+
+    try:
+        for value in range(3):
+            result = await db.execute("tests.select_value", params=[value])
+            assert result[0]["value"] == value
+
+        stats = statements.stats()["tests.select_value"]
+        assert stats["prepares"] == 1
+        assert stats["count"] >= 3
+    finally:
+        await db.close()
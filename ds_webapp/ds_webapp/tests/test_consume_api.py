@@ -10,9 +10,11 @@ Tests for the API showcasing the following functionalities:
 
 import pytest
 from ds_webapp.database.tables import Favorites, Users
-from ds_webapp.api_client.tmdb_client import (
+from ds_webapp.api_client.async_tmdb_client import (
     get_movies_with_same_genres,
     get_movies_with_similar_runtime,
+)
+from ds_webapp.api_client.tmdb_client import (
     get_popular_movies,
     search_movie,
 )
@@ -56,14 +58,15 @@ def test_popular_movies():
 
 
 # ** Functionality 2: Return movies with the same genres **
-def test_genres_in_common(movie: str):
+@pytest.mark.asyncio
+async def test_genres_in_common(movie: str):
     """
     Tests finding movies that share all genres with a given movie.
     """
     print("\n===== Functionality 2: Movies with Same Genres =====")
     print(f"Searching for movies that share all genres with '{movie}'...\n")
 
-    result = get_movies_with_same_genres(movie)
+    result = await get_movies_with_same_genres(movie)
     assert result is not None
 
     print("Movies with matching genres:")
@@ -71,14 +74,15 @@ def test_genres_in_common(movie: str):
 
 
 # ** Functionality 3: Return movies with similar runtime (+/- 10 min) **
-def test_genres_similar_runtime(movie: str):
+@pytest.mark.asyncio
+async def test_genres_similar_runtime(movie: str):
     """
     Tests finding movies with a similar runtime to a given movie.
     """
     print("\n===== Functionality 3: Movies with Similar Runtime =====")
     print(f"Searching for movies with a runtime within ±10 minutes of '{movie}'...\n")
 
-    result = get_movies_with_similar_runtime(movie)
+    result = await get_movies_with_similar_runtime(movie)
     assert result is not None
 
     print("Movies with similar runtimes:")
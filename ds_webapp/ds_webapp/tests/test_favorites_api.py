@@ -0,0 +1,94 @@
+"""
+A file to test favorites_api.py
+"""
+
+from ds_webapp.authentication.authentication import create_jwt_token
+from ds_webapp.database.tables import Favorites
+
+
+def test_bulk_favorites(client, monkeypatch):
+    """
+    A function that tests many favorites change in one call with an outcome per movie id
+    """
+    calls = []
+
+    async def like_movies(_self, movie_ids, user_id):
+        calls.append(("like", movie_ids, user_id))
+        return [movie_id for movie_id in movie_ids if movie_id != 2]
+
+    async def unlike_movies(_self, movie_ids, user_id):
+        calls.append(("unlike", movie_ids, user_id))
+        return [2]
+
+    monkeypatch.setattr(Favorites, "like_movies", like_movies)
+    monkeypatch.setattr(Favorites, "unlike_movies", unlike_movies)
+    headers = {"Authorization": f"Bearer {create_jwt_token({'user_id': 5})}"}
+
+    response = client.post(
+        "/movies/favorite/batch", json={"movie_ids": [1, 2, 1, 3]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [
+        {"movie_id": 1, "status": "added"},
+        {"movie_id": 2, "status": "exists"},
+        {"movie_id": 3, "status": "added"},
+    ]
+
+    response = client.delete(
+        "/movies/favorite/batch", json={"movie_ids": [2, 4]}, headers=headers
+    )
+    assert [result["status"] for result in response.get_json()["results"]] == [
+        "removed",
+        "not_found",
+    ]
+    assert calls == [("like", [1, 2, 3], 5), ("unlike", [2, 4], 5)]
+
+    for body in (
+        {"movie_ids": [0]},
+        {"movie_ids": "x"},
+        {},
+        {"movie_ids": list(range(1, 502))},
+    ):
+        response = client.post("/movies/favorite/batch", json=body, headers=headers)
+        assert response.status_code == 400
+    assert (
+        client.post("/movies/favorite/batch", json={"movie_ids": [1]}).status_code
+        == 401
+    )
+
+
+def test_favorites_pages(client, monkeypatch):
+    """
+    A function that tests paging through the favorites with after and limit and counting them
+    """
+    stored = [
+        {"movie_id": movie_id, "details": {"id": movie_id}} for movie_id in (3, 5, 8)
+    ]
+
+    async def get_favorite_movies(_self, user_id, max_age, after=-1, limit=None):
+        assert user_id == 5 and max_age > 0
+        rows = [{**row, "stale": False} for row in stored if row["movie_id"] > after]
+        return rows if limit is None else rows[:limit]
+
+    async def count_favorites(_self, user_id):
+        return len(stored) if user_id == 5 else 0
+
+    monkeypatch.setattr(Favorites, "get_favorite_movies", get_favorite_movies)
+    monkeypatch.setattr(Favorites, "count_favorites", count_favorites)
+    headers = {"Authorization": f"Bearer {create_jwt_token({'user_id': 5})}"}
+
+    response = client.get("/movies/favorite?limit=2", headers=headers)
+    assert [movie["id"] for movie in response.get_json()["results"]] == [3, 5]
+    assert response.headers["X-Next-After"] == "5"
+
+    response = client.get("/movies/favorite?limit=2&after=5", headers=headers)
+    assert [movie["id"] for movie in response.get_json()["results"]] == [8]
+    assert "X-Next-After" not in response.headers
+
+    response = client.get("/movies/favorite", headers=headers)
+    assert len(response.get_json()["results"]) == 3
+    assert client.get("/movies/favorite?limit=0", headers=headers).status_code == 400
+
+    response = client.get("/movies/favorite/count", headers=headers)
+    assert response.get_json() == {"count": 3}
+    assert client.get("/movies/favorite/count").status_code == 401
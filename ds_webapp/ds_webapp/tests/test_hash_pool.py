@@ -0,0 +1,61 @@
+"""
+A file to test hash_pool.py
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from ds_webapp.authentication.hash_pool import HashPool, HashPoolBusy
+from ds_webapp.database.tables import Users
+
+
+@pytest.mark.asyncio
+async def test_backpressure_and_stats():
+    """
+    A function that tests hashes beyond the threads and queue are rejected and timed otherwise
+    """
+    pool = HashPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    def slow_hash(value):
+        release.wait(timeout=5)
+        return value * 2
+
+    try:
+        running = asyncio.ensure_future(pool.run("hash", slow_hash, 1))
+        queued = asyncio.ensure_future(pool.run("hash", slow_hash, 2))
+        await asyncio.sleep(0)
+        with pytest.raises(HashPoolBusy):
+            await pool.run("verify", slow_hash, 3)
+        assert pool.stats()["pending"] == 2
+
+        release.set()
+        assert await asyncio.gather(running, queued) == [2, 4]
+        assert await pool.run("verify", slow_hash, 3) == 6
+
+        stats = pool.stats()
+        assert stats["pending"] == 0
+        assert stats["rejected"] == 1
+        assert stats["hash_count"] == 2
+        assert stats["verify_count"] == 1
+        assert stats["hash_max_ms"] >= stats["hash_mean_ms"] > 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_login_backpressure(client, monkeypatch):
+    """
+    A function that tests logins are answered with 429 while the pool is saturated
+    """
+
+    async def busy(_self, username, password):
+        raise HashPoolBusy(f"{username}:{password}")
+
+    monkeypatch.setattr(Users, "get_user_id", busy)
+    response = client.post("/login", json={"username": "john", "password": "doe"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
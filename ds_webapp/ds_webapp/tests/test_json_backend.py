@@ -0,0 +1,38 @@
+"""
+A file to test json_backend.py
+"""
+
+import json
+from datetime import date
+
+from flask import Flask, jsonify
+
+from ds_webapp import json_backend
+from ds_webapp.json_backend import JSONProvider
+
+
+def test_round_trip(movie_list_example):
+    """
+    A function that tests the backend reads back what it writes
+    """
+    movies = [movie.model_dump() for movie in movie_list_example]
+    assert json_backend.loads(json_backend.dumps(movies)) == movies
+    assert json_backend.loads(json.dumps(movies)) == movies
+
+
+def test_provider_matches_flask_output():
+    """
+    A function that tests jsonify through the provider decodes to what Flask's default produces
+    """
+    payload = {"results": [{"id": 1, "title": "Amélie"}], "released": date(2001, 4, 25)}
+    default_app = Flask("default")
+    app = Flask("fast")
+    app.json = JSONProvider(app)
+
+    with default_app.app_context():
+        expected = json.loads(jsonify(payload).get_data())
+    with app.app_context():
+        response = jsonify(payload)
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == expected
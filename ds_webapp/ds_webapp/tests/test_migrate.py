@@ -0,0 +1,109 @@
+"""
+A file with tests of the schema migration runner
+"""
+
+import pytest
+
+from ..database.connect import Database
+from ..database.migrate import (
+    Migration,
+    Migrator,
+    load_migrations,
+    split_statements,
+    transactional,
+)
+
+
+def test_load_migrations(tmp_path):
+    """
+    A function to test migrations are read by version with their down scripts
+    """
+    (tmp_path / "0002_index.up.sql").write_text("CREATE INDEX CONCURRENTLY i ON t (a);")
+    (tmp_path / "0001_table.up.sql").write_text("CREATE TABLE t (a INT);")
+    (tmp_path / "0001_table.down.sql").write_text("DROP TABLE t;")
+
+    assert load_migrations(tmp_path) == [
+        Migration(1, "table", "CREATE TABLE t (a INT);", "DROP TABLE t;"),
+        Migration(2, "index", "CREATE INDEX CONCURRENTLY i ON t (a);"),
+    ]
+
+    (tmp_path / "0002_other.down.sql").write_text("DROP INDEX i;")
+    with pytest.raises(ValueError):
+        load_migrations(tmp_path)
+    (tmp_path / "0002_other.down.sql").unlink()
+
+    (tmp_path / "0003_orphan.down.sql").write_text("SELECT 1;")
+    with pytest.raises(ValueError):
+        load_migrations(tmp_path)
+    (tmp_path / "0003_orphan.down.sql").unlink()
+
+    (tmp_path / "notes.sql").write_text("SELECT 1;")
+    with pytest.raises(ValueError):
+        load_migrations(tmp_path)
+
+
+def test_shipped_migrations():
+    """
+    A function to test the migrations of the app load and can all be reverted
+    """
+    migrations = load_migrations()
+    assert [migration.version for migration in migrations] == sorted(
+        {migration.version for migration in migrations}
+    )
+    assert all(migration.down for migration in migrations)
+
+
+def test_split_statements():
+    """
+    A function to test migrations outside a transaction are split into statements
+    """
+    sql = """-- rebuild the index
+DROP INDEX CONCURRENTLY IF EXISTS i;  -- a failed build leaves it invalid
+CREATE INDEX CONCURRENTLY i
+    ON t (a);
+"""
+    assert split_statements(sql) == [
+        "DROP INDEX CONCURRENTLY IF EXISTS i",
+        "CREATE INDEX CONCURRENTLY i\n    ON t (a)",
+    ]
+    assert not transactional(sql)
+    assert transactional("ALTER TABLE t ADD COLUMN b INT;")
+
+
+@pytest.mark.asyncio
+async def test_migrate_up_and_down():
+    """
+    A function to test migrations are applied, recorded and reverted
+    """
+    migrations = [
+        Migration(
+            9001,
+            "test_table",
+            "CREATE TABLE test_migrate (a INT);",
+            "DROP TABLE test_migrate;",
+        ),
+        Migration(
+            9002,
+            "test_index",
+            "CREATE INDEX CONCURRENTLY test_migrate_a_idx ON test_migrate (a);",
+            "DROP INDEX CONCURRENTLY test_migrate_a_idx;",
+        ),
+    ]
+    db = Database(pooled=True, min_size=1, max_size=1)
+    migrator = Migrator(db=db, migrations=migrations)
+
+    try:
+        assert await migrator.up(target=9001) == migrations[:1]
+        assert await migrator.up() == migrations[1:]
+        assert not await migrator.up()
+        assert [migration["applied"] for migration in await migrator.status()] == [
+            True,
+            True,
+        ]
+
+        assert await migrator.down() == migrations[1:]
+        assert await migrator.down(target=0) == migrations[:1]
+        assert not any(migration["applied"] for migration in await migrator.status())
+    finally:
+        await migrator.down(target=0)
+        await db.close()
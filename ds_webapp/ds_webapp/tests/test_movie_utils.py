@@ -2,7 +2,12 @@
 A file for testing utils.py
 """
 
-from ds_webapp.api_client.utils import create_movie_list, create_ranked_movie_list
+from ds_webapp.api_client.utils import (
+    create_movie_list,
+    create_ranked_movie_list,
+    same_genre_filters,
+    take_genre_set_difference,
+)
 
 
 def test_create_movie_list(movie_list_example):
@@ -21,3 +26,24 @@ def test_create_ranked_movie_list(movie_list_example):
 
     assert "title" in create_ranked_movie_list(movie_list_example, 1)[0]
     assert "rank" in create_ranked_movie_list(movie_list_example, 1)[0]
+
+
+def test_same_genre_filters():
+    """
+    A function that tests the discover filters built from a search result
+    """
+    genres = [{"id": 12}, {"id": 14}, {"id": 28}]
+
+    assert same_genre_filters(genres, [{"genre_ids": [12, 14]}]) == ("12,14", "28")
+    assert same_genre_filters(genres, []) is None
+    assert same_genre_filters([], [{"genre_ids": [12]}]) is None
+
+
+def test_take_genre_set_difference():
+    """
+    A function that tests genres are excluded in genre list order
+    """
+    genres = [{"id": 28}, {"id": 12}, {"id": 14}, {"id": 35}]
+
+    assert take_genre_set_difference(genres, [14, 12]) == [28, 35]
+    assert take_genre_set_difference(genres, [99]) == [28, 12, 14, 35]
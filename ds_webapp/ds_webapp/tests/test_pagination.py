@@ -0,0 +1,94 @@
+"""
+A file to test pagination.py
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ds_webapp.api_client.pagination import (
+    PAGE_SIZE,
+    apaginate,
+    decode_cursor,
+    encode_cursor,
+    iter_pages,
+    local_window,
+)
+
+TOTAL = 95
+
+
+def listing(page: int) -> list:
+    """
+    Returns a page of a fake TMDB listing holding the ids 0 to TOTAL - 1
+    """
+    start = (page - 1) * PAGE_SIZE
+    return list(range(start, min(start + PAGE_SIZE, TOTAL)))
+
+
+def test_cursor_round_trip():
+    """
+    A function that tests cursors decode to the offset they were made from
+    """
+    assert decode_cursor(encode_cursor(0)) == 0
+    assert decode_cursor(encode_cursor(140)) == 140
+    for cursor in ["not a cursor", encode_cursor(-1), "%%%"]:
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_pages_are_fetched_lazily_with_prefetch():
+    """
+    A function that tests only the consumed page and the next one are fetched
+    and that paging stops after the last, partial page
+    """
+    fetched = []
+
+    def fetch_page(page):
+        fetched.append(page)
+        return listing(page)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pages = iter_pages(fetch_page, executor, first_page=2)
+        assert next(pages) == listing(2)
+        executor.submit(lambda: None).result()
+        assert sorted(fetched) == [2, 3]
+
+        assert [page[0] for page in pages] == [40, 60, 80]
+    assert sorted(fetched) == [2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_apaginate():
+    """
+    A function that tests offsets and limits spanning pages and the end of the listing
+    """
+    in_flight = set()
+    overlaps = []
+
+    async def fetch_page(page):
+        in_flight.add(page)
+        overlaps.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.discard(page)
+        return listing(page)
+
+    assert await apaginate(fetch_page, 0, 3) == [0, 1, 2]
+    overlaps.clear()
+    assert await apaginate(fetch_page, 15, 50) == list(range(15, 65))
+    # the three pages holding 15..64 are fetched together
+    assert max(overlaps) >= 3
+    assert await apaginate(fetch_page, 90, 20) == list(range(90, 95))
+    assert await apaginate(fetch_page, 200, 20) == []
+
+
+def test_local_window():
+    """
+    A function that tests a local source only answers pages it holds completely
+    """
+    local = listing(1) + listing(2)[:5]
+    assert local_window(local, 0, 21) == local[:21]
+    assert local_window(local, 20, 21) is None
+    assert local_window([], 0, 21) is None
+    assert local_window(None, 0, 21) is None
@@ -0,0 +1,139 @@
+"""
+A file to test responses.py
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+from ds_webapp.api_client.pagination import encode_cursor
+from ds_webapp.responses import (
+    error_response,
+    finalize_response,
+    keyset_args,
+    keyset_page,
+    pagination_args,
+    project,
+    projection_args,
+)
+
+app = Flask(__name__)
+app.after_request(finalize_response)
+
+
+@app.route("/movies/<int:n>")
+def movies(n: int):
+    """
+    Returns n fake movies
+    """
+    response = jsonify([{"id": i, "title": f"Movie {i}"} for i in range(n)])
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def test_pagination_args():
+    """
+    A function that tests cursors take precedence over pages and bounds are enforced
+    """
+    with app.test_request_context("/?page=3&limit=50"):
+        assert pagination_args() == (100, 50)
+    with app.test_request_context(f"/?page=3&cursor={encode_cursor(7)}"):
+        assert pagination_args(default_limit=5) == (7, 5)
+
+    for query in ["limit=0", "limit=501", "page=0", "page=1000", "cursor=x"]:
+        with app.test_request_context(f"/?{query}"):
+            with pytest.raises(ValueError):
+                pagination_args()
+
+
+def test_keyset_pagination():
+    """
+    A function that tests after and limit and the X-Next-After header of a page
+    """
+    assert keyset_args({}) == (-1, None)
+    assert keyset_args({"after": "42", "limit": "10"}) == (42, 10)
+    for args in [{"limit": "0"}, {"limit": "501"}, {"limit": "x"}]:
+        with pytest.raises(ValueError):
+            keyset_args(args)
+
+    rows = [{"movie_id": movie_id} for movie_id in (2, 4, 6)]
+    assert keyset_page(rows, 2) == (rows[:2], {"X-Next-After": "4"})
+    assert keyset_page(rows, 3) == (rows, {})
+    assert keyset_page(rows, None) == (rows, {})
+
+
+def test_projection(movie_list_example):
+    """
+    A function that tests fields and named views select the returned movie fields
+    """
+    with app.test_request_context("/"):
+        assert projection_args() is None
+    with app.test_request_context("/?view=title&fields=id,overview,id"):
+        fields = projection_args()
+    assert fields == ("id", "overview")
+    with app.test_request_context("/?view=card"):
+        assert "vote_average" in projection_args()
+
+    for query in ["view=huge", "fields=id,,title", "fields=__class__.x"]:
+        with app.test_request_context(f"/?{query}"):
+            with pytest.raises(ValueError):
+                projection_args()
+
+    movies = [movie.model_dump() for movie in movie_list_example]
+    projected = project(movies + [{"id": 1}], fields)
+    assert projected[0] == {"id": movies[0]["id"], "overview": movies[0]["overview"]}
+    assert projected[-1] == {"id": 1}
+    assert project(movies, None) is movies
+
+
+def test_error_response():
+    """
+    A function that tests error responses carry their status and are not stored
+    """
+    with app.app_context():
+        response = error_response({"error": "Bad Request"}, 400)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Bad Request"}
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+def test_etag_and_conditional_get():
+    """
+    A function that tests a repeated request with the ETag gets an empty 304
+    """
+    client = app.test_client()
+    response = client.get("/movies/2")
+    etag = response.headers["ETag"]
+    assert "Content-Encoding" not in response.headers
+
+    not_modified = client.get("/movies/2", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.headers["Cache-Control"] == "private, no-cache"
+
+    changed = client.get("/movies/3", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+
+
+def test_large_responses_are_compressed():
+    """
+    A function that tests large bodies are gzipped when accepted and the
+    compressed and identity representations validate each other
+    """
+    client = app.test_client()
+    identity = client.get("/movies/100")
+    response = client.get("/movies/100", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == identity.data
+    assert len(response.data) < len(identity.data) / 4
+    assert response.headers["ETag"] != identity.headers["ETag"]
+
+    revalidated = client.get(
+        "/movies/100",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
@@ -0,0 +1,92 @@
+"""
+A file to test runtime_index.py
+"""
+
+from ds_webapp.api_client.runtime_index import RuntimeIndex
+
+
+def details(movie_id: int, runtime: int, popularity: float = 1.0) -> dict:
+    """
+    Returns a minimal movie details payload
+    """
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "runtime": runtime,
+        "popularity": popularity,
+        "genres": [{"id": 12, "name": "Adventure"}],
+    }
+
+
+def test_range_query():
+    """
+    A function that tests range queries are inclusive and ordered by popularity
+    """
+    index = RuntimeIndex()
+    for movie_id, runtime, popularity in [
+        (1, 90, 1),
+        (2, 100, 5),
+        (3, 110, 3),
+        (4, 111, 9),
+    ]:
+        index.add(details(movie_id, runtime, popularity))
+    index.add({"id": 5, "runtime": None})
+
+    assert [movie["id"] for movie in index.range(90, 110)] == [2, 3, 1]
+    assert index.range(90, 110)[0]["genre_ids"] == [12]
+    assert index.range(120, 130) == []
+    assert len(index) == 4
+
+
+def test_update_and_eviction():
+    """
+    A function that tests re-adding a movie moves it and the bound evicts the oldest
+    """
+    index = RuntimeIndex(max_entries=2)
+    index.add(details(1, 90))
+    index.add(details(1, 120))
+    assert index.runtime_of(1) == 120
+    assert index.range(90, 90) == []
+
+    index.add(details(2, 95))
+    index.add(details(3, 96))
+    assert index.runtime_of(1) is None
+    assert len(index) == 2
+
+
+def test_similar_needs_enough_results():
+    """
+    A function that tests the index only answers when it knows enough movies
+    """
+    index = RuntimeIndex(min_results=3)
+    index.add(details(1, 100))
+    index.add(details(2, 105))
+    assert index.similar(100, tolerance=10) is None
+
+    index.add(details(3, 95))
+    assert len(index.similar(100, tolerance=10)) == 3
+    assert index.similar(100, tolerance=2) is None
+
+
+def test_add_many_list_results():
+    """
+    A function that tests catalog rows are added in bulk and replace older entries
+    """
+    index = RuntimeIndex(max_entries=3)
+    index.add(details(1, 90))
+    index.add_many(
+        [
+            {"id": 1, "runtime": 120, "genre_ids": [18], "popularity": 1},
+            {"id": 2, "runtime": 100, "genre_ids": [18], "popularity": 3},
+            {"id": 3, "runtime": None},
+            {"id": 4, "runtime": 110, "popularity": 2},
+        ]
+    )
+
+    assert index.runtime_of(1) == 120
+    assert [movie["id"] for movie in index.range(90, 130)] == [2, 4, 1]
+    assert index.range(120, 120)[0]["genre_ids"] == [18]
+
+    index.add(details(5, 95))
+    assert index.runtime_of(1) is None
+    assert len(index) == 3
@@ -0,0 +1,59 @@
+"""
+A file to test serve.py
+"""
+
+import pytest
+
+from ds_webapp.serve import Server, init_worker, parse_args, server_options
+
+
+def test_server_options(monkeypatch):
+    """
+    A function that tests the command line and environment map to gunicorn settings
+    """
+    monkeypatch.setenv("WEB_THREADS", "6")
+    options = server_options(parse_args(["--workers", "3", "--bind", "127.0.0.1:8000"]))
+
+    assert options["workers"] == 3
+    assert options["threads"] == 6
+    assert options["bind"] == "127.0.0.1:8000"
+    assert options["worker_class"] == "gthread"
+    assert options["post_worker_init"] is init_worker
+
+    server = Server(options)
+    assert server.cfg.workers == 3
+    assert server.cfg.threads == 6
+
+
+def test_asgi_server_options():
+    """
+    A function that tests --asgi runs uvicorn workers that manage their own resources
+    """
+    options = server_options(parse_args(["--asgi", "--workers", "2"]))
+
+    assert options["worker_class"] == "uvicorn_worker.UvicornWorker"
+    assert "post_worker_init" not in options
+    assert Server(options, asgi=True).cfg.workers == 2
+
+
+def test_pools_fit_the_connection_budget(monkeypatch):
+    """
+    A function that tests the DB pools of all workers never exceed --db-connections
+    """
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("POSTGRES_POOL_MAX_SIZE", raising=False)
+    monkeypatch.setenv("POSTGRES_POOL_MIN_SIZE", "5")
+    monkeypatch.setattr("multiprocessing.cpu_count", lambda: 8)
+
+    args = parse_args(["--db-connections", "90"])
+    options = server_options(args)
+    assert args.workers == 17
+    assert options["raw_env"] == [
+        "POSTGRES_POOL_MIN_SIZE=5",
+        "POSTGRES_POOL_MAX_SIZE=5",
+    ]
+    assert Server(options).cfg.env["POSTGRES_POOL_MAX_SIZE"] == "5"
+
+    assert parse_args(["--db-connections", "4"]).workers == 4
+    with pytest.raises(SystemExit):
+        parse_args(["--workers", "5", "--db-connections", "4"])
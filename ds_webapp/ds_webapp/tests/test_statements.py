@@ -0,0 +1,91 @@
+"""
+A file with tests of the prepared statement registry
+"""
+
+import asyncpg
+import pytest
+
+from ..database.statements import StatementConnection, StatementRegistry, statements
+
+
+class FakeStatement:  # pylint: disable=too-few-public-methods
+    """
+    A prepared statement returning its arguments, or failing once when stale
+    """
+
+    def __init__(self, stale: bool):
+        self.stale = stale
+
+    async def fetch(self, *args):
+        """
+        Returns the arguments as the only row
+        """
+        if self.stale:
+            raise asyncpg.InvalidCachedStatementError("cached plan must not change")
+        return [args]
+
+
+class FakeConnection:  # pylint: disable=too-few-public-methods
+    """
+    A connection with the statement methods of StatementConnection
+    """
+
+    prepared = StatementConnection.prepared
+    fetch_statement = StatementConnection.fetch_statement
+
+    def __init__(self, stale_prepares: int = 0):
+        self._prepared = {}
+        self.prepares = 0
+        self.stale_prepares = stale_prepares
+
+    async def prepare(self, sql: str):
+        """
+        Returns a fake prepared statement, the first stale_prepares ones are stale
+        """
+        assert sql == "SELECT $1::int"
+        self.prepares += 1
+        return FakeStatement(stale=self.prepares <= self.stale_prepares)
+
+
+def test_registry():
+    """
+    A function to test registering statements and their statistics
+    """
+    registry = StatementRegistry()
+    assert registry.register("one", "SELECT 1") == "one"
+    assert registry.register("one", "SELECT 1") == "one"
+    with pytest.raises(ValueError):
+        registry.register("one", "SELECT 2")
+
+    registry.record_prepare("one")
+    registry.record_execution("one", 0.002)
+    registry.record_execution("one", 0.004)
+    assert registry.stats() == {
+        "one": {"count": 2, "prepares": 1, "mean_ms": pytest.approx(3.0), "max_ms": 4.0}
+    }
+
+    registry.reset()
+    assert not registry.stats()
+
+
+@pytest.mark.asyncio
+async def test_fetch_statement():
+    """
+    A function to test that a statement is prepared once per connection and
+    prepared again when its plan went stale
+    """
+    statements.register("tests.fake_select", "SELECT $1::int")
+    statements.reset()
+
+    conn = FakeConnection()
+    for value in range(3):
+        assert await conn.fetch_statement("tests.fake_select", value) == [(value,)]
+    assert conn.prepares == 1
+
+    stale = FakeConnection(stale_prepares=1)
+    assert await stale.fetch_statement("tests.fake_select", 7) == [(7,)]
+    assert stale.prepares == 2
+
+    stats = statements.stats()["tests.fake_select"]
+    assert stats["count"] == 4
+    assert stats["prepares"] == 3
@@ -3,7 +3,8 @@ A file to test tables.py
 """
 
 import pytest
-from ds_webapp.database.tables import Users, Hasher, Favorites
+from ds_webapp.database import tables
+from ds_webapp.database.tables import Users, Hasher, Favorites, Movies, Catalog
 
 
 @pytest.mark.asyncio
@@ -55,6 +56,34 @@ def test_password_hasher():
         password="password", hashed_password=hashed_password.encode("utf-8")
     )
 
+    assert not h.needs_rehash(h.hash_password("password", rounds=4), rounds=4)
+    assert h.needs_rehash(h.hash_password("password", rounds=4), rounds=5)
+
+
+@pytest.mark.asyncio
+async def test_rehash_on_login(db, monkeypatch):
+    """
+    A function to test a password hashed with an outdated cost is rehashed on login
+    """
+    user_table = Users(db=db)
+    user_id = None
+    monkeypatch.setattr(tables, "BCRYPT_ROUNDS", 4)
+
+    try:
+        user_id = await user_table.add_user(username="jane doe", password="password")
+        monkeypatch.setattr(tables, "BCRYPT_ROUNDS", 5)
+
+        assert (
+            await user_table.get_user_id(username="jane doe", password="password")
+            == user_id
+        )
+        user = await user_table.get_user(user_id)
+        assert not Hasher.needs_rehash(user[0]["password"], rounds=5)
+        assert not await user_table.get_user_id(username="jane doe", password="wrong")
+    finally:
+        if user_id:
+            await user_table.delete_user(user_id=user_id)
+
 
 @pytest.mark.asyncio
 async def test_favorites(db):
@@ -86,7 +115,148 @@ async def test_favorites(db):
         favorites_after_delete = await favorites_table.get_favorites(user_id=user_id)
         assert not favorites_after_delete
 
+        assert await favorites_table.like_movies([1, 2], user_id=user_id) == [1, 2]
+        assert await favorites_table.like_movies([2, 3], user_id=user_id) == [3]
+        assert sorted(
+            await favorites_table.unlike_movies([1, 3, 4], user_id=user_id)
+        ) == [1, 3]
+        favorites = await favorites_table.get_favorites(user_id=user_id)
+        assert [f["movie_id"] for f in favorites] == [2]
+
+        await favorites_table.like_movies([5, 7], user_id=user_id)
+        assert await favorites_table.count_favorites(user_id=user_id) == 3
+        favorites = await favorites_table.get_favorites(user_id=user_id, limit=2)
+        assert [f["movie_id"] for f in favorites] == [2, 5]
+        assert favorites[0]["created_at"] is not None
+        favorites = await favorites_table.get_favorites(
+            user_id=user_id, after=5, limit=2
+        )
+        assert [f["movie_id"] for f in favorites] == [7]
+
     finally:
         await favorites_table.unlike_movie(movie_id=movie_id, user_id=user_id)
+        if user_id:
+            await favorites_table.unlike_movies([1, 2, 3, 5, 7], user_id=user_id)
         if user_id:
             await user_table.delete_user(user_id=user_id)
+
+
+@pytest.mark.asyncio
+async def test_movies(db):
+    """
+    A function to test the movies table and the favorites join
+    """
+    user_table = Users(db=db)
+    favorites_table = Favorites(db=db)
+    movies_table = Movies(db=db)
+    movie = {"id": 0, "title": "Test Movie", "runtime": 120, "release_date": ""}
+    user_id = None
+
+    try:
+        user_id = await user_table.add_user(username="john doe", password="password")
+        await favorites_table.like_movie(movie_id=movie["id"], user_id=user_id)
+
+        favorites = await favorites_table.get_favorite_movies(user_id, max_age=3600)
+        assert favorites == [{"movie_id": 0, "details": None, "stale": False}]
+
+        await movies_table.upsert_movie(movie)
+        await movies_table.upsert_movie({**movie, "runtime": 121})
+        assert (await movies_table.get_movie(movie["id"]))["runtime"] == 121
+
+        favorites = await favorites_table.get_favorite_movies(user_id, max_age=3600)
+        assert favorites[0]["details"]["title"] == "Test Movie"
+        assert not favorites[0]["stale"]
+
+        favorites = await favorites_table.get_favorite_movies(user_id, max_age=0)
+        assert favorites[0]["stale"]
+
+    finally:
+        await movies_table.delete_movie(movie_id=movie["id"])
+        if user_id:
+            await favorites_table.unlike_movie(movie_id=movie["id"], user_id=user_id)
+            await user_table.delete_user(user_id=user_id)
+
+
+@pytest.mark.asyncio
+async def test_catalog(db):
+    """
+    A function to test bulk-loading the catalog and the genre lookup
+    """
+    catalog = Catalog(db=db)
+    movies = [
+        {"id": -1, "title": "Old", "genre_ids": [12, 14], "popularity": 1.0},
+        {"id": -2, "title": "Other", "genre_ids": [12], "popularity": 2.0},
+        {"id": -1, "title": "New", "genre_ids": [12, 14], "popularity": 3.0},
+    ]
+
+    try:
+        loaded = await catalog.bulk_load(
+            [Catalog.to_record({**movie, "release_date": ""}) for movie in movies]
+        )
+        assert loaded == 3
+
+        result = await catalog.get_movies_with_genres([14, 12])
+        assert [movie["id"] for movie in result] == [-1]
+        assert result[0]["release_date"] is None
+    finally:
+        await catalog.delete_movies([-1, -2])
+
+
+@pytest.mark.asyncio
+async def test_catalog_runtimes(db):
+    """
+    A function to test stored runtimes survive reloading list results without one
+    """
+    catalog = Catalog(db=db)
+    movies = [
+        {"id": -1, "title": "Short", "popularity": 1.0},
+        {"id": -2, "title": "Unknown", "popularity": 2.0},
+    ]
+
+    try:
+        await catalog.bulk_load([Catalog.to_record(movie) for movie in movies])
+        await catalog.set_runtimes({-1: 85})
+        await catalog.bulk_load([Catalog.to_record(movie) for movie in movies])
+
+        result = await catalog.get_movies_with_runtime(limit=100_000)
+        assert [(m["id"], m["runtime"]) for m in result if m["id"] < 0] == [(-1, 85)]
+    finally:
+        await catalog.delete_movies([-1, -2])
+
+
+def test_catalog_prefix_query():
+    """
+    A function to test search text is turned into a prefix tsquery
+    """
+    assert Catalog.prefix_query("Harry Pot") == "harry:* & pot:*"
+    assert Catalog.prefix_query("  spider-man: no!") == "spider:* & man:* & no:*"
+    assert Catalog.prefix_query("'&|!") == ""
+    assert Catalog.prefix_query("Harry Pot", weights="A") == "harry:*A & pot:*A"
+
+
+@pytest.mark.asyncio
+async def test_catalog_search(db):
+    """
+    A function to test prefix and fuzzy search over the catalog, which only
+    answers queries matching a title
+    """
+    catalog = Catalog(db=db)
+    movies = [
+        {"id": -1, "title": "Harry Potter", "popularity": 10.0},
+        {"id": -2, "title": "Harry and the Hendersons", "popularity": 1.0},
+        {"id": -3, "title": "Heat", "overview": "A potter's wheel", "popularity": 5.0},
+    ]
+
+    try:
+        await catalog.bulk_load([Catalog.to_record(movie) for movie in movies])
+
+        assert [movie["id"] for movie in await catalog.search("harry pot")] == [-1]
+        assert [movie["id"] for movie in await catalog.search("harry")] == [-1, -2]
+        # title matches come first, overview matches follow them
+        assert [movie["id"] for movie in await catalog.search("potter")] == [-1, -3]
+        assert "title_match" not in (await catalog.search("potter"))[0]
+        # overview or fuzzy hits alone are left to TMDB
+        assert await catalog.search("wheel") == []
+        assert await catalog.search("hary poter") == []
+    finally:
+        await catalog.delete_movies([-1, -2, -3])
@@ -0,0 +1,111 @@
+"""
+A file to test title_index.py
+"""
+
+from ds_webapp.api_client.title_index import MAX_SCAN, TitleIndex, normalize_title
+
+
+def movie(movie_id: int, title: str, popularity: float = 1.0) -> dict:
+    """
+    Returns a minimal TMDB list result
+    """
+    return {"id": movie_id, "title": title, "popularity": popularity}
+
+
+class CountingDict(dict):
+    """
+    A dict counting its item lookups
+    """
+
+    lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+def test_normalize_title():
+    """
+    A function that tests titles are lowercased without accents and punctuation
+    """
+    assert normalize_title("Amélie: Le Fabuleux Destin!") == "amelie le fabuleux destin"
+    assert normalize_title("  Spider-Man ") == "spider man"
+    assert normalize_title(None) == ""
+
+
+def test_suggest_matches_word_prefixes_by_popularity():
+    """
+    A function that tests any title word may start the match and popular movies come first
+    """
+    index = TitleIndex()
+    index.add_many(
+        [
+            movie(1, "Harry Potter and the Philosopher's Stone", 50),
+            movie(2, "Harry and the Hendersons", 5),
+            movie(3, "The Dirty Harry", 20),
+            movie(4, "Heat", 30),
+            {"id": 5, "title": ""},
+        ]
+    )
+
+    assert [result["id"] for result in index.suggest("harry")] == [1, 3, 2]
+    assert [result["id"] for result in index.suggest("HARRY P")] == [1]
+    assert [result["id"] for result in index.suggest("pot")] == [1]
+    assert [result["id"] for result in index.suggest("h", limit=2)] == [1, 4]
+    assert index.suggest("zzz") == []
+    assert index.suggest("!") == []
+    assert len(index) == 4
+
+
+def test_update_and_eviction():
+    """
+    A function that tests re-adding a movie replaces it and the bound evicts the least popular
+    """
+    index = TitleIndex(max_entries=2)
+    index.add(movie(1, "Alien", 10))
+    index.add(movie(1, "Aliens", 1))
+    assert [result["title"] for result in index.suggest("alien")] == ["Aliens"]
+
+    index.add(movie(2, "Avatar", 5))
+    index.add(movie(3, "Amadeus", 3))
+    assert len(index) == 2
+    assert [result["id"] for result in index.suggest("a")] == [2, 3]
+
+
+def test_readding_keeps_keys_and_updates_popularity():
+    """
+    A function that tests re-adding a movie under the same title only re-ranks it
+    """
+    index = TitleIndex()
+    index.add_many([movie(1, "Heat", 1), movie(2, "Her", 2)])
+    keys = list(index._keys)  # pylint: disable=protected-access
+
+    index.add_many([movie(1, "Heat", 3), movie(2, "Her", 2)])
+
+    assert index._keys == keys  # pylint: disable=protected-access
+    assert [result["id"] for result in index.suggest("he")] == [1, 2]
+    assert [result["id"] for result in index.suggest("hea")] == [1]
+    assert index.suggest("h")[0]["popularity"] == 3
+
+
+def test_suggest_work_is_bounded_by_limit():
+    """
+    A function that tests short and common prefixes only look at the suggested movies,
+    however many titles match
+    """
+    index = TitleIndex()
+    index.add_many(
+        [movie(movie_id, f"The Film {movie_id}", movie_id) for movie_id in range(5000)]
+        + [movie(movie_id, f"Theory {movie_id}", 1) for movie_id in range(5000, 5010)]
+    )
+    index._movies = CountingDict(index._movies)  # pylint: disable=protected-access
+
+    for prefix in ("t", "th", "the", "the film"):
+        index._movies.lookups = 0  # pylint: disable=protected-access
+        results = index.suggest(prefix, limit=5)
+        assert [result["id"] for result in results] == [4999, 4998, 4997, 4996, 4995]
+        assert index._movies.lookups <= 2 * 5  # pylint: disable=protected-access
+
+    index._movies.lookups = 0  # pylint: disable=protected-access
+    assert len(index.suggest("theory", limit=5)) == 5
+    assert index._movies.lookups <= MAX_SCAN + 5  # pylint: disable=protected-access
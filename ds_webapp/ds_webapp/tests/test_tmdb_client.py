@@ -0,0 +1,83 @@
+"""
+A file to test the pooled TMDB http client and the functions routed through it
+"""
+
+import pytest
+import responses
+
+from ds_webapp.api_client import tmdb_client
+from ds_webapp.api_client.http_client import TMDBClient
+from ds_webapp.cache.cache import get_cache
+
+BASE_URL = "https://tmdb.test/3"
+
+
+@pytest.fixture
+def tmdb():
+    """
+    Returns a client pointing at a fake TMDB url, installed as the module client
+    """
+    test_client = TMDBClient(BASE_URL, "Bearer token", backoff_factor=0)
+    original = tmdb_client.client
+    tmdb_client.client = test_client
+    get_cache().clear()
+    yield test_client
+    tmdb_client.client = original
+    get_cache().clear()
+    test_client.close()
+
+
+@responses.activate
+def test_session_headers(tmdb):
+    """
+    A function that tests the session sends the shared headers
+    """
+    responses.get(f"{BASE_URL}/movie/popular", json={"results": [{"id": 1}]})
+
+    assert tmdb_client.get_popular_movies() == [{"id": 1}]
+    request = responses.calls[0].request
+    assert request.headers["Authorization"] == "Bearer token"
+    assert request.headers["accept"] == "application/json"
+    assert tmdb.session.headers["Connection"] == "keep-alive"
+
+
+@responses.activate
+@pytest.mark.usefixtures("tmdb")
+def test_retry_on_rate_limit():
+    """
+    A function that tests 429 responses are retried
+    """
+    url = f"{BASE_URL}/movie/550"
+    responses.get(url, status=429)
+    responses.get(url, status=503)
+    responses.get(url, json={"id": 550, "runtime": 139})
+
+    assert tmdb_client.get_movie_details(550)["runtime"] == 139
+    assert len(responses.calls) == 3
+
+
+def test_endpoint_timeouts():
+    """
+    A function that tests the most specific endpoint timeout is used
+    """
+    test_client = TMDBClient(
+        BASE_URL, "Bearer token", timeouts={"/movie/popular": (1, 2)}
+    )
+
+    assert test_client.timeout_for("/movie/popular") == (1, 2)
+    assert test_client.timeout_for("/movie/550") == (3.05, 5)
+    assert test_client.timeout_for("/unknown") == (3.05, 5)
+
+
+@responses.activate
+@pytest.mark.usefixtures("tmdb")
+def test_responses_are_cached():
+    """
+    A function that tests repeated calls are answered from the cache
+    """
+    responses.get(f"{BASE_URL}/genre/movie/list", json={"genres": [{"id": 28}]})
+
+    assert tmdb_client.get_movie_genres() == [{"id": 28}]
+    assert tmdb_client.get_movie_genres() == [{"id": 28}]
+    assert len(responses.calls) == 1
+    assert get_cache().stats()["hits"] == 1
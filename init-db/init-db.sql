@@ -1,11 +1,3 @@
-CREATE TABLE IF NOT EXISTS users (
-    id SERIAL PRIMARY KEY,
-    username TEXT NOT NULL UNIQUE,
-    password TEXT NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS favorites (
-    movie_id INT,
-    user_id INT REFERENCES users(id),
-    PRIMARY KEY(movie_id, user_id)
-);
\ No newline at end of file
+-- The schema is created and upgraded by the migration runner
+-- (ds_webapp/ds_webapp/database/migrations), which the app container runs with
+-- `poetry run migrate up` before it starts serving.
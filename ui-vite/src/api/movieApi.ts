@@ -3,7 +3,7 @@ import { Movie } from "../interfaces";
 
 export const fetchMostPopularMovies = async (token: string, count: number = 20) => {
     try {
-      const res = await fetch(`${BASE_URL}/movies/most_popular/${count}`, {
+      const res = await fetch(`${BASE_URL}/movies/most_popular/${count}?view=card`, {
         method: "GET",
         headers: {
           "Content-Type": "application/json",
@@ -65,7 +65,7 @@ export const deleteMovieFromFavorites = async (token: string, movie_id: number)
 
 export const fetchFavoriteMovies = async (token: string) => {
   try {
-    const res = await fetch(`${BASE_URL}/movies/favorite`, {
+    const res = await fetch(`${BASE_URL}/movies/favorite?view=card`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",
@@ -92,7 +92,7 @@ export const searchMovies = async (token: string, query: string): Promise<{ valu
   if (!query.trim()) return [];
 
   try {
-    const res = await fetch(`${BASE_URL}/movies/${encodeURIComponent(query)}`, {
+    const res = await fetch(`${BASE_URL}/movies/${encodeURIComponent(query)}?view=title`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",
@@ -118,7 +118,7 @@ export const searchMovies = async (token: string, query: string): Promise<{ valu
 
 export const fetchSameGenreMovies = async (token: string, title: string): Promise<Movie[]> => {
   try {
-    const res = await fetch(`${BASE_URL}/movies/same_genres/${encodeURIComponent(title)}`, {
+    const res = await fetch(`${BASE_URL}/movies/same_genres/${encodeURIComponent(title)}?view=card`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",
@@ -136,7 +136,7 @@ export const fetchSameGenreMovies = async (token: string, title: string): Promis
 
 export const fetchSimilarRuntimeMovies = async (token: string, title: string): Promise<Movie[]> => {
   try {
-    const res = await fetch(`${BASE_URL}/movies/similar_runtime/${encodeURIComponent(title)}`, {
+    const res = await fetch(`${BASE_URL}/movies/similar_runtime/${encodeURIComponent(title)}?view=card`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",